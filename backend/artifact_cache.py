@@ -0,0 +1,209 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+import pandas as pd
+
+
+# Default in-process budget for unpickled artifacts. Override with the
+# ARTIFACT_CACHE_MAX_BYTES environment variable (in bytes).
+DEFAULT_MAX_BYTES = int(os.environ.get("ARTIFACT_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    stamp: tuple[int, int]
+    nbytes: int
+    # Key of the entry this one is derived from (e.g. a model's explainer); dropped together with it.
+    # Linked by key, so an entry stored while its parent is absent is dropped with the parent once that's reloaded.
+    parent: Optional[tuple[str, Hashable]] = None
+
+
+_NO_PARENT = object()
+
+
+def file_stamp(path: str) -> tuple[int, int]:
+    """Return the (mtime_ns, size) pair used to detect that an artifact changed on disk."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+_fingerprints: dict[str, tuple[tuple[int, int], str]] = {}
+_fingerprints_lock = threading.Lock()
+
+
+def file_fingerprint(path: str) -> Optional[str]:
+    """Content hash of the file at ``path`` (None if it doesn't exist), re-hashed only when its stamp changes."""
+    try:
+        stamp = file_stamp(path)
+    except OSError:
+        return None
+    with _fingerprints_lock:
+        cached = _fingerprints.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    fingerprint = digest.hexdigest()
+    with _fingerprints_lock:
+        _fingerprints[path] = (stamp, fingerprint)
+    return fingerprint
+
+
+def estimate_nbytes(value: Any, stamp: tuple[int, int]) -> int:
+    """Estimate the in-memory footprint of a cached artifact.
+
+    DataFrames report their real (deep) memory usage; everything else (e.g. the
+    model & metadata dicts) falls back to the on-disk pickle size, which is a
+    reasonable proxy for fitted estimators.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    return int(stamp[1])
+
+
+class ArtifactCache:
+    """Process-wide LRU cache of loaded artifacts, keyed by artifact path.
+
+    Entries are invalidated whenever the file's mtime or size changes, and the
+    least-recently-used entries are evicted once the total estimated size
+    exceeds ``max_bytes``. Concurrent misses on the same key are collapsed so each
+    artifact version is loaded at most once.
+
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self._entries: "OrderedDict[tuple[str, Hashable], _CacheEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._inflight: dict[tuple[str, Hashable], threading.Lock] = {}
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loads_by_path: dict[str, int] = {}
+
+    def get(
+        self,
+        path: str,
+        loader: Callable[[str], Any],
+        variant: Hashable = None,
+        sizeof: Optional[Callable[[Any, tuple[int, int]], int]] = None,
+        evict_with: Hashable = _NO_PARENT,
+    ) -> Any:
+        """Return the cached value for ``(path, variant)``, loading it with ``loader(path)`` on a miss.
+
+        ``variant`` distinguishes different views of the same file (e.g. a column
+        projection of a dataset); all variants are invalidated together when the file changes.
+        Entries derived from another variant of the same file (e.g. an explainer built from the
+        unpickled model) can pass that variant as ``evict_with``, so they're evicted along with it.
+        """
+        path = os.path.abspath(path)
+        key = (path, variant)
+
+        with self._lock:
+            stamp = file_stamp(path)
+            value = self._lookup(key, stamp)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                # Another thread may have finished loading while we waited.
+                stamp = file_stamp(path)
+                value = self._lookup(key, stamp)
+                if value is not _MISSING:
+                    self.hits += 1
+                    return value
+                self.misses += 1
+
+            try:
+                value = loader(path)
+                nbytes = (sizeof or estimate_nbytes)(value, stamp)
+                with self._lock:
+                    parent = None if evict_with is _NO_PARENT else (path, evict_with)
+                    self._store(key, _CacheEntry(value=value, stamp=stamp, nbytes=nbytes, parent=parent))
+                    self.loads_by_path[path] = self.loads_by_path.get(path, 0) + 1
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+
+        return value
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop every cached variant of ``path`` (or everything, if ``path`` is None)."""
+        with self._lock:
+            if path is None:
+                keys = list(self._entries)
+            else:
+                path = os.path.abspath(path)
+                keys = [key for key in self._entries if key[0] == path]
+            for key in keys:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Drop all entries and reset the hit/miss counters."""
+        with self._lock:
+            self.invalidate()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.loads_by_path = {}
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "loads_by_path": dict(self.loads_by_path),
+            }
+
+    def _lookup(self, key: tuple[str, Hashable], stamp: tuple[int, int]) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        if entry.stamp != stamp:
+            # The file changed on disk; every variant of it is stale.
+            self.invalidate(key[0])
+            return _MISSING
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def _store(self, key: tuple[str, Hashable], entry: _CacheEntry) -> None:
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._total_bytes += entry.nbytes
+        # Always keep the newest entry, even if it alone exceeds the budget, or its parent is evicted.
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key, keep=key)
+            self.evictions += 1
+
+    def _remove(self, key: tuple[str, Hashable], keep: Optional[tuple[str, Hashable]] = None) -> None:
+        """Drop ``key`` and the entries derived from it, except ``keep``."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._total_bytes -= entry.nbytes
+        for child_key in [k for k, child in self._entries.items() if child.parent == key and k != keep]:
+            self._remove(child_key, keep=keep)
+
+
+_MISSING = object()
+
+artifact_cache = ArtifactCache()
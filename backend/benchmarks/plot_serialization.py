@@ -0,0 +1,108 @@
+"""
+Benchmark the plotting endpoints with the previous `json.loads(fig.to_json())` serialization
+versus the current `plot_response` path, with and without `?typed_arrays=true`.
+
+Run from the `backend` directory, e.g.:
+```bash
+python benchmarks/plot_serialization.py --model diabetes_RF --rows 100000
+```
+`--rows` upsamples the model's dataset (with jitter) to emulate large datasets.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app  # noqa: E402
+from model_manifest import get_all_model_inputs, get_model_summary  # noqa: E402
+from routers.plot_response import PlotJSONResponse  # noqa: E402
+from utils import get_dataset  # noqa: E402
+
+
+def legacy_plot_response(payload, typed_arrays=False):
+    """The previous behaviour: parse each figure's JSON back into dicts and let FastAPI re-encode them."""
+
+    def _roundtrip(value):
+        if hasattr(value, "to_json"):
+            return json.loads(value.to_json())
+        if isinstance(value, dict):
+            return {key: _roundtrip(item) for key, item in value.items()}
+        return value
+
+    return JSONResponse(jsonable_encoder(_roundtrip(payload)))
+
+
+def upsampled_dataset_loader(rows: int):
+    def _get_dataset(dataset_name, columns=None):
+        dataset = get_dataset(dataset_name, columns=columns)
+        if rows <= len(dataset):
+            return dataset
+        rng = np.random.default_rng(0)
+        sampled = dataset.iloc[rng.integers(0, len(dataset), rows)].reset_index(drop=True)
+        numeric = sampled.select_dtypes("number").columns
+        sampled[numeric] = sampled[numeric] * rng.normal(1.0, 0.01, size=(rows, len(numeric)))
+        return pd.DataFrame(sampled)
+
+    return _get_dataset
+
+
+def time_requests(client: TestClient, method: str, url: str, repeats: int, **kwargs) -> tuple[float, int]:
+    timings = []
+    size = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = getattr(client, method)(url, **kwargs)
+        timings.append(time.perf_counter() - start)
+        response.raise_for_status()
+        size = len(response.content)
+    return statistics.median(timings), size
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare old vs new plot serialization latency.")
+    parser.add_argument("--model", default="diabetes_RF")
+    parser.add_argument("--rows", type=int, default=0, help="Upsample the dataset to this many rows.")
+    parser.add_argument("--repeats", type=int, default=5)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    summary = get_model_summary(args.model)
+    variables = get_all_model_inputs(summary) + list(summary["outputs"])
+    endpoints = [
+        ("overview", "get", f"/api/overview/{args.model}", {}),
+        ("violin", "post", f"/api/violin-plots/{args.model}",
+         {"json": {"box_plot_toggle": True, "data_points_toggle": True, "page": 1, "page_size": 10}}),
+        ("scatter", "post", f"/api/scatter-plots/{args.model}", {"json": {"selected_variables": variables[:2]}}),
+    ]
+
+    with TestClient(app) as client, mock.patch("routers.models.get_dataset", upsampled_dataset_loader(args.rows)):
+        print(
+            f"{'endpoint':<10} {'old (ms)':>10} {'new (ms)':>10} {'speedup':>8} {'bytes':>10} "
+            f"{'typed (ms)':>11} {'typed bytes':>12}"
+        )
+        for name, method, url, kwargs in endpoints:
+            with mock.patch("routers.models.plot_response", legacy_plot_response):
+                old_seconds, _ = time_requests(client, method, url, args.repeats, **kwargs)
+            with mock.patch("routers.models.plot_response", PlotJSONResponse):
+                new_seconds, size = time_requests(client, method, url, args.repeats, **kwargs)
+                typed_seconds, typed_size = time_requests(
+                    client, method, f"{url}?typed_arrays=true", args.repeats, **kwargs
+                )
+            print(
+                f"{name:<10} {old_seconds * 1000:>10.1f} {new_seconds * 1000:>10.1f} "
+                f"{old_seconds / new_seconds:>7.1f}x {size:>10} {typed_seconds * 1000:>11.1f} {typed_size:>12}"
+            )
@@ -0,0 +1,144 @@
+"""
+Generating large synthetic datasets in shards, in parallel and reproducibly.
+
+A dataset of ``num_rows`` rows is split into shards of `DATASET_SHARD_ROWS` rows. Each shard is drawn
+by `build_synthetic_demo_dataset` with its own generator, seeded from an independent child of the
+request's `numpy.random.SeedSequence`, so shards can be drawn in any order, on any process, and
+still merge (in order) into the same dataset: a given seed always produces the same rows. The
+response coefficients are drawn once, from another child, and shared by every shard.
+
+Shards are drawn on a pool of `DATASET_GENERATION_WORKERS` worker processes (spawned on first use),
+with a bounded number of shards in flight so that streaming responses don't buffer the whole
+dataset; a single-shard dataset is drawn in-process.
+
+Usage:
+```python
+for shard in iter_dataset_shards(num_rows, build_kwargs, seed=42):
+    ...  # DataFrames of up to DATASET_SHARD_ROWS rows, in order
+
+data_df = generate_dataset(num_rows, build_kwargs, seed=42)
+```
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils import build_synthetic_demo_dataset
+
+logger = logging.getLogger(__name__)
+
+DATASET_SHARD_ROWS = 10_000
+DATASET_GENERATION_WORKERS = int(os.environ.get("DATASET_GENERATION_WORKERS", os.cpu_count() or 1))
+# Shards queued or drawn ahead of the consumer, per worker.
+SHARDS_IN_FLIGHT_PER_WORKER = 2
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=DATASET_GENERATION_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _reset_pool(broken: Optional[ProcessPoolExecutor] = None) -> None:
+    """Shut the pool down (only if it's still ``broken``, when given); the next shard starts a fresh one.
+
+    Shards other requests already submitted aren't cancelled: on a working pool they still finish, and
+    on a broken one they fail with BrokenProcessPool, which their requests handle themselves.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or (broken is not None and _pool is not broken):
+            return
+        _pool.shutdown(wait=False)
+        _pool = None
+
+
+def _draw_shard(num_rows: int, build_kwargs: dict[str, Any], seed: np.random.SeedSequence) -> pd.DataFrame:
+    data_df, _ = build_synthetic_demo_dataset(num_rows=num_rows, rng=np.random.default_rng(seed), **build_kwargs)
+    return data_df
+
+
+def shard_plan(
+    num_rows: int, build_kwargs: dict[str, Any], seed: Optional[int] = None
+) -> tuple[dict[str, Any], list[tuple[int, np.random.SeedSequence]]]:
+    """``build_kwargs`` with the response coefficients filled in, and the (rows, seed) of every shard."""
+    n_shards = max(1, -(-num_rows // DATASET_SHARD_ROWS))
+    coefs_seed, *shard_seeds = np.random.SeedSequence(seed).spawn(n_shards + 1)
+
+    build_kwargs = dict(build_kwargs)
+    if build_kwargs.get("coefs") is None:
+        inputs, outputs = build_kwargs["inputs"], build_kwargs["outputs"]
+        n_inputs = inputs if isinstance(inputs, int) else len(inputs["general"]) + len(inputs["formulation"])
+        n_outputs = outputs if isinstance(outputs, int) else len(outputs)
+        build_kwargs["coefs"] = np.random.default_rng(coefs_seed).uniform(-1, 1, size=(n_outputs, n_inputs))
+
+    shard_rows = [min(DATASET_SHARD_ROWS, num_rows - start) for start in range(0, num_rows, DATASET_SHARD_ROWS)]
+    return build_kwargs, list(zip(shard_rows or [0], shard_seeds))
+
+
+def iter_dataset_shards(
+    num_rows: int,
+    build_kwargs: dict[str, Any],
+    seed: Optional[int] = None,
+) -> Iterator[pd.DataFrame]:
+    """The dataset's shards, in order (see the module docstring). ``build_kwargs`` are as for
+    `build_synthetic_demo_dataset`; a None ``seed`` draws a different dataset every time."""
+    build_kwargs, shards = shard_plan(num_rows, build_kwargs, seed)
+    workers = DATASET_GENERATION_WORKERS
+    if workers <= 1 or len(shards) == 1:
+        for shard_num_rows, shard_seed in shards:
+            yield _draw_shard(shard_num_rows, build_kwargs, shard_seed)
+        return
+
+    in_flight: deque[Future] = deque()
+    n_submitted = n_yielded = 0
+    pool = _get_pool()
+    try:
+        while n_yielded < len(shards):
+            while n_submitted < len(shards) and len(in_flight) < workers * SHARDS_IN_FLIGHT_PER_WORKER:
+                shard_num_rows, shard_seed = shards[n_submitted]
+                in_flight.append(pool.submit(_draw_shard, shard_num_rows, build_kwargs, shard_seed))
+                n_submitted += 1
+            shard = in_flight.popleft().result()
+            n_yielded += 1
+            yield shard
+    except BrokenProcessPool as e:
+        # A worker died (e.g. out of memory): draw the remaining shards in-process, and start a fresh pool next time
+        # (unless another request already has).
+        logger.warning(f"Dataset generation pool failed ({e}); drawing the remaining shards in-process.")
+        _reset_pool(broken=pool)
+        for shard_num_rows, shard_seed in shards[n_yielded:]:
+            yield _draw_shard(shard_num_rows, build_kwargs, shard_seed)
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def generate_dataset(
+    num_rows: int,
+    build_kwargs: dict[str, Any],
+    seed: Optional[int] = None,
+) -> pd.DataFrame:
+    """The whole dataset: its shards, merged in order.
+
+    In the compact format, a shard only has as many component columns as its largest formulation;
+    the merged dataset has them all (shards' component columns are a prefix of each other's, so
+    they stay in order), with missing components left empty.
+    """
+    return pd.concat(list(iter_dataset_shards(num_rows, build_kwargs, seed)), ignore_index=True)
@@ -0,0 +1,93 @@
+"""
+Columnar, memory-mapped dataset storage.
+
+Datasets live in `backend/datasets/` as `{dataset-name}_dataset.arrow` files (uncompressed
+Arrow IPC), which can be memory-mapped and projected down to just the columns a request needs.
+The original `{dataset-name}_dataset.pkl` files remain supported as a fallback.
+
+To migrate existing pickled datasets, run (from the `backend` directory):
+```bash
+python dataset_store.py
+```
+"""
+
+import argparse
+import glob
+import os
+import pickle
+from typing import Iterable, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+
+ARROW_SUFFIX = ".arrow"
+PICKLE_SUFFIX = ".pkl"
+
+
+def write_arrow_dataset(df: pd.DataFrame, path: str) -> None:
+    """Write ``df`` (including its index) as an uncompressed Arrow IPC file, suitable for memory-mapping."""
+    table = pa.Table.from_pandas(df, preserve_index=None)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def _index_columns(schema: pa.Schema) -> list[str]:
+    """Names of the physical columns holding the pandas index (RangeIndexes are metadata-only)."""
+    pandas_metadata = schema.pandas_metadata or {}
+    return [col for col in pandas_metadata.get("index_columns", []) if isinstance(col, str)]
+
+
+def read_arrow_dataset(path: str, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Memory-map an Arrow IPC dataset and materialize only the requested ``columns``.
+
+    The pandas index is always restored. Raises ``KeyError`` for unknown columns.
+    """
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+
+    if columns is not None:
+        columns = list(dict.fromkeys(columns))
+        missing = [col for col in columns if col not in table.schema.names]
+        if missing:
+            raise KeyError(f"Columns not found in dataset: {missing}")
+        table = table.select(columns + [col for col in _index_columns(table.schema) if col not in columns])
+
+    return table.to_pandas()
+
+
+def convert_pickled_datasets(datasets_dir: str, overwrite: bool = False) -> list[str]:
+    """Convert every `*_dataset.pkl` in ``datasets_dir`` to a sibling `.arrow` file.
+
+    Returns the paths of the files written. Existing `.arrow` files are skipped unless ``overwrite``.
+    """
+    written = []
+    for pickle_path in sorted(glob.glob(os.path.join(datasets_dir, f"*_dataset{PICKLE_SUFFIX}"))):
+        arrow_path = pickle_path[: -len(PICKLE_SUFFIX)] + ARROW_SUFFIX
+        if os.path.exists(arrow_path) and not overwrite:
+            continue
+        with open(pickle_path, "rb") as f:
+            df = pickle.load(f)
+        write_arrow_dataset(df, arrow_path)
+        written.append(arrow_path)
+    return written
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Convert pickled datasets to memory-mappable Arrow IPC files.")
+    parser.add_argument(
+        "--datasets-dir",
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets"),
+        help="Directory containing `*_dataset.pkl` files.",
+    )
+    parser.add_argument("--overwrite", action="store_true", help="Re-convert datasets that already have an `.arrow` file.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    for path in convert_pickled_datasets(args.datasets_dir, overwrite=args.overwrite):
+        print(f"wrote {path}")
@@ -0,0 +1,312 @@
+"""
+SHAP explainers: a registry of attribution backends, cached per model version.
+
+Each `ExplainerBackend` declares which estimators it supports, how to build an explain function
+(``X -> shap.Explanation``) for one, and a rough cost model (seconds per explained row), which the
+SHAP endpoints use to size their samples. `explainer_backend` picks the first registered backend
+that supports an estimator, in this order:
+- "xgboost": XGBoost's native `pred_contribs` (exact TreeSHAP in C++, no conversion to SHAP's format);
+- "tree": `shap.TreeExplainer`, for sklearn forests, NGBoost, LightGBM, CatBoost...;
+- "linear": closed-form SHAP values of linear models, ``coef * (x - mean(x))``;
+- "kernel": `shap.KernelExplainer` over a k-means summary of the dataset; for torch networks (e.g.
+  `MCDropoutNN`) and anything else with a `predict` method.
+More backends can be added with `register_explainer_backend`. Backends whose explainers run
+single-threaded ("tree" and "kernel") explain large inputs in chunks on a pool of worker processes
+(see `parallel_explain.py`).
+
+Building an explainer (e.g. preprocessing every tree of a large forest) is a big share of a SHAP
+request's latency, so explain functions are cached in the artifact cache next to the unpickled
+model they're built from: keyed by the model's content hash, the dataset and the output,
+invalidated when the model file changes, and evicted together with the cached model.
+"""
+
+import copy
+import os
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+import shap
+from sklearn.ensemble import BaseEnsemble
+
+from artifact_cache import artifact_cache, file_fingerprint
+from model_artifacts import MODELS_DIR
+from model_manifest import model_manifest
+from parallel_explain import PROCESS_WORKERS, ProcessPoolExplainer
+from utils import get_dataset, get_dataset_name_from_model, get_dataset_path, get_model_and_metadata
+
+ExplainFunction = Callable[[pd.DataFrame], shap.Explanation]
+
+# TreeSHAP costs about this many seconds per (tree x leaf x depth) per row (measured on sklearn forests & XGBoost).
+TREE_SHAP_SECONDS_PER_UNIT = 2.5e-8
+LINEAR_SHAP_SECONDS_PER_FEATURE = 1e-8
+# Rough cost of one model evaluation of one row, for the Kernel SHAP cost model.
+KERNEL_SECONDS_PER_EVALUATION = 2e-6
+# Number of k-means centroids summarizing the dataset as Kernel SHAP's background.
+KERNEL_BACKGROUND_SIZE = 20
+
+
+@dataclass(frozen=True)
+class ExplainerBackend:
+    """An attribution method: the estimators it supports, how to build it for one, and what it costs.
+
+    ``build(estimator, X)`` returns an explain function; ``X`` is the model's dataset (inputs only),
+    for backends that need background data. ``seconds_per_row(estimator, n_features)`` estimates the
+    cost of explaining one row. Backends with ``precompute=True`` are cheap enough for `shap_store.py`;
+    backends with ``processes=True`` are single-threaded, so large inputs are explained on a process pool.
+    """
+
+    name: str
+    supports: Callable[[Any], bool]
+    build: Callable[[Any, pd.DataFrame], ExplainFunction]
+    seconds_per_row: Callable[[Any, int], float]
+    precompute: bool = True
+    processes: bool = False
+
+
+EXPLAINER_BACKENDS: list[ExplainerBackend] = []
+
+
+def register_explainer_backend(backend: ExplainerBackend, index: int | None = None) -> None:
+    """Add ``backend`` to the registry (at ``index``, or last); earlier backends take precedence."""
+    EXPLAINER_BACKENDS.insert(len(EXPLAINER_BACKENDS) if index is None else index, backend)
+
+
+def explainer_backend(estimator) -> ExplainerBackend:
+    """The first registered backend supporting ``estimator``."""
+    for backend in EXPLAINER_BACKENDS:
+        if backend.supports(estimator):
+            return backend
+    raise ValueError(f"Unsupported model type for SHAP plots ({type(estimator).__name__}).")
+
+
+def _explanation(values, base_values, X: pd.DataFrame) -> shap.Explanation:
+    return shap.Explanation(values=values, base_values=base_values, data=X.to_numpy(), feature_names=list(X.columns))
+
+
+### XGBoost: native `pred_contribs`
+
+def _is_xgboost_model(estimator) -> bool:
+    return type(estimator).__module__.startswith("xgboost") and hasattr(estimator, "get_booster")
+
+
+def _build_xgboost_explainer(estimator, X_background: pd.DataFrame) -> ExplainFunction:
+    import xgboost
+
+    booster = estimator.get_booster()
+
+    def explain(X: pd.DataFrame) -> shap.Explanation:
+        contributions = booster.predict(xgboost.DMatrix(X), pred_contribs=True)
+        if contributions.ndim == 3:
+            # Multi-class: (rows, classes, features + bias) -> (rows, features, classes), like shap.
+            return _explanation(contributions[:, :, :-1].transpose(0, 2, 1), contributions[:, :, -1], X)
+        return _explanation(contributions[:, :-1], contributions[:, -1], X)
+
+    return explain
+
+
+def _xgboost_seconds_per_row(estimator, n_features: int) -> float:
+    depth = getattr(estimator, "max_depth", None) or 6
+    n_trees = (getattr(estimator, "n_estimators", None) or 100) * max(getattr(estimator, "n_classes_", 1), 1)
+    return TREE_SHAP_SECONDS_PER_UNIT * n_trees * 2**depth * depth
+
+
+### Tree-path SHAP (`shap.TreeExplainer`)
+
+def is_tree_model(estimator) -> bool:
+    """Whether ``estimator`` is supported by `shap.TreeExplainer`."""
+    ### TODO: clean this line of code up; can probably do it much more elegantly than this overly verbose code...?
+    est_type = str(type(estimator))
+    return (
+        isinstance(estimator, BaseEnsemble)
+        or "GBRegressor" in est_type
+        or "GBClassifier" in est_type
+        or "BoostRegressor" in est_type
+        or "BoostClassifier" in est_type
+    )
+
+
+def _tree_seconds_per_row(estimator, n_features: int) -> float:
+    trees = [getattr(tree, "tree_", None) for tree in getattr(estimator, "estimators_", [])]
+    if trees and all(tree is not None for tree in trees):
+        return TREE_SHAP_SECONDS_PER_UNIT * sum(tree.n_leaves * tree.max_depth for tree in trees)
+    depth = getattr(estimator, "max_depth", None) or 6
+    return TREE_SHAP_SECONDS_PER_UNIT * (getattr(estimator, "n_estimators", None) or 100) * 2**depth * depth
+
+
+### Linear models: closed form
+
+def _is_linear_model(estimator) -> bool:
+    from sklearn.linear_model import GammaRegressor, PoissonRegressor, TweedieRegressor
+
+    # sklearn's linear models predict (or, for classifiers, decide on) X @ coef_ + intercept_; GLMs apply a
+    # link function on top of it.
+    return (
+        type(estimator).__module__.startswith("sklearn.linear_model")
+        and hasattr(estimator, "coef_")
+        and hasattr(estimator, "intercept_")
+        and not isinstance(estimator, (GammaRegressor, PoissonRegressor, TweedieRegressor))
+    )
+
+
+def _build_linear_explainer(estimator, X_background: pd.DataFrame) -> ExplainFunction:
+    # With independent features, the SHAP value of feature j is coef_j * (x_j - E[x_j]).
+    coef = np.atleast_2d(np.asarray(estimator.coef_, dtype=float))  # (outputs, features)
+    intercept = np.broadcast_to(np.asarray(estimator.intercept_, dtype=float), (coef.shape[0],))
+    mean = X_background.to_numpy(dtype=float).mean(axis=0)
+    base_values = intercept + coef @ mean
+
+    def explain(X: pd.DataFrame) -> shap.Explanation:
+        values = (X.to_numpy(dtype=float) - mean)[:, :, np.newaxis] * coef.T[np.newaxis]
+        if coef.shape[0] == 1:
+            return _explanation(values[:, :, 0], np.full(len(X), base_values[0]), X)
+        return _explanation(values, np.tile(base_values, (len(X), 1)), X)
+
+    return explain
+
+
+### Kernel SHAP: everything else (torch networks, black-box `predict`)
+
+def _is_torch_module(estimator) -> bool:
+    return any(cls.__module__.startswith("torch.nn") for cls in type(estimator).__mro__)
+
+
+def _predict_function(estimator) -> Callable[[np.ndarray], np.ndarray]:
+    if _is_torch_module(estimator):
+        import torch
+
+        # Deterministic mean prediction, with dropout off (MC dropout sampling would make Kernel SHAP noisy).
+        # Predict with a private copy, as the shared model's `predict` switches it back to training mode.
+        model = copy.deepcopy(estimator).eval()
+
+        def predict(X: np.ndarray) -> np.ndarray:
+            with torch.no_grad():
+                output = model(torch.as_tensor(np.asarray(X, dtype=np.float32))).numpy()
+            return output[:, 0] if output.ndim == 2 and output.shape[1] == 1 else output
+
+        return predict
+    if hasattr(estimator, "predict_proba"):
+        return estimator.predict_proba
+    return estimator.predict
+
+
+def _kernel_nsamples(n_features: int) -> int:
+    # KernelExplainer's "auto" number of coalitions.
+    return 2 * n_features + 2048
+
+
+def _build_kernel_explainer(estimator, X_background: pd.DataFrame) -> ExplainFunction:
+    background = shap.kmeans(X_background.to_numpy(dtype=float), min(KERNEL_BACKGROUND_SIZE, len(X_background)))
+    predict = _predict_function(estimator)
+
+    def explain(X: pd.DataFrame) -> shap.Explanation:
+        # KernelExplainer keeps per-call state, so each call gets its own (building one is cheap). It's
+        # Python-bound, so large inputs are parallelized across processes (``processes=True``), not threads.
+        result = shap.KernelExplainer(predict, background)(X.to_numpy(dtype=float), silent=True)
+        return _explanation(result.values, np.asarray(result.base_values), X)
+
+    return explain
+
+
+def _kernel_seconds_per_row(estimator, n_features: int) -> float:
+    return KERNEL_SECONDS_PER_EVALUATION * _kernel_nsamples(n_features) * KERNEL_BACKGROUND_SIZE
+
+
+def _supports_predict(estimator) -> bool:
+    return _is_torch_module(estimator) or callable(getattr(estimator, "predict", None))
+
+
+def _linear_seconds_per_row(estimator, n_features: int) -> float:
+    return LINEAR_SHAP_SECONDS_PER_FEATURE * n_features
+
+
+register_explainer_backend(
+    ExplainerBackend("xgboost", _is_xgboost_model, _build_xgboost_explainer, _xgboost_seconds_per_row)
+)
+register_explainer_backend(
+    ExplainerBackend(
+        "tree", is_tree_model, lambda estimator, X: shap.TreeExplainer(estimator), _tree_seconds_per_row, processes=True
+    )
+)
+register_explainer_backend(
+    ExplainerBackend("linear", _is_linear_model, _build_linear_explainer, _linear_seconds_per_row)
+)
+register_explainer_backend(
+    ExplainerBackend(
+        "kernel", _supports_predict, _build_kernel_explainer, _kernel_seconds_per_row, precompute=False, processes=True
+    )
+)
+
+
+def _estimator_and_inputs(model_name: str, output: str) -> tuple[Any, list[str]]:
+    data = get_model_and_metadata(model_name)["estimators_by_output"][output]
+    return data["estimator"], list(data["inputs_numerical"])
+
+
+def get_explainer_backend(model_name: str, output: str) -> ExplainerBackend:
+    """The backend used to explain ``output`` of ``model_name``."""
+    return explainer_backend(_estimator_and_inputs(model_name, output)[0])
+
+
+def estimate_seconds_per_row(model_name: str, output: str) -> float:
+    """A-priori cost of explaining one row of ``output`` of ``model_name``, from its backend's cost model.
+
+    For backends explained on a process pool, this is the cost per row of a large input, spread over the workers.
+    """
+    estimator, inputs = _estimator_and_inputs(model_name, output)
+    backend = explainer_backend(estimator)
+    workers = PROCESS_WORKERS if backend.processes else 1
+    return backend.seconds_per_row(estimator, len(inputs)) / max(workers, 1)
+
+
+def _cached_explainer(model_name: str, output: str, variant: tuple, build: Callable[[], Any]) -> Any:
+    try:
+        content_hash = model_manifest.get(model_name)["content_hash"]
+    except KeyError:
+        content_hash = None
+
+    return artifact_cache.get(
+        os.path.join(MODELS_DIR, f"{model_name}.pkl"),
+        lambda path: build(),
+        variant=(*variant, content_hash, output),
+        # `get_model_and_metadata` caches the model under the default variant.
+        evict_with=None,
+    )
+
+
+def get_explainer(model_name: str, output: str, pooled: bool = True) -> ExplainFunction:
+    """The (cached) explain function for ``output`` of ``model_name``, from the first backend supporting it.
+
+    With ``pooled=False`` (for background work, which shouldn't compete with requests for every core),
+    rows are explained in the calling thread rather than on a `ProcessPoolExplainer`'s worker processes.
+    Explain functions are shared between requests and must not be mutated.
+    """
+
+    def _build() -> ExplainFunction:
+        estimator, inputs = _estimator_and_inputs(model_name, output)
+        backend = explainer_backend(estimator)
+        dataset = get_dataset(get_dataset_name_from_model(model_name), columns=inputs)
+        explain = backend.build(estimator, dataset[inputs])
+        return ProcessPoolExplainer(explain) if backend.processes and PROCESS_WORKERS > 1 else explain
+
+    dataset_hash = file_fingerprint(get_dataset_path(get_dataset_name_from_model(model_name)))
+    explain = _cached_explainer(model_name, output, ("explainer", dataset_hash), _build)
+    if not pooled and isinstance(explain, ProcessPoolExplainer):
+        return explain.explain
+    return explain
+
+
+def get_tree_explainer(model_name: str, output: str) -> shap.TreeExplainer:
+    """The (cached) `shap.TreeExplainer` for ``output`` of ``model_name``.
+
+    Explainers are shared between requests and must not be mutated.
+    """
+
+    def _build() -> shap.TreeExplainer:
+        estimator = get_model_and_metadata(model_name)["estimators_by_output"][output]["estimator"]
+        if not is_tree_model(estimator):
+            raise ValueError("Unsupported model type for SHAP plots (TreeExplainer).")
+        return shap.TreeExplainer(estimator)
+
+    return _cached_explainer(model_name, output, ("tree-explainer",), _build)
@@ -0,0 +1,276 @@
+"""
+Cache of rendered figure responses, with strong ETags for conditional requests.
+
+Pages like the Overview, correlation heatmaps and violin plots are recomputed from scratch every
+time a user navigates back to them, although the model and dataset haven't changed. Endpoints
+decorated with `cached_figure` keep the serialized response bytes keyed by
+
+    (endpoint, model/model evaluation/dataset file hashes, normalized request params)
+
+so a repeated request is answered from memory without re-rendering, and a request carrying a
+matching `If-None-Match` header gets an empty `304 Not Modified`. The ETag is a hash of
+the response bytes themselves, so it stays valid across restarts.
+
+The cache is an LRU with a byte budget (`FIGURE_CACHE_MAX_BYTES`); entries evicted from memory can
+optionally be spilled to disk by setting `FIGURE_CACHE_SPILL_DIR` (capped by `FIGURE_CACHE_SPILL_MAX_BYTES`).
+
+The model is keyed by its file's own fingerprint rather than the manifest's content hash, which is only
+rescanned every few seconds, while the model is reloaded as soon as its file changes.
+
+Computing the key hashes the model and dataset files (when they change), so it must not run on the
+event loop: apply `cached_figure` below `@run_in_workload`, so the lookup runs on the worker pool.
+
+Usage in a router:
+```python
+@router.get("/api/some-plot/{model_name}")
+@run_in_workload("plotting")
+@cached_figure("some-plot")
+def get_some_plot(model_name: str) -> Response:
+    ...
+```
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from artifact_cache import file_fingerprint
+from model_artifacts import MODELS_DIR, evaluation_path
+from utils import get_dataset_name_from_model, get_dataset_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = int(os.environ.get("FIGURE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+DEFAULT_SPILL_DIR = os.environ.get("FIGURE_CACHE_SPILL_DIR") or None
+DEFAULT_SPILL_MAX_BYTES = int(os.environ.get("FIGURE_CACHE_SPILL_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an `If-None-Match` header value matches ``etag`` (weak comparison, as RFC 9110 requires)."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in [candidate.removeprefix("W/") for candidate in candidates]
+
+
+class FigureCache:
+    """Thread-safe LRU of ``key -> (etag, body)`` with a byte budget and optional spill to disk."""
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        spill_dir: Optional[str] = DEFAULT_SPILL_DIR,
+        spill_max_bytes: int = DEFAULT_SPILL_MAX_BYTES,
+    ):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self._entries: OrderedDict[str, tuple[str, bytes]] = OrderedDict()
+        self._spilled: OrderedDict[str, tuple[str, int]] = OrderedDict()  # key -> (etag, nbytes)
+        self._total_bytes = 0
+        self._spilled_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[tuple[str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            spilled = self._spilled.pop(key, None)
+            if spilled is not None:
+                self._spilled_bytes -= spilled[1]
+
+        if spilled is not None:
+            try:
+                with open(self._spill_path(key), "rb") as f:
+                    body = f.read()
+                os.remove(self._spill_path(key))
+            except OSError as e:
+                logger.warning(f"Could not read spilled figure {key}: {e}")
+            else:
+                with self._lock:
+                    self.hits += 1
+                self.put(key, spilled[0], body)
+                return spilled[0], body
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, etag: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        to_spill = []
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= len(self._entries.pop(key)[1])
+            self._entries[key] = (etag, body)
+            self._total_bytes += len(body)
+            while self._total_bytes > self.max_bytes:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= len(evicted[1])
+                self.evictions += 1
+                to_spill.append((evicted_key, evicted))
+
+        if self.spill_dir:
+            for evicted_key, (evicted_etag, evicted_body) in to_spill:
+                self._spill(evicted_key, evicted_etag, evicted_body)
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.bin")
+
+    def _spill(self, key: str, etag: str, body: bytes) -> None:
+        path = self._spill_path(key)
+        try:
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(body)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.warning(f"Could not spill figure {key} to disk: {e}")
+            return
+
+        with self._lock:
+            self._spilled[key] = (etag, len(body))
+            self._spilled_bytes += len(body)
+            dropped = []
+            while self._spilled_bytes > self.spill_max_bytes:
+                dropped_key, (_, nbytes) = self._spilled.popitem(last=False)
+                self._spilled_bytes -= nbytes
+                dropped.append(dropped_key)
+        for dropped_key in dropped:
+            try:
+                os.remove(self._spill_path(dropped_key))
+            except OSError:
+                pass
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            spilled = list(self._spilled)
+            self._entries.clear()
+            self._spilled.clear()
+            self._total_bytes = 0
+            self._spilled_bytes = 0
+            self.hits = self.misses = self.not_modified = self.evictions = 0
+        for key in spilled:
+            try:
+                os.remove(self._spill_path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "spilled_entries": len(self._spilled),
+                "spilled_bytes": self._spilled_bytes,
+            }
+
+
+figure_cache = FigureCache()
+
+
+def figure_cache_key(endpoint: str, model_name: str, params: dict[str, Any]) -> Optional[str]:
+    """Cache key of a figure request, or None if it can't be cached (e.g. the model file doesn't exist)."""
+    model_hash = file_fingerprint(os.path.join(MODELS_DIR, f"{model_name}.pkl"))
+    if model_hash is None:
+        return None
+    dataset_hash = file_fingerprint(get_dataset_path(get_dataset_name_from_model(model_name)))
+    if dataset_hash is None:
+        return None
+
+    key = json.dumps(
+        [endpoint, model_hash, file_fingerprint(evaluation_path(model_name)), dataset_hash, params],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+# "no-cache" lets the browser keep the response but revalidate it (getting a 304) on every use.
+def _validator_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def _not_modified(etag: str) -> Response:
+    figure_cache.record_not_modified()
+    return Response(status_code=304, headers=_validator_headers(etag))
+
+
+def cached_figure(endpoint: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorate a synchronous figure endpoint (taking ``model_name``) to serve it from `figure_cache` with ETags.
+
+    Apply it below `run_in_workload` (see the module docstring). The wrapper adds a ``request`` parameter to the endpoint's signature to read `If-None-Match`.
+    """
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        signature = inspect.signature(fn)
+        takes_request = "request" in signature.parameters
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            request: Request = kwargs["request"] if takes_request else kwargs.pop("request")
+            params = {name: value for name, value in kwargs.items() if name != "request"}
+            key = figure_cache_key(endpoint, params["model_name"], params)
+            if_none_match = request.headers.get("if-none-match")
+
+            if key is not None:
+                cached = figure_cache.get(key)
+                if cached is not None:
+                    etag, body = cached
+                    if etag_matches(if_none_match, etag):
+                        return _not_modified(etag)
+                    return Response(body, media_type="application/json", headers=_validator_headers(etag))
+
+            response = fn(*args, **kwargs)
+            if not isinstance(response, Response) or response.status_code != 200:
+                return response
+
+            etag = make_etag(response.body)
+            if key is not None:
+                figure_cache.put(key, etag, response.body)
+            if etag_matches(if_none_match, etag):
+                return _not_modified(etag)
+            response.headers.update(_validator_headers(etag))
+            return response
+
+        if not takes_request:
+            wrapper.__signature__ = signature.replace(
+                parameters=[
+                    *signature.parameters.values(),
+                    inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+                ]
+            )
+        return wrapper
+
+    return decorator
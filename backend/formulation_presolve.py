@@ -0,0 +1,263 @@
+"""
+Constraint presolve for group-aware formulation sampling.
+
+`utils.group_aware_sample_formulation_space` samples by rejection: it draws which groups are
+present, how many ingredients each has and their amounts, and redraws rows that break a bound. On
+tightly bounded configurations most attempts fail, and on impossible ones all of them do, so the
+sampler would only give up after thousands of attempts. `presolve_formulation` propagates the
+bounds through each other up front, until nothing changes:
+- a present group's total lies within what the other groups leave of 100%, and between the smallest
+  and largest totals its ingredients can make with a feasible number of them present;
+- an ingredient can't hold more than its group, less the lower bounds of the group's other required
+  ingredients; ingredients whose lower bound is above that can never be present;
+- a group's ingredient counts are limited to those whose totals can land within the group's bounds,
+  and that fit the global count window alongside the other groups' counts.
+Groups and ingredients that can never be present are reported as such; if something that must be
+present can't be (or the bounds can't add up to 100%), a ValueError explains why.
+
+Usage:
+```python
+presolve = presolve_formulation(mins, maxs, required, group_index, group_lowers, group_uppers,
+                                group_min_counts, group_max_counts, min_count, max_count)
+presolve.group_count_lows, presolve.group_count_highs  # feasible counts of each group, when present
+```
+"""
+
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+TOLERANCE = 1e-9
+# Propagation converges in a few passes in practice; this only guards against slow convergence.
+MAX_PASSES = 50
+
+
+@dataclass
+class FormulationPresolve:
+    """Tightened bounds of a formulation configuration. Ingredient and group bounds (and group counts)
+    apply when the ingredient or group is present."""
+
+    ingredient_lowers: np.ndarray
+    ingredient_uppers: np.ndarray
+    ingredient_possible: np.ndarray
+    group_lowers: np.ndarray
+    group_uppers: np.ndarray
+    group_count_lows: np.ndarray
+    group_count_highs: np.ndarray
+    group_forced: np.ndarray
+    group_possible: np.ndarray
+    min_count: int
+    max_count: int
+
+    def to_dict(self, ingredient_names: Sequence[str], group_names: Sequence[str]) -> dict[str, Any]:
+        return {
+            "ingredients": [
+                {
+                    "name": name,
+                    "possible": bool(self.ingredient_possible[i]),
+                    "min": float(self.ingredient_lowers[i]),
+                    "max": float(self.ingredient_uppers[i]),
+                }
+                for i, name in enumerate(ingredient_names)
+            ],
+            "groups": [
+                {
+                    "name": name,
+                    "forced": bool(self.group_forced[g]),
+                    "possible": bool(self.group_possible[g]),
+                    "min": float(self.group_lowers[g]),
+                    "max": float(self.group_uppers[g]),
+                    "min_ingredients": int(self.group_count_lows[g]),
+                    "max_ingredients": int(self.group_count_highs[g]),
+                }
+                for g, name in enumerate(group_names)
+            ],
+            "min_ingredients_per_formulation": self.min_count,
+            "max_ingredients_per_formulation": self.max_count,
+        }
+
+
+def _group_label(g: int, n_groups: int, group_names: Optional[Sequence[str]]) -> str:
+    name = None if group_names is None else group_names[g]
+    if name:
+        return f"Group '{name}'"
+    if n_groups == 1:
+        return "The formulation"
+    return f"Group {g}" if group_names is None else "Group '(unnamed)'"
+
+
+def _ingredient_label(i: int, ingredient_names: Optional[Sequence[str]]) -> str:
+    return f"Ingredient {i}" if ingredient_names is None else f"Ingredient '{ingredient_names[i]}'"
+
+
+def _count(n: int) -> str:
+    return f"{n} ingredient" if n == 1 else f"{n} ingredients"
+
+
+def presolve_formulation(
+    mins: Sequence[float],
+    maxs: Sequence[float],
+    required: Sequence[bool],
+    group_index: Sequence[int],
+    group_lowers: Sequence[float],
+    group_uppers: Sequence[float],
+    group_min_counts: Sequence[int],
+    group_max_counts: Sequence[int],
+    min_count: int,
+    max_count: int,
+    ingredient_names: Optional[Sequence[str]] = None,
+    group_names: Optional[Sequence[str]] = None,
+) -> FormulationPresolve:
+    """Tighten the bounds of a formulation configuration (see the module docstring).
+
+    Expects per-ingredient bounds that are individually valid (``0 <= min <= max``, counts within
+    group sizes); raises ValueError, naming the ingredients and groups involved (when names are
+    given), if no formulation can satisfy the bounds together.
+    """
+    mins = np.asarray(mins, dtype=float)
+    required = np.asarray(required, dtype=bool)
+    group_index = np.asarray(group_index, dtype=int)
+    n_groups = len(group_lowers)
+    members = [np.flatnonzero(group_index == g) for g in range(n_groups)]
+    n_required = np.array([required[m].sum() for m in members], dtype=int)
+    forced = np.array([group_min_counts[g] > 0 or n_required[g] > 0 for g in range(n_groups)], dtype=bool)
+
+    ing_lo = mins.copy()
+    ing_hi = np.minimum(np.asarray(maxs, dtype=float), 1.0)
+    ing_possible = np.ones(len(mins), dtype=bool)
+    g_lo = np.asarray(group_lowers, dtype=float).copy()
+    g_hi = np.minimum(np.asarray(group_uppers, dtype=float), 1.0)
+    c_lo = np.maximum.reduce([np.asarray(group_min_counts, dtype=int), n_required, np.ones(n_groups, dtype=int)])
+    c_hi = np.asarray(group_max_counts, dtype=int).copy()
+    g_possible = np.ones(n_groups, dtype=bool)
+    count_lo, count_hi = int(min_count), int(max_count)
+    # Why each group that can never be present can't be, to explain infeasible totals.
+    impossible_reasons: dict[int, str] = {}
+
+    def state() -> tuple:
+        return (ing_lo.tobytes(), ing_hi.tobytes(), ing_possible.tobytes(), g_lo.tobytes(), g_hi.tobytes(),
+                c_lo.tobytes(), c_hi.tobytes(), forced.tobytes(), g_possible.tobytes(), count_lo, count_hi)
+
+    def impossible_group(g: int, reason: str) -> None:
+        if forced[g]:
+            raise ValueError(f"{_group_label(g, n_groups, group_names)} must always be present, but {reason}.")
+        g_possible[g] = False
+        ing_possible[members[g]] = False
+        impossible_reasons[g] = reason
+
+    def infeasible(message: str) -> ValueError:
+        reasons = [
+            f"{_group_label(g, n_groups, group_names)} can never be present, as {reason}"
+            for g, reason in impossible_reasons.items()
+        ]
+        return ValueError(" ".join([message] + [f"({reason}.)" for reason in reasons]))
+
+    for _ in range(MAX_PASSES):
+        before = state()
+        for g in range(n_groups):
+            if not g_possible[g]:
+                continue
+            m = members[g]
+            label = _group_label(g, n_groups, group_names)
+            others = np.arange(n_groups) != g
+
+            # A group the others can't reach 100% without is always present.
+            if g_hi[others & g_possible].sum() < 1.0 - TOLERANCE:
+                forced[g] = True
+            # The group's total, given what the other groups leave of 100%.
+            g_hi[g] = min(g_hi[g], 1.0 - g_lo[others & forced].sum())
+            g_lo[g] = max(g_lo[g], 1.0 - g_hi[others & g_possible].sum())
+            if g_lo[g] > g_hi[g] + TOLERANCE:
+                impossible_group(g, f"the other groups leave it between {g_lo[g]:.3f} and {g_hi[g]:.3f} of the formulation")
+                continue
+
+            # Ingredients can't hold more than the group, less its other required ingredients' lower bounds.
+            required_lo = ing_lo[m[required[m]]].sum()
+            ing_hi[m] = np.minimum(ing_hi[m], g_hi[g] - required_lo + np.where(required[m], ing_lo[m], 0.0))
+            # ...and no less than the group's lower bound, less the most its other ingredients can hold.
+            for i in m[ing_possible[m]]:
+                rest = m[(m != i) & ing_possible[m]]
+                rest_required, rest_optional = rest[required[rest]], rest[~required[rest]]
+                n_rest_optional = max(0, c_hi[g] - 1 - len(rest_required))
+                rest_hi = ing_hi[rest_required].sum() + np.sort(ing_hi[rest_optional])[::-1][:n_rest_optional].sum()
+                ing_lo[i] = max(ing_lo[i], g_lo[g] - rest_hi)
+            blocked = m[ing_possible[m] & (ing_lo[m] > ing_hi[m] + TOLERANCE)]
+            for i in blocked[required[blocked]]:
+                raise ValueError(
+                    f"{_ingredient_label(i, ingredient_names)} is required, but in {label} it would need to be "
+                    f"at least {ing_lo[i]:.3f} and at most {ing_hi[i]:.3f}."
+                )
+            ing_possible[blocked] = False
+
+            # Counts: no more than the usable ingredients, and within the global window alongside the other groups.
+            optional = m[~required[m] & ing_possible[m]]
+            n_usable = n_required[g] + len(optional)
+            c_hi[g] = min(c_hi[g], n_usable, count_hi - c_lo[others & forced].sum())
+            c_lo[g] = max(c_lo[g], count_lo - c_hi[others & g_possible].sum())
+            if c_lo[g] > c_hi[g]:
+                if c_lo[g] > n_usable:
+                    reason = (
+                        f"it needs at least {_count(c_lo[g])}, and only {n_usable} of its ingredients can be "
+                        f"present within its bounds ({g_lo[g]:.3f} to {g_hi[g]:.3f})"
+                    )
+                else:
+                    reason = (
+                        f"it needs at least {_count(c_lo[g])}, and at most {c_hi[g]} fit within "
+                        "min/max_ingredients_per_formulation alongside the other groups"
+                    )
+                impossible_group(g, reason)
+                continue
+
+            # Smallest & largest totals with k ingredients present; they grow with k, so the feasible counts are a range.
+            ks = np.arange(c_lo[g], c_hi[g] + 1)
+            base_lo, base_hi = ing_lo[m[required[m]]].sum(), ing_hi[m[required[m]]].sum()
+            sums_lo = base_lo + np.r_[0.0, np.cumsum(np.sort(ing_lo[optional]))][ks - n_required[g]]
+            sums_hi = base_hi + np.r_[0.0, np.cumsum(np.sort(ing_hi[optional])[::-1])][ks - n_required[g]]
+            feasible = (sums_lo <= g_hi[g] + TOLERANCE) & (sums_hi >= g_lo[g] - TOLERANCE)
+            if not feasible.any():
+                impossible_group(
+                    g,
+                    f"no number of its ingredients ({c_lo[g]} to {c_hi[g]}) can add up to between "
+                    f"{g_lo[g]:.3f} and {g_hi[g]:.3f} (their totals range from {sums_lo[0]:.3f} to {sums_hi[-1]:.3f})",
+                )
+                continue
+            c_lo[g], c_hi[g] = ks[feasible][0], ks[feasible][-1]
+            g_lo[g] = max(g_lo[g], sums_lo[feasible][0])
+            g_hi[g] = min(g_hi[g], sums_hi[feasible][-1])
+
+        # The whole formulation.
+        if g_lo[forced].sum() > 1.0 + TOLERANCE:
+            raise infeasible(
+                f"The lower bounds of the always-present groups add up to {g_lo[forced].sum():.3f}, more than 1.0; "
+                "no feasible formulation exists."
+            )
+        if g_hi[g_possible].sum() < 1.0 - TOLERANCE:
+            raise infeasible(
+                f"The upper bounds of the groups that can be present add up to {g_hi[g_possible].sum():.3f}, less "
+                "than 1.0, so ingredient amounts cannot sum to 100%."
+            )
+        count_lo = max(count_lo, int(c_lo[forced].sum()))
+        count_hi = min(count_hi, int(c_hi[g_possible].sum()))
+        if count_lo > count_hi:
+            raise infeasible(
+                f"Formulations need at least {count_lo} ingredients, but at most {count_hi} can be present."
+            )
+        if state() == before:
+            break
+
+    ing_lo[~ing_possible] = 0.0
+    ing_hi[~ing_possible] = 0.0
+    return FormulationPresolve(
+        ingredient_lowers=ing_lo,
+        ingredient_uppers=ing_hi,
+        ingredient_possible=ing_possible,
+        group_lowers=g_lo,
+        group_uppers=g_hi,
+        group_count_lows=c_lo,
+        group_count_highs=c_hi,
+        group_forced=forced,
+        group_possible=g_possible,
+        min_count=count_lo,
+        max_count=count_hi,
+    )
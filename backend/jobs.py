@@ -0,0 +1,164 @@
+"""
+Background jobs with progress reporting, for requests that can outlive the frontend proxy timeout.
+
+An endpoint that supports jobs submits its work to a `JobQueue` and immediately returns the job id;
+clients poll `/api/jobs/{job_id}` for the status, progress (e.g. rows explained so far) and ETA,
+and get the result once the job is done. Submissions with the same key (e.g. endpoint, model,
+output and parameters) collapse into the same job while it's queued, running, or finished and
+not yet expired, so repeated clicks don't queue duplicate work.
+
+Usage:
+```python
+def _work(progress: JobProgress) -> dict[str, Any]:
+    for done in range(total):
+        ...
+        progress.update(done + 1, total)
+    return {"plot_data": fig}
+
+job = explainability_jobs.submit(("some-plot", model_name, params), _work)
+return {"job_id": job.id}
+```
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_WORKERS = int(os.environ.get("EXPLAINABILITY_JOB_WORKERS", 2))
+# Finished jobs (and their results) are kept this long, for polling clients and duplicate submissions.
+DEFAULT_JOB_TTL_SECONDS = float(os.environ.get("EXPLAINABILITY_JOB_TTL_SECONDS", 600))
+MAX_FINISHED_JOBS = 64
+
+
+class JobProgress:
+    """Progress of a job, in units of work (e.g. rows explained) out of a total."""
+
+    def __init__(self) -> None:
+        self.done = 0
+        self.total: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def update(self, done: int, total: Optional[int] = None) -> None:
+        with self._lock:
+            self.done = done
+            if total is not None:
+                self.total = total
+
+
+class Job:
+    def __init__(self, key: Hashable):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = "queued"
+        self.progress = JobProgress()
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self._encoded_results: dict[Hashable, bytes] = {}
+        self._encode_lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining time at the rate of progress so far, or None if it can't be estimated yet."""
+        if self.status != "running" or not self.progress.total or not self.progress.done:
+            return None
+        elapsed = time.time() - self.started_at
+        return max(0.0, elapsed * (self.progress.total - self.progress.done) / self.progress.done)
+
+    def encoded_result(self, variant: Hashable, encode: Callable[[Any], bytes]) -> bytes:
+        """``encode(result)``, computed once per ``variant`` (e.g. response format) and reused by later polls."""
+        with self._encode_lock:
+            if variant not in self._encoded_results:
+                self._encoded_results[variant] = encode(self.result)
+            return self._encoded_results[variant]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Status, progress and ETA (without the result)."""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "done": self.progress.done,
+            "total": self.progress.total,
+            "eta_seconds": self.eta_seconds(),
+            "elapsed_seconds": (self.finished_at or time.time()) - (self.started_at or self.submitted_at),
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """A worker pool running deduplicated `Job`s, keeping finished jobs for ``ttl_seconds``."""
+
+    def __init__(self, name: str, max_workers: int = DEFAULT_JOB_WORKERS, ttl_seconds: float = DEFAULT_JOB_TTL_SECONDS):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"jobs-{name}")
+        self._jobs: dict[str, Job] = {}
+        self._jobs_by_key: dict[Hashable, Job] = {}
+        self._finished: OrderedDict[str, float] = OrderedDict()  # job id -> finished at
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, fn: Callable[[JobProgress], Any]) -> Job:
+        """Run ``fn(progress)`` as a job, or return the existing job with the same ``key``.
+
+        Failed jobs aren't reused, so resubmitting retries them.
+        """
+        with self._lock:
+            self._expire()
+            existing = self._jobs_by_key.get(key)
+            if existing is not None and existing.status != "failed":
+                return existing
+            job = Job(key)
+            self._jobs[job.id] = job
+            self._jobs_by_key[key] = job
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn: Callable[[JobProgress], Any]) -> None:
+        job.started_at = time.time()
+        job.status = "running"
+        try:
+            job.result = fn(job.progress)
+            job.status = "done"
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.key}) failed: {e}")
+            job.error = getattr(e, "detail", None) or str(e)
+            job.status = "failed"
+        job.finished_at = time.time()
+        with self._lock:
+            self._finished[job.id] = job.finished_at
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def _expire(self) -> None:
+        now = time.time()
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if now - finished_at < self.ttl_seconds and len(self._finished) <= MAX_FINISHED_JOBS:
+                break
+            self._finished.popitem(last=False)
+            job = self._jobs.pop(job_id)
+            if self._jobs_by_key.get(job.key) is job:
+                del self._jobs_by_key[job.key]
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+            return {status: statuses.count(status) for status in ("queued", "running", "done", "failed")}
+
+
+explainability_jobs = JobQueue("explainability")
@@ -1,22 +1,44 @@
 import argparse
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 _backend_dir = Path(__file__).resolve().parent
 load_dotenv(_backend_dir.parent / ".env")
 
-from routers import chat, dataset_generator, meta, models, molecular, schemas, shap
+from model_manifest import model_manifest
+from routers import chat, dataset_generator, jobs, meta, models, molecular, schemas, shap
+from shap_store import start_shap_precompute
+from workloads import WorkloadQueueFull
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Index the models up front so metadata-only endpoints never have to unpickle them.
+    model_manifest.refresh()
+    # Fill in missing/stale precomputed SHAP values in the background (see `shap_store.py`).
+    start_shap_precompute()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.exception_handler(WorkloadQueueFull)
+async def workload_queue_full_handler(request: Request, exc: WorkloadQueueFull) -> JSONResponse:
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
 
-app = FastAPI()
 app.include_router(chat.router)
 app.include_router(meta.router)
 app.include_router(models.router)
 app.include_router(shap.router)
+app.include_router(jobs.router)
 app.include_router(molecular.router)
 app.include_router(dataset_generator.router)
 app.include_router(schemas.router)
@@ -0,0 +1,222 @@
+"""
+Split model artifact layout: estimators and evaluation results are stored separately.
+
+A model is saved as two files in `backend/models/`:
+- `{model-name}.pkl`: the pickled `model_and_metadata` dict with the estimators, but without
+  the per-output evaluation arrays listed in `EVALUATION_ARRAY_KEYS`;
+- `{model-name}.eval.npz`: those evaluation arrays plus each output's `metrics`, stored as plain
+  numeric arrays (no pickling), so they can be read per key without deserializing any estimator.
+  The sidecar records the content hash of the `.pkl` it was written for; when the model file
+  changes (e.g. a model is retrained in the single-file layout), the evaluation is read from the
+  pickle instead, and the sidecar is rewritten.
+
+Models pickled in the older single-file layout keep working; to add the evaluation sidecar to
+existing models, run (from the `backend` directory):
+```bash
+python model_artifacts.py
+```
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import pickle
+import threading
+from collections.abc import Mapping
+from typing import Any, Iterator, Optional
+
+import numpy as np
+
+from artifact_cache import artifact_cache
+from model_manifest import file_sha256, model_manifest
+from utils import PROJECT_ROOT_DIR, get_model_and_metadata
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = os.path.join(os.path.dirname(PROJECT_ROOT_DIR), "models")
+EVALUATION_SUFFIX = ".eval.npz"
+EVALUATION_ARRAY_KEYS = (
+    "y_train",
+    "y_pred_train",
+    "y_pred_train_uncertainty",
+    "y_test",
+    "y_pred_test",
+    "y_pred_test_uncertainty",
+)
+
+
+def evaluation_path(model_name: str, models_dir: str = MODELS_DIR) -> str:
+    return os.path.join(models_dir, f"{model_name}{EVALUATION_SUFFIX}")
+
+
+def _to_jsonable(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def save_evaluation(path: str, estimators_by_output: dict[str, dict[str, Any]], model_hash: str) -> None:
+    """Write the evaluation arrays & metrics of every output to an `.eval.npz` sidecar.
+
+    Arrays are keyed by output position (output names can contain any characters); missing
+    or None arrays (e.g. uncertainties of models without uncertainty estimates) are omitted.
+    ``model_hash`` is the content hash of the model file the evaluation belongs to.
+    """
+    blobs: dict[str, np.ndarray] = {
+        "model_hash": np.array(model_hash),
+        "outputs": np.array(list(estimators_by_output), dtype=str),
+    }
+    for i, results in enumerate(estimators_by_output.values()):
+        blobs[f"{i}__metrics"] = np.array(json.dumps(_to_jsonable(results.get("metrics"))))
+        for key in EVALUATION_ARRAY_KEYS:
+            if results.get(key) is not None:
+                # Keep the native dtype (e.g. float32 XGBoost predictions, integer class labels).
+                array = np.asarray(results[key])
+                blobs[f"{i}__{key}"] = array.astype(float) if array.dtype == object else array
+
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, **blobs)
+    os.replace(tmp_path, path)
+
+
+def split_model_artifact(model_and_metadata: dict[str, Any]) -> dict[str, Any]:
+    """Return a copy of ``model_and_metadata`` with the evaluation arrays removed from each output."""
+    stripped = dict(model_and_metadata)
+    stripped["estimators_by_output"] = {
+        output: {k: v for k, v in results.items() if k not in EVALUATION_ARRAY_KEYS}
+        for output, results in model_and_metadata["estimators_by_output"].items()
+    }
+    return stripped
+
+
+def save_model_artifact(model_name: str, model_and_metadata: dict[str, Any], models_dir: str = MODELS_DIR) -> None:
+    """Save a trained model in the split layout (estimator pickle + evaluation sidecar).
+
+    ``model_and_metadata`` is the usual `{"estimators_by_output": {output: results}, ...}` dict,
+    where each ``results`` is what `model_training.train_and_evaluate_estimator` returns.
+    """
+    model_path = os.path.join(models_dir, f"{model_name}.pkl")
+    tmp_path = f"{model_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(split_model_artifact(model_and_metadata), f)
+    save_evaluation(
+        evaluation_path(model_name, models_dir), model_and_metadata["estimators_by_output"], file_sha256(tmp_path)
+    )
+    os.replace(tmp_path, model_path)
+
+
+class ModelEvaluation:
+    """Lazily-read view of an `.eval.npz` sidecar; arrays are loaded on first access per key."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._arrays: dict[str, np.ndarray] = {}
+        with np.load(path, allow_pickle=False) as npz:
+            # Sidecars written before hashes were recorded have none, and are treated as stale.
+            self.model_hash: Optional[str] = str(npz["model_hash"]) if "model_hash" in npz.files else None
+            self.outputs: list[str] = [str(output) for output in npz["outputs"]]
+            self._keys = set(npz.files)
+            self._metrics = [json.loads(str(npz[f"{i}__metrics"])) for i in range(len(self.outputs))]
+
+    def metrics(self, output: str) -> Optional[dict[str, Any]]:
+        return self._metrics[self.outputs.index(output)]
+
+    def array(self, output: str, key: str) -> Optional[np.ndarray]:
+        """Return one evaluation array of ``output``, or None if it wasn't stored (e.g. no uncertainty)."""
+        blob_key = f"{self.outputs.index(output)}__{key}"
+        if blob_key not in self._keys:
+            return None
+        with self._lock:
+            if blob_key not in self._arrays:
+                with np.load(self.path, allow_pickle=False) as npz:
+                    self._arrays[blob_key] = npz[blob_key]
+            return self._arrays[blob_key]
+
+    def by_output(self) -> dict[str, "OutputEvaluation"]:
+        return {output: OutputEvaluation(self, output) for output in self.outputs}
+
+
+class OutputEvaluation(Mapping):
+    """Dict-like evaluation results of one output, compatible with `modeling.create_parity_plot`."""
+
+    def __init__(self, evaluation: ModelEvaluation, output: str):
+        self._evaluation = evaluation
+        self._output = output
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "metrics":
+            return self._evaluation.metrics(self._output)
+        if key in EVALUATION_ARRAY_KEYS:
+            return self._evaluation.array(self._output, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(("metrics",) + EVALUATION_ARRAY_KEYS)
+
+    def __len__(self) -> int:
+        return 1 + len(EVALUATION_ARRAY_KEYS)
+
+
+def get_model_evaluation(model_name: str) -> dict[str, Mapping]:
+    """Per-output evaluation results (`metrics` and the `EVALUATION_ARRAY_KEYS` arrays).
+
+    Reads the `.eval.npz` sidecar when it's current, so no estimator is deserialized; otherwise (no
+    sidecar, or one written for a different version of the model file) reads the model pickle, and
+    rewrites the sidecar from it if it has the evaluation arrays (the older single-file layout).
+    """
+    path = evaluation_path(model_name)
+    try:
+        model_hash = model_manifest.get(model_name)["content_hash"]
+    except KeyError:
+        model_hash = None
+    if model_hash is not None and os.path.exists(path):
+        evaluation = artifact_cache.get(path, ModelEvaluation)
+        if evaluation.model_hash == model_hash:
+            return evaluation.by_output()
+
+    estimators_by_output = get_model_and_metadata(model_name)["estimators_by_output"]
+    has_arrays = all(results.get("y_test") is not None for results in estimators_by_output.values())
+    if model_hash is not None and has_arrays:
+        try:
+            save_evaluation(path, estimators_by_output, model_hash)
+        except OSError as e:
+            logger.warning(f"Could not rewrite the evaluation sidecar of '{model_name}': {e}")
+    return estimators_by_output
+
+
+def write_missing_evaluation_sidecars(models_dir: str = MODELS_DIR, overwrite: bool = False) -> list[str]:
+    """Create `.eval.npz` sidecars for pickled models that don't have a current one. Returns the paths written."""
+    written = []
+    for model_path in sorted(glob.glob(os.path.join(models_dir, "*.pkl"))):
+        model_name = os.path.basename(model_path)[: -len(".pkl")]
+        path = evaluation_path(model_name, models_dir)
+        model_hash = file_sha256(model_path)
+        if os.path.exists(path) and not overwrite and ModelEvaluation(path).model_hash == model_hash:
+            continue
+        try:
+            with open(model_path, "rb") as f:
+                model_and_metadata = pickle.load(f)
+        except Exception as e:
+            print(f"skipping {model_path}: {e}")
+            continue
+        save_evaluation(path, model_and_metadata["estimators_by_output"], model_hash)
+        written.append(path)
+    return written
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Write evaluation sidecars (`.eval.npz`) for pickled models.")
+    parser.add_argument("--models-dir", default=MODELS_DIR, help="Directory containing `*.pkl` model files.")
+    parser.add_argument("--overwrite", action="store_true", help="Rewrite sidecars that already exist.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    for path in write_missing_evaluation_sidecars(args.models_dir, overwrite=args.overwrite):
+        print(f"wrote {path}")
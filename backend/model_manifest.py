@@ -0,0 +1,191 @@
+"""
+Lightweight index of the pickled models in `backend/models/`.
+
+The manifest records, for each `{model-name}.pkl`, its outputs, the numerical inputs and
+estimator type of each output, the dataset it was trained on, and a content hash. It is
+persisted to `models/manifest.json` so that unchanged models never have to be unpickled again
+(even across restarts), and it lets metadata-only endpoints answer without touching the pickles.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from utils import get_dataset_name_from_model, get_model_and_metadata
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = Path(__file__).resolve().parent / "models"
+MANIFEST_FILENAME = "manifest.json"
+
+# How often (in seconds) the model files are re-stat'ed to catch in-place rewrites.
+# Added/removed/renamed models are picked up immediately via the directory mtime.
+RESCAN_INTERVAL_SECONDS = 2.0
+
+
+def file_sha256(path: str | Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def summarize_model_and_metadata(model_and_metadata: dict[str, Any]) -> dict[str, Any]:
+    """Extract the per-output metadata kept in the manifest from an unpickled model."""
+    summary: dict[str, Any] = {"outputs": [], "inputs_by_output": {}, "estimator_types": {}}
+    for output, data in model_and_metadata["estimators_by_output"].items():
+        estimator = data["estimator"]
+        summary["outputs"].append(output)
+        summary["inputs_by_output"][output] = list(data["inputs_numerical"])
+        summary["estimator_types"][output] = f"{type(estimator).__module__}.{type(estimator).__name__}"
+    return summary
+
+
+def describe_model(path: str | Path) -> dict[str, Any]:
+    """Unpickle a model file once and extract the metadata stored in the manifest."""
+    path = Path(path)
+    model_name = path.stem
+    stat = path.stat()
+    entry: dict[str, Any] = {
+        "name": model_name,
+        "dataset_name": get_dataset_name_from_model(model_name),
+        "content_hash": file_sha256(path),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "outputs": [],
+        "inputs_by_output": {},
+        "estimator_types": {},
+        "error": None,
+    }
+
+    try:
+        with open(path, "rb") as f:
+            model_and_metadata = pickle.load(f)
+        entry.update(summarize_model_and_metadata(model_and_metadata))
+    except Exception as e:
+        # Keep the model listed (e.g. its dependencies aren't installed); endpoints needing
+        # its metadata fall back to loading the pickle and report the real error.
+        logger.warning(f"Could not index model '{model_name}': {e}")
+        entry["error"] = str(e)
+
+    return entry
+
+
+class ModelManifest:
+    """Thread-safe, self-refreshing manifest of the models in ``models_dir``."""
+
+    def __init__(self, models_dir: str | Path = MODELS_DIR):
+        self.models_dir = Path(models_dir)
+        self.manifest_path = self.models_dir / MANIFEST_FILENAME
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self._dir_mtime_ns: Optional[int] = None
+        self._last_scan = 0.0
+        self._loaded_from_disk = False
+
+    def refresh(self) -> bool:
+        """Re-scan the models directory, re-indexing only new or changed pickles.
+
+        Returns True if the manifest changed (in which case it is also written to disk).
+        """
+        with self._lock:
+            if not self._loaded_from_disk:
+                self._entries = self._read_manifest_file()
+                self._loaded_from_disk = True
+
+            self._dir_mtime_ns = self.models_dir.stat().st_mtime_ns if self.models_dir.exists() else None
+            self._last_scan = time.monotonic()
+
+            entries: dict[str, dict[str, Any]] = {}
+            changed = False
+            for path in sorted(self.models_dir.glob("*.pkl")):
+                stat = path.stat()
+                entry = self._entries.get(path.stem)
+                if entry is None or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                    entry = describe_model(path)
+                    changed = True
+                entries[path.stem] = entry
+            if set(entries) != set(self._entries):
+                changed = True
+
+            self._entries = entries
+            if changed:
+                self._write_manifest_file()
+            return changed
+
+    def ensure_fresh(self) -> None:
+        """Cheap staleness check used on every lookup; refreshes only when something may have changed."""
+        dir_mtime_ns = self.models_dir.stat().st_mtime_ns if self.models_dir.exists() else None
+        if (
+            not self._loaded_from_disk
+            or dir_mtime_ns != self._dir_mtime_ns
+            or time.monotonic() - self._last_scan > RESCAN_INTERVAL_SECONDS
+        ):
+            self.refresh()
+
+    def model_names(self) -> list[str]:
+        self.ensure_fresh()
+        return list(self._entries)
+
+    def get(self, model_name: str) -> dict[str, Any]:
+        """Return the manifest entry for ``model_name``; raises KeyError for unknown models."""
+        self.ensure_fresh()
+        try:
+            return self._entries[model_name]
+        except KeyError:
+            raise KeyError(f"Model '{model_name}' not found.") from None
+
+    def _read_manifest_file(self) -> dict[str, dict[str, Any]]:
+        try:
+            with open(self.manifest_path) as f:
+                return {entry["name"]: entry for entry in json.load(f)["models"]}
+        except FileNotFoundError:
+            return {}
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable model manifest at {self.manifest_path}: {e}")
+            return {}
+
+    def _write_manifest_file(self) -> None:
+        if not self.models_dir.exists():
+            return
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"models": list(self._entries.values())}, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            # A read-only models directory shouldn't break the app; the in-memory manifest still works.
+            logger.warning(f"Could not write model manifest to {self.manifest_path}: {e}")
+        # Writing the manifest bumps the directory mtime; don't treat that as a model change.
+        self._dir_mtime_ns = self.models_dir.stat().st_mtime_ns
+
+
+model_manifest = ModelManifest()
+
+
+def get_model_summary(model_name: str) -> dict[str, Any]:
+    """Manifest entry (outputs, inputs, estimator types, dataset name, content hash) for ``model_name``.
+
+    Falls back to unpickling the model if it could not be indexed, so callers get the underlying error.
+    """
+    entry = model_manifest.get(model_name)
+    if entry["error"] is not None:
+        # Raises the real loading error if the model still can't be unpickled.
+        model_and_metadata = get_model_and_metadata(model_name)
+        entry = {**entry, **summarize_model_and_metadata(model_and_metadata), "error": None}
+    return entry
+
+
+def get_all_model_inputs(summary: dict[str, Any]) -> list[str]:
+    """Union of the numerical inputs of every output, in first-seen order."""
+    inputs: dict[str, None] = {}
+    for output in summary["outputs"]:
+        inputs.update(dict.fromkeys(summary["inputs_by_output"][output]))
+    return list(inputs)
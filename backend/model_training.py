@@ -141,17 +141,19 @@ def train_and_evaluate_estimator(estimator, train_df, test_df, inputs, target, d
         print(f"Test MAE:  {metrics['test']['MAE']}")
         print(f"Test RMSE:  {metrics['test']['RMSE']}")
 
+    # Evaluation arrays are kept as plain ndarrays (not pandas Series) so that
+    # `model_artifacts.save_model_artifact` can store them as numeric blobs next to the estimator.
     results = {
         "target": target,
         "estimator": estimator,
         "inputs_numerical": inputs,
         "metrics": metrics,
-        "y_train": y,
-        "y_pred_train": y_pred_train,
-        "y_pred_train_uncertainty": y_pred_train_uncertainty,
-        "y_test": y_test,
-        "y_pred_test": y_pred_test,
-        "y_pred_test_uncertainty": y_pred_test_uncertainty,
+        "y_train": np.asarray(y),
+        "y_pred_train": np.asarray(y_pred_train),
+        "y_pred_train_uncertainty": None if y_pred_train_uncertainty is None else np.asarray(y_pred_train_uncertainty),
+        "y_test": np.asarray(y_test),
+        "y_pred_test": np.asarray(y_pred_test),
+        "y_pred_test_uncertainty": None if y_pred_test_uncertainty is None else np.asarray(y_pred_test_uncertainty),
     }
 
     return results
@@ -2,9 +2,53 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
+
+
+# Above this many points, scatter traces are drawn with WebGL (`scattergl`) instead of SVG, and
+# per-point error bars are replaced by a binned uncertainty band, so dense plots stay interactive.
+WEBGL_POINT_THRESHOLD = 2000
+UNCERTAINTY_BAND_BINS = 100
+
+
+def scatter_render_mode(n_points, webgl_threshold=WEBGL_POINT_THRESHOLD):
+    """`render_mode` for `px.scatter`: "webgl" above ``webgl_threshold`` points, "svg" otherwise."""
+    return "webgl" if n_points > webgl_threshold else "svg"
+
+
+def create_uncertainty_band(x, y, uncertainty, n_bins=UNCERTAINTY_BAND_BINS, name="± uncertainty"):
+    """A filled band of mean(y) ± mean(uncertainty) within quantile bins of ``x``.
+
+    A light replacement for thousands of overlapping error bars. Returns None if no point is finite.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    uncertainty = np.asarray(uncertainty, dtype=float)
+    finite = np.isfinite(x) & np.isfinite(y) & np.isfinite(uncertainty)
+    x, y, uncertainty = x[finite], y[finite], uncertainty[finite]
+
+    order = np.argsort(x)
+    if len(order) == 0:
+        return None
+    bins = np.array_split(order, min(n_bins, len(order)))
+    bins = [b for b in bins if len(b)]
+    band_x = np.array([x[b].mean() for b in bins])
+    band_y = np.array([y[b].mean() for b in bins])
+    band_uncertainty = np.array([uncertainty[b].mean() for b in bins])
+
+    return go.Scatter(
+        x=np.concatenate([band_x, band_x[::-1]]),
+        y=np.concatenate([band_y + band_uncertainty, (band_y - band_uncertainty)[::-1]]),
+        fill="toself",
+        fillcolor="rgba(99, 110, 250, 0.2)",
+        line=dict(width=0),
+        hoverinfo="skip",
+        name=name,
+        showlegend=False,
+    )
 
 
-def create_parity_plot(model_results, title="Model Prediction Parity Plot", log_x=False, log_y=False, axis_range=None, width=800, height=600):
+def create_parity_plot(model_results, title="Model Prediction Parity Plot", log_x=False, log_y=False, axis_range=None, width=800, height=600, webgl_threshold=WEBGL_POINT_THRESHOLD):
     
     y_test = model_results["y_test"]
     y_pred_test = model_results["y_pred_test"]
@@ -32,8 +76,11 @@ def create_parity_plot(model_results, title="Model Prediction Parity Plot", log_
         axis_min = axis_range[0]
         axis_max = axis_range[1]
     
+    render_mode = scatter_render_mode(len(df), webgl_threshold)
+
     # determine whether or not plot will include error bars for uncertainty estimates
-    if y_pred_test_uncertainty is not None:
+    # (dense plots get a lighter uncertainty band instead, added below)
+    if y_pred_test_uncertainty is not None and render_mode == "svg":
         error_y = "Uncertainty"
     else:
         error_y = None
@@ -48,9 +95,18 @@ def create_parity_plot(model_results, title="Model Prediction Parity Plot", log_
         width=width, height=height,
         log_x=log_x,
         log_y=log_y,
+        render_mode=render_mode,
     )
 
-    fig.update_traces(marker=dict(size=8))
+    fig.update_traces(marker=dict(size=8 if render_mode == "svg" else 4))
+
+    band = None
+    if y_pred_test_uncertainty is not None and render_mode == "webgl":
+        band = create_uncertainty_band(df["Actual"], df["Predicted"], df["Uncertainty"])
+    if band is not None:
+        # Draw the band underneath the points.
+        fig.add_trace(band)
+        fig.data = (fig.data[-1],) + fig.data[:-1]
     
     # Add diagonal line
     fig.add_shape(
@@ -88,7 +144,7 @@ def create_parity_plot(model_results, title="Model Prediction Parity Plot", log_
     return fig
 
 
-def create_residual_plot(model_results, title="Standardized Residual Plot", log_x=False, x_axis_range=None, width=800, height=600):
+def create_residual_plot(model_results, title="Standardized Residual Plot", log_x=False, x_axis_range=None, width=800, height=600, webgl_threshold=WEBGL_POINT_THRESHOLD):
     y_pred_test = model_results["y_pred_test"]
     y_test = model_results["y_test"]
     r2 = model_results["metrics"]["test"]["R^2"]
@@ -102,6 +158,7 @@ def create_residual_plot(model_results, title="Standardized Residual Plot", log_
         "Predictions": y_pred_test,
         "Standardized Residuals": std_residuals,
     })
+    render_mode = scatter_render_mode(len(df), webgl_threshold)
 
     if x_axis_range is None:
         x_min_val = df['Predictions'].min()
@@ -119,10 +176,11 @@ def create_residual_plot(model_results, title="Standardized Residual Plot", log_
         template='plotly_white',
         opacity=0.7,
         log_x=log_x,
-        width=width, height=height
+        width=width, height=height,
+        render_mode=render_mode,
     )
 
-    fig.update_traces(marker=dict(size=10))
+    fig.update_traces(marker=dict(size=10 if render_mode == "svg" else 4))
     
     # Add horizontal line at y = 0 (i.e. the zero-residual line)
     fig.add_shape(
@@ -0,0 +1,155 @@
+"""
+Explaining rows in parallel across worker processes.
+
+Some explainers run single-threaded inside the request: `shap.TreeExplainer` on sklearn forests
+(its C++ tree walk doesn't use threads) and Kernel SHAP (Python-bound, so threads share one core
+under the GIL). `ProcessPoolExplainer` wraps such an explain function: large inputs are split into
+chunks of rows, explained in a pool of worker processes, and concatenated back into one
+`shap.Explanation`, identical to explaining all the rows at once.
+
+The explain function is pickled once (with cloudpickle, as explain functions are usually closures)
+and sent to each worker by the pool's initializer, so only rows travel with each chunk. Workers are
+spawned rather than forked (the server is multi-threaded), on first use. Every cached explainer has
+its own pool, so at most `MAX_EXPLAINER_POOLS` pools are kept running: starting one shuts down the
+least recently used other one (its explainer starts a fresh pool if it's used again), after the
+chunks already submitted to it finish. Pools are also shut down when their explainer is garbage
+collected (e.g. evicted from the artifact cache).
+
+Usage:
+```python
+explain = ProcessPoolExplainer(explain)
+explanation = explain(X)  # same result as the wrapped explain(X)
+```
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+import cloudpickle
+import numpy as np
+import pandas as pd
+import shap
+
+logger = logging.getLogger(__name__)
+
+PROCESS_WORKERS = int(os.environ.get("SHAP_PROCESS_WORKERS", os.cpu_count() or 1))
+# Below this many rows, shipping rows to the workers costs more than it saves.
+MIN_PARALLEL_ROWS = int(os.environ.get("SHAP_MIN_PARALLEL_ROWS", 256))
+MAX_CHUNK_ROWS = 1024
+# Explainers with a running worker pool, at most; each pool has `PROCESS_WORKERS` processes.
+MAX_EXPLAINER_POOLS = int(os.environ.get("SHAP_MAX_EXPLAINER_POOLS", 2))
+
+# The explain function of the pool this worker process belongs to (set by `_init_worker`).
+_worker_explain: Optional[Callable[[pd.DataFrame], shap.Explanation]] = None
+
+
+def _init_worker(explain_pickle: bytes) -> None:
+    global _worker_explain
+    _worker_explain = cloudpickle.loads(explain_pickle)
+
+
+def _explain_chunk(X: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    explanation = _worker_explain(X)
+    return np.asarray(explanation.values), np.asarray(explanation.base_values)
+
+
+def _chunk_bounds(n_rows: int, n_workers: int) -> list[tuple[int, int]]:
+    """(start, stop) row ranges: at least one chunk per worker, of at most `MAX_CHUNK_ROWS` rows."""
+    n_chunks = max(n_workers, -(-n_rows // MAX_CHUNK_ROWS))
+    bounds = np.linspace(0, n_rows, n_chunks + 1).astype(int)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _shutdown(pool: ProcessPoolExecutor) -> None:
+    # Chunks already submitted (e.g. by a concurrent request) still finish; the workers exit afterwards.
+    pool.shutdown(wait=False)
+
+
+# Explainers with a running pool, least recently used first.
+_pooled: "OrderedDict[int, weakref.ref[ProcessPoolExplainer]]" = OrderedDict()
+_pooled_lock = threading.Lock()
+
+
+def _mark_pool_used(explainer: "ProcessPoolExplainer") -> list["ProcessPoolExplainer"]:
+    """Record that ``explainer``'s pool was just used; returns the explainers whose pools should be closed."""
+    with _pooled_lock:
+        _pooled.pop(id(explainer), None)
+        _pooled[id(explainer)] = weakref.ref(explainer)
+        evicted = []
+        while len(_pooled) > max(MAX_EXPLAINER_POOLS, 1):
+            other = _pooled.popitem(last=False)[1]()
+            if other is not None:
+                evicted.append(other)
+        return evicted
+
+
+class ProcessPoolExplainer:
+    """An explain function that explains large inputs in chunks on a pool of ``workers`` processes."""
+
+    def __init__(
+        self,
+        explain: Callable[[pd.DataFrame], shap.Explanation],
+        workers: int = PROCESS_WORKERS,
+        min_parallel_rows: int = MIN_PARALLEL_ROWS,
+    ):
+        self.explain = explain
+        self.workers = workers
+        self.min_parallel_rows = min_parallel_rows
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._finalizer: Optional[weakref.finalize] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Called with `_lock` held.
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(cloudpickle.dumps(self.explain),),
+            )
+            self._finalizer = weakref.finalize(self, _shutdown, self._pool)
+        return self._pool
+
+    def close(self) -> None:
+        """Shut the worker processes down, once the chunks submitted to them finish (they're restarted on the
+        next large input)."""
+        with self._lock:
+            if self._finalizer is not None:
+                self._finalizer()
+            self._pool, self._finalizer = None, None
+        with _pooled_lock:
+            _pooled.pop(id(self), None)
+
+    def __call__(self, X: pd.DataFrame) -> shap.Explanation:
+        if self.workers <= 1 or len(X) < self.min_parallel_rows:
+            return self.explain(X)
+
+        chunks = [X.iloc[start:stop] for start, stop in _chunk_bounds(len(X), self.workers)]
+        try:
+            # Submitting under the lock means `close` (e.g. by another explainer's `_mark_pool_used`) can't
+            # shut the pool down halfway through.
+            with self._lock:
+                futures = [self._get_pool().submit(_explain_chunk, chunk) for chunk in chunks]
+            for other in _mark_pool_used(self):
+                other.close()
+            results = [future.result() for future in futures]
+        except BrokenProcessPool as e:
+            # A worker died (e.g. out of memory); explain in-process, and start a fresh pool next time.
+            logger.warning(f"SHAP worker pool failed ({e}); explaining {len(X)} rows in-process.")
+            self.close()
+            return self.explain(X)
+
+        return shap.Explanation(
+            values=np.concatenate([values for values, _ in results]),
+            base_values=np.concatenate([base_values for _, base_values in results]),
+            data=X.to_numpy(),
+            feature_names=list(X.columns),
+        )
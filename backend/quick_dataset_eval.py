@@ -159,16 +159,23 @@ def make_linear_preprocessor(
 def compact_to_wide_format(df: pd.DataFrame) -> pd.DataFrame:
     """Pivot component-N_identifier / component-N_amount pairs into one
     column per unique ingredient, filled with the corresponding amounts."""
-    wide_rows = []
-    for _, row in df.iterrows():
-        formulation: dict[str, float] = {}
-        for i in range(1, len(df.columns) // 2 + 1):
-            name_col = f"component-{i}_identifier"
-            weight_col = f"component-{i}_amount"
-            if name_col in df.columns and pd.notna(row[name_col]):
-                formulation[row[name_col]] = row[weight_col]
-        wide_rows.append(formulation)
-    result = pd.DataFrame(wide_rows).fillna(0)
+    pairs = [
+        (f"component-{i}_identifier", f"component-{i}_amount")
+        for i in range(1, len(df.columns) // 2 + 1)
+        if f"component-{i}_identifier" in df.columns
+    ]
+    n_rows = len(df)
+    long_df = pd.DataFrame({
+        "row": np.tile(np.arange(n_rows), len(pairs)),
+        "ingredient": np.concatenate([df[name_col].to_numpy(dtype=object) for name_col, _ in pairs] or [np.empty(0, dtype=object)]),
+        "amount": np.concatenate([df[weight_col].to_numpy() for _, weight_col in pairs] or [np.empty(0)]),
+    })
+    long_df = long_df[long_df["ingredient"].notna()]
+    # An ingredient listed twice in one formulation takes its last amount.
+    long_df = long_df.drop_duplicates(["row", "ingredient"], keep="last")
+    result = long_df.pivot(index="row", columns="ingredient", values="amount")
+    result = result.reindex(pd.RangeIndex(n_rows)).fillna(0)
+    result.columns.name = None
     return result.reindex(sorted(result.columns), axis=1)
 
 
@@ -1,16 +1,26 @@
+import io
 import logging
-from typing import Any
+import os
+import zipfile
+from typing import Any, Iterator
 
 import numpy as np
 import pandas as pd
 from fastapi import APIRouter, Body, HTTPException
+from fastapi.responses import StreamingResponse
 
-from utils import build_synthetic_demo_dataset
+from dataset_shards import generate_dataset, iter_dataset_shards
+from formulation_presolve import FormulationPresolve, presolve_formulation
+from utils import estimate_formulation_acceptance_rate, formulation_sampler_kwargs
+from workloads import iterate_in_workload, run_in_workload
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Largest dataset a request may ask for.
+MAX_DATASET_ROWS = int(os.environ.get("DATASET_GENERATOR_MAX_ROWS", 5_000_000))
+
 
 def _normalize_formulation_groups(raw_groups: list) -> list[dict]:
     """Normalize the incoming formulation_groups payload into a validated structure.
@@ -98,8 +108,11 @@ def _validate_formulation_groups(
     global_min: int,
     global_max: int,
     total_ingredients: int,
-) -> None:
-    """Validate group bounds, per-group counts, and global/group reconciliation."""
+) -> FormulationPresolve:
+    """Validate group bounds, per-group counts, and global/group reconciliation.
+
+    Returns the presolved (tightened) bounds; raises ValueError, with the reason, if they can't all be met.
+    """
     for group in groups:
         size = len(group["ingredients"])
         if size == 0:
@@ -136,20 +149,6 @@ def _validate_formulation_groups(
                     f"Required formulation ingredient '{ingredient['name']}' must have a lower bound greater than 0."
                 )
 
-    # A group is always present if it forces at least one ingredient.
-    def _is_forced(group: dict) -> bool:
-        return group["min_count"] > 0 or any(i["required"] for i in group["ingredients"])
-
-    if sum(g["max"] for g in groups) < 1.0 - 1e-9:
-        raise ValueError(
-            "The sum of all group upper bounds is less than 1.0, so ingredient amounts cannot sum to 100%."
-        )
-    forced_lower_sum = sum(g["min"] for g in groups if _is_forced(g))
-    if forced_lower_sum > 1.0 + 1e-9:
-        raise ValueError(
-            "The sum of lower bounds for always-present groups exceeds 1.0; no feasible formulation exists."
-        )
-
     if global_min < 1:
         raise ValueError("min_ingredients_per_formulation must be at least 1.")
     if global_min > global_max:
@@ -162,22 +161,22 @@ def _validate_formulation_groups(
             f"max_ingredients_per_formulation (provided: {global_max}) cannot exceed the total number of ingredients (provided: {total_ingredients})."
         )
 
-    # Forced groups must contribute at least their min_count present ingredients.
-    forced_min_total = sum(
-        max(g["min_count"], sum(1 for i in g["ingredients"] if i["required"]))
-        for g in groups
-        if _is_forced(g)
+    # Bounds that can't be met together (group sums, ingredient bounds, required flags and counts).
+    ingredients = [ingredient for group in groups for ingredient in group["ingredients"]]
+    return presolve_formulation(
+        mins=[ingredient["min"] for ingredient in ingredients],
+        maxs=[ingredient["max"] for ingredient in ingredients],
+        required=[ingredient["required"] for ingredient in ingredients],
+        group_index=[g for g, group in enumerate(groups) for _ in group["ingredients"]],
+        group_lowers=[group["min"] for group in groups],
+        group_uppers=[group["max"] for group in groups],
+        group_min_counts=[group["min_count"] for group in groups],
+        group_max_counts=[group["max_count"] for group in groups],
+        min_count=global_min,
+        max_count=global_max,
+        ingredient_names=[ingredient["name"] for ingredient in ingredients],
+        group_names=[group["name"] for group in groups],
     )
-    if forced_min_total > global_max:
-        raise ValueError(
-            f"The minimum number of ingredients forced by groups ({forced_min_total}) exceeds "
-            f"max_ingredients_per_formulation ({global_max})."
-        )
-    if sum(g["max_count"] for g in groups) < global_min:
-        raise ValueError(
-            f"The total of all group max ingredient counts is less than "
-            f"min_ingredients_per_formulation ({global_min})."
-        )
 
 
 def _validate_coefs(
@@ -225,169 +224,294 @@ def _validate_coefs(
     return np.array(validated_rows, dtype=float)
 
 
-@router.post("/api/dataset-generator")
-async def get_synthetic_demo_dataset(body: dict = Body(...)) -> dict[str, Any]:
+def _validate_seed(seed: Any) -> int | None:
+    if seed is None:
+        return None
+    if isinstance(seed, bool) or not isinstance(seed, int) or seed < 0:
+        raise ValueError("seed must be a non-negative integer.")
+    return seed
 
+
+def _validate_num_rows(num_rows: Any) -> int:
+    # Form inputs may arrive as numeric strings.
     try:
-        general_inputs = body.get("general_inputs", [])
-        raw_formulation_groups = body.get("formulation_groups")
-        legacy_formulation_inputs = body.get("formulation_inputs", [])
-        outputs = body.get("outputs", [])
-        num_rows = body.get("num_rows", [])
-        noise = body.get("noise", 0.05)
-        output_format = body.get("output_format", "compact")
-        min_ingredients_per_formulation = body.get("min_ingredients_per_formulation")
-        max_ingredients_per_formulation = body.get("max_ingredients_per_formulation")
-        raw_coefs = body.get("coefs")
-
-        general_inputs = {item["name"]: {"min": float(item["min"]), "max": float(item["max"]), "units": item["units"]} for item in general_inputs}
-        outputs = {item["name"]: {"min": float(item["min"]), "max": float(item["max"]), "units": item["units"]} for item in outputs}
-
-        # Determine whether the request uses the new grouped structure or the
-        # legacy flat formulation_inputs list (which is treated as a single
-        # implicit group spanning all ingredients).
-        use_groups = raw_formulation_groups is not None
-        if use_groups:
-            normalized_groups = _normalize_formulation_groups(raw_formulation_groups)
-        elif legacy_formulation_inputs:
-            normalized_groups = _normalize_formulation_groups(
-                [
-                    {
-                        "name": "",
-                        "min": 0.0,
-                        "max": 1.0,
-                        "ingredients": legacy_formulation_inputs,
-                    }
-                ]
-            )
-        else:
-            normalized_groups = []
-
-        # Flatten ingredients (preserving group order) into the dict shape the
-        # dataset builder expects, plus a parallel (ingredient -> group name) map.
-        formulation_inputs: dict[str, dict] = {}
-        ingredient_group_names: list[str] = []
-        for group in normalized_groups:
-            for ingredient in group["ingredients"]:
-                formulation_inputs[ingredient["name"]] = {
-                    "min": ingredient["min"],
-                    "max": ingredient["max"],
-                    "units": ingredient["units"],
-                    "required": ingredient["required"],
+        value = float(num_rows) if isinstance(num_rows, str) else num_rows
+    except ValueError:
+        value = None
+    is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+    if not is_number or not 1 <= value <= MAX_DATASET_ROWS or value != int(value):
+        raise ValueError(f"num_rows must be an integer from 1 to {MAX_DATASET_ROWS:,} (provided: {num_rows!r}).")
+    return int(value)
+
+
+def _parse_generation_request(body: dict) -> dict[str, Any]:
+    """Validate a dataset-generator request body.
+
+    Returns the `build_synthetic_demo_dataset` keyword arguments (without ``num_rows``) under
+    ``"build_kwargs"``, plus ``num_rows``, ``seed``, ``formulation_inputs``, ``group_names`` and
+    ``ingredient_group_names``.
+    Raises ValueError for invalid requests.
+    """
+    general_inputs = body.get("general_inputs", [])
+    raw_formulation_groups = body.get("formulation_groups")
+    legacy_formulation_inputs = body.get("formulation_inputs", [])
+    outputs = body.get("outputs", [])
+    num_rows = _validate_num_rows(body.get("num_rows"))
+    noise = body.get("noise", 0.05)
+    output_format = body.get("output_format", "compact")
+    min_ingredients_per_formulation = body.get("min_ingredients_per_formulation")
+    max_ingredients_per_formulation = body.get("max_ingredients_per_formulation")
+    raw_coefs = body.get("coefs")
+    seed = _validate_seed(body.get("seed"))
+
+    general_inputs = {item["name"]: {"min": float(item["min"]), "max": float(item["max"]), "units": item["units"]} for item in general_inputs}
+    outputs = {item["name"]: {"min": float(item["min"]), "max": float(item["max"]), "units": item["units"]} for item in outputs}
+
+    # Determine whether the request uses the new grouped structure or the
+    # legacy flat formulation_inputs list (which is treated as a single
+    # implicit group spanning all ingredients).
+    use_groups = raw_formulation_groups is not None
+    if use_groups:
+        normalized_groups = _normalize_formulation_groups(raw_formulation_groups)
+    elif legacy_formulation_inputs:
+        normalized_groups = _normalize_formulation_groups(
+            [
+                {
+                    "name": "",
+                    "min": 0.0,
+                    "max": 1.0,
+                    "ingredients": legacy_formulation_inputs,
                 }
-                ingredient_group_names.append(group["name"])
+            ]
+        )
+    else:
+        normalized_groups = []
+
+    # Flatten ingredients (preserving group order) into the dict shape the
+    # dataset builder expects, plus a parallel (ingredient -> group name) map.
+    formulation_inputs: dict[str, dict] = {}
+    ingredient_group_names: list[str] = []
+    for group in normalized_groups:
+        for ingredient in group["ingredients"]:
+            formulation_inputs[ingredient["name"]] = {
+                "min": ingredient["min"],
+                "max": ingredient["max"],
+                "units": ingredient["units"],
+                "required": ingredient["required"],
+            }
+            ingredient_group_names.append(group["name"])
 
-        inputs = {
-            "general": general_inputs,
-            "formulation": formulation_inputs,
-        }
+    inputs = {
+        "general": general_inputs,
+        "formulation": formulation_inputs,
+    }
 
-        formulation_groups_for_builder = None
-        if formulation_inputs:
-            n_ingredients = len(formulation_inputs)
+    formulation_groups_for_builder = None
+    if formulation_inputs:
+        n_ingredients = len(formulation_inputs)
 
-            if use_groups:
-                default_global_min, default_global_max = _default_global_ingredient_counts(
-                    normalized_groups
-                )
-            else:
-                default_global_min = n_ingredients
-                default_global_max = n_ingredients
-
-            min_ingredients_per_formulation = (
-                int(min_ingredients_per_formulation)
-                if min_ingredients_per_formulation not in (None, "")
-                else default_global_min
+        if use_groups:
+            default_global_min, default_global_max = _default_global_ingredient_counts(
+                normalized_groups
             )
-            max_ingredients_per_formulation = (
-                int(max_ingredients_per_formulation)
-                if max_ingredients_per_formulation not in (None, "")
-                else default_global_max
+        else:
+            default_global_min = n_ingredients
+            default_global_max = n_ingredients
+
+        min_ingredients_per_formulation = (
+            int(min_ingredients_per_formulation)
+            if min_ingredients_per_formulation not in (None, "")
+            else default_global_min
+        )
+        max_ingredients_per_formulation = (
+            int(max_ingredients_per_formulation)
+            if max_ingredients_per_formulation not in (None, "")
+            else default_global_max
+        )
+
+        if use_groups:
+            _validate_formulation_groups(
+                normalized_groups,
+                min_ingredients_per_formulation,
+                max_ingredients_per_formulation,
+                n_ingredients,
             )
+            formulation_groups_for_builder = [
+                {
+                    "min": group["min"],
+                    "max": group["max"],
+                    "min_count": group["min_count"],
+                    "max_count": group["max_count"],
+                    "ingredients": [i["name"] for i in group["ingredients"]],
+                }
+                for group in normalized_groups
+            ]
+        else:
+            # Legacy single-group behaviour: reconcile global counts as before.
+            if min_ingredients_per_formulation < 1:
+                raise ValueError("min_ingredients_per_formulation must be at least 1.")
+            if min_ingredients_per_formulation > max_ingredients_per_formulation:
+                raise ValueError(
+                    f"min_ingredients_per_formulation (provided: {min_ingredients_per_formulation}) cannot be greater than max_ingredients_per_formulation (provided: {max_ingredients_per_formulation})."
+                )
+            if max_ingredients_per_formulation > n_ingredients:
+                raise ValueError(
+                    f"max_ingredients_per_formulation (provided: {max_ingredients_per_formulation}) cannot exceed n_ingredients (provided: {n_ingredients})."
+                )
 
-            if use_groups:
-                _validate_formulation_groups(
-                    normalized_groups,
-                    min_ingredients_per_formulation,
-                    max_ingredients_per_formulation,
-                    n_ingredients,
+            n_required = sum(1 for spec in formulation_inputs.values() if spec["required"])
+            if n_required > max_ingredients_per_formulation:
+                raise ValueError(
+                    f"Number of required ingredients ({n_required}) cannot exceed "
+                    f"max_ingredients_per_formulation ({max_ingredients_per_formulation})."
                 )
-                formulation_groups_for_builder = [
-                    {
-                        "min": group["min"],
-                        "max": group["max"],
-                        "min_count": group["min_count"],
-                        "max_count": group["max_count"],
-                        "ingredients": [i["name"] for i in group["ingredients"]],
-                    }
-                    for group in normalized_groups
-                ]
-            else:
-                # Legacy single-group behaviour: reconcile global counts as before.
-                if min_ingredients_per_formulation < 1:
-                    raise ValueError("min_ingredients_per_formulation must be at least 1.")
-                if min_ingredients_per_formulation > max_ingredients_per_formulation:
+            if min_ingredients_per_formulation < n_required:
+                min_ingredients_per_formulation = n_required
+            for name, spec in formulation_inputs.items():
+                if spec["required"] and spec["min"] <= 0:
                     raise ValueError(
-                        f"min_ingredients_per_formulation (provided: {min_ingredients_per_formulation}) cannot be greater than max_ingredients_per_formulation (provided: {max_ingredients_per_formulation})."
-                    )
-                if max_ingredients_per_formulation > n_ingredients:
-                    raise ValueError(
-                        f"max_ingredients_per_formulation (provided: {max_ingredients_per_formulation}) cannot exceed n_ingredients (provided: {n_ingredients})."
+                        f"Required formulation ingredient '{name}' must have a lower bound greater than 0."
                     )
+    else:
+        min_ingredients_per_formulation = None
+        max_ingredients_per_formulation = None
+
+    if output_format not in ("compact", "wide"):
+        raise ValueError("output_format must be either 'compact' or 'wide'.")
+
+    num_inputs = len(general_inputs) + len(formulation_inputs)
+    num_outputs = len(outputs)
+    coefs = _validate_coefs(raw_coefs, num_outputs, num_inputs)
+
+    return {
+        "build_kwargs": {
+            "inputs": inputs,
+            "outputs": outputs,
+            "noise": noise,
+            "coefs": coefs,
+            "output_format": output_format,
+            "min_ingredients_per_formulation": min_ingredients_per_formulation,
+            "max_ingredients_per_formulation": max_ingredients_per_formulation,
+            "formulation_groups": formulation_groups_for_builder,
+        },
+        "num_rows": num_rows,
+        "seed": seed,
+        "formulation_inputs": formulation_inputs,
+        "group_names": [group["name"] for group in normalized_groups],
+        "ingredient_group_names": ingredient_group_names,
+    }
+
+
+def _components_df(request: dict[str, Any]) -> pd.DataFrame:
+    formulation_inputs = request["formulation_inputs"]
+    return pd.DataFrame(
+        {
+            "id": list(formulation_inputs.keys()),
+            "Group": request["ingredient_group_names"],
+            "SMILES": [""] * len(formulation_inputs),
+        }
+    )
 
-                n_required = sum(1 for spec in formulation_inputs.values() if spec["required"])
-                if n_required > max_ingredients_per_formulation:
-                    raise ValueError(
-                        f"Number of required ingredients ({n_required}) cannot exceed "
-                        f"max_ingredients_per_formulation ({max_ingredients_per_formulation})."
-                    )
-                if min_ingredients_per_formulation < n_required:
-                    min_ingredients_per_formulation = n_required
-                for name, spec in formulation_inputs.items():
-                    if spec["required"] and spec["min"] <= 0:
-                        raise ValueError(
-                            f"Required formulation ingredient '{name}' must have a lower bound greater than 0."
-                        )
-        else:
-            min_ingredients_per_formulation = None
-            max_ingredients_per_formulation = None
-
-        if output_format not in ("compact", "wide"):
-            raise ValueError("output_format must be either 'compact' or 'wide'.")
-
-        num_inputs = len(general_inputs) + len(formulation_inputs)
-        num_outputs = len(outputs)
-        coefs = _validate_coefs(raw_coefs, num_outputs, num_inputs)
-
-        synthetic_demo_data_df, synthetic_demo_coefs_df = build_synthetic_demo_dataset(
-            inputs=inputs,
-            outputs=outputs,
-            num_rows=num_rows,
-            noise=noise,
-            coefs=coefs,
-            output_format=output_format,
-            min_ingredients_per_formulation=min_ingredients_per_formulation,
-            max_ingredients_per_formulation=max_ingredients_per_formulation,
-            formulation_groups=formulation_groups_for_builder,
+
+def _with_formulation_ids(data_df: pd.DataFrame, first_id: int = 1) -> pd.DataFrame:
+    data_df = data_df.reset_index(drop=True)
+    data_df.insert(0, "Formulation_ID", np.arange(first_id, first_id + len(data_df)))
+    return data_df
+
+
+def _dataset_chunks(request: dict[str, Any]) -> Iterator[pd.DataFrame]:
+    """The requested dataset, one shard (see `dataset_shards`) at a time, all with the same columns."""
+    build_kwargs = request["build_kwargs"]
+    columns = None
+    first_id = 1
+    for data_df in iter_dataset_shards(request["num_rows"], build_kwargs, seed=request["seed"]):
+        data_df = _with_formulation_ids(data_df, first_id=first_id)
+        first_id += len(data_df)
+        if columns is None:
+            columns = list(data_df.columns)
+            if build_kwargs["output_format"] == "compact" and request["formulation_inputs"]:
+                # A shard only has as many component columns as its largest formulation, so
+                # allow for the largest formulation possible.
+                max_components = build_kwargs["max_ingredients_per_formulation"] or len(request["formulation_inputs"])
+                columns = [col for col in columns if not col.startswith("component-")] + [
+                    f"component-{i}_{field}" for i in range(1, max_components + 1) for field in ("identifier", "amount")
+                ]
+        yield data_df.reindex(columns=columns)
+
+
+class _ZipSink(io.RawIOBase):
+    """A write-only (unseekable) file that buffers what `zipfile` writes until it's drained."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _stream_dataset_zip(request: dict[str, Any]) -> Iterator[bytes]:
+    """A zip of ``dataset.csv`` (and ``components.csv``, for formulations), written as the rows are generated.
+
+    The CSV is compressed at the fastest zlib level, as compression would otherwise take as long as
+    generating the rows.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        if request["formulation_inputs"]:
+            archive.writestr("components.csv", _components_df(request).to_csv(index=None))
+        with archive.open("dataset.csv", "w", force_zip64=True) as entry:
+            # Send the archive's first bytes before generating any rows.
+            yield sink.drain()
+            try:
+                for i, chunk in enumerate(_dataset_chunks(request)):
+                    entry.write(chunk.to_csv(index=None, header=i == 0).encode())
+                    yield sink.drain()
+            except Exception as e:
+                # The response has started, so the error can't be reported; the client gets a truncated archive.
+                logger.error(f"Streaming dataset generation failed: {e}")
+                raise
+    yield sink.drain()
+
+
+@router.post("/api/dataset-generator", response_model=None)
+@run_in_workload("generation")
+def get_synthetic_demo_dataset(body: dict = Body(...), stream: bool = False) -> dict[str, Any] | StreamingResponse:
+    """Generate a synthetic dataset as CSV strings in a JSON body.
+
+    The rows are drawn in shards on a process pool (see `dataset_shards`); requests with the same
+    ``seed`` get the same dataset. With ``stream=true``, the dataset is streamed as a zip of
+    ``dataset.csv`` and ``components.csv`` as the shards are drawn, so memory use doesn't grow with
+    ``num_rows``.
+    """
+    try:
+        request = _parse_generation_request(body)
+
+        if stream:
+            return StreamingResponse(
+                iterate_in_workload("generation", _stream_dataset_zip(request)),
+                media_type="application/zip",
+                headers={"Content-Disposition": 'attachment; filename="dataset.zip"'},
+            )
+
+        synthetic_demo_data_df = generate_dataset(
+            request["num_rows"], request["build_kwargs"], seed=request["seed"]
         )
-        synthetic_demo_data_df["Formulation_ID"] = synthetic_demo_data_df.index + 1
-        ordered_columns = ["Formulation_ID"] + [
-            col for col in synthetic_demo_data_df.columns if col != "Formulation_ID"
-        ]
-        synthetic_demo_data_df = synthetic_demo_data_df[ordered_columns]
+        synthetic_demo_data_df = _with_formulation_ids(synthetic_demo_data_df)
         csv_string = synthetic_demo_data_df.to_csv(index=None)
         response_payload: dict[str, Any] = {"csv_string": csv_string}
 
-        if formulation_inputs:
-            components_df = pd.DataFrame(
-                {
-                    "id": list(formulation_inputs.keys()),
-                    "Group": ingredient_group_names,
-                    "SMILES": [""] * len(formulation_inputs),
-                }
-            )
+        if request["formulation_inputs"]:
             response_payload["components_csv_string"] = (
-                components_df.to_csv(index=None)
+                _components_df(request).to_csv(index=None)
             )
 
         return response_payload
@@ -401,3 +525,37 @@ async def get_synthetic_demo_dataset(body: dict = Body(...)) -> dict[str, Any]:
     except Exception as e:
         logger.error(str(e))
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/dataset-generator/presolve")
+@run_in_workload("generation")
+def presolve_synthetic_demo_dataset(body: dict = Body(...)) -> dict[str, Any]:
+    """Check a dataset-generator request's formulation bounds without generating the dataset.
+
+    Returns the tightened bounds (see `formulation_presolve`) and the expected fraction of sampling
+    attempts that succeed. Bounds that can't be met get a 400 with the reason, as when generating.
+    """
+    try:
+        request = _parse_generation_request(body)
+        formulation_inputs = request["formulation_inputs"]
+        if not formulation_inputs:
+            return {"presolve": None, "acceptance_rate": 1.0}
+
+        build_kwargs = request["build_kwargs"]
+        presolve, acceptance_rate = estimate_formulation_acceptance_rate(
+            min_ingredients_per_formulation=build_kwargs["min_ingredients_per_formulation"],
+            max_ingredients_per_formulation=build_kwargs["max_ingredients_per_formulation"],
+            rng=np.random.default_rng(request["seed"]),
+            **formulation_sampler_kwargs(formulation_inputs, build_kwargs["formulation_groups"]),
+        )
+        return {
+            "presolve": presolve.to_dict(list(formulation_inputs), request["group_names"]),
+            "acceptance_rate": acceptance_rate,
+        }
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except Exception as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=500, detail=str(e))
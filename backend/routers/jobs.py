@@ -0,0 +1,44 @@
+from typing import Any
+
+import orjson
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, Response
+
+from jobs import Job, explainability_jobs
+from routers.plot_response import ORJSON_OPTIONS, encode_plot_payload
+from workloads import run_in_workload
+
+router = APIRouter()
+
+
+def job_response(job: Job) -> JSONResponse:
+    """`202 Accepted` pointing at the status endpoint of a submitted (or already existing) job."""
+    return JSONResponse(
+        status_code=202,
+        content={**job.to_dict(), "status_url": f"/api/jobs/{job.id}"},
+    )
+
+
+@router.get("/api/jobs/{job_id}")
+@run_in_workload("plotting")
+def get_job(job_id: str, typed_arrays: bool = False) -> Response:
+    """Status, progress (``done`` of ``total``) and ETA of a job, plus its ``result`` once it's done.
+
+    The result is encoded once per response format, so polling a finished job doesn't re-encode its figures.
+    """
+    job = explainability_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job '{job_id}'.")
+
+    payload: dict[str, Any] = job.to_dict()
+    status = orjson.dumps(payload, option=ORJSON_OPTIONS)
+    if payload["status"] != "done":
+        return Response(status, media_type="application/json")
+    result = job.encoded_result(typed_arrays, lambda result: encode_plot_payload(result, typed_arrays=typed_arrays))
+    return Response(status[:-1] + b',"result":' + result + b"}", media_type="application/json")
+
+
+@router.get("/api/job-stats")
+async def get_job_stats() -> dict[str, Any]:
+    """Number of explainability jobs by status (see `jobs.py`)."""
+    return {"explainability": explainability_jobs.stats()}
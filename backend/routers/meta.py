@@ -1,8 +1,11 @@
-from pathlib import Path
+from typing import Any
 
 from fastapi import APIRouter, status
 
-_BACKEND_DIR = Path(__file__).resolve().parent.parent
+from artifact_cache import artifact_cache
+from figure_cache import figure_cache
+from model_manifest import model_manifest
+from workloads import workload_stats
 
 router = APIRouter()
 
@@ -16,6 +19,18 @@ async def health_check() -> dict[str, str]:
     }
 
 
+@router.get("/api/cache-stats")
+async def get_cache_stats() -> dict[str, Any]:
+    """Hit/miss counters for the in-process model & dataset cache (see `artifact_cache.py`) and figure cache."""
+    return {"artifact_cache": artifact_cache.stats(), "figure_cache": figure_cache.stats()}
+
+
+@router.get("/api/workload-stats")
+async def get_workload_stats() -> dict[str, Any]:
+    """Queue depth, running count and wait times of each worker pool (see `workloads.py`)."""
+    return {"workloads": workload_stats()}
+
+
 ### Keeping models & datasets contained in the backend directory for the following reasons:
 # 1. Separation of Concerns: The frontend's public directory is meant for static assets that need to be directly served to the client (like images, fonts, etc.). ML models and datasets should be handled by your Python backend.
 # 2. Security: Keeping models in frontend/public means they're directly accessible to anyone who knows the URL. Moving them to the backend lets you control access through your API endpoints.
@@ -23,6 +38,5 @@ async def health_check() -> dict[str, str]:
 # 4. Maintainability: Your Python backend will be handling all the model loading and inference, so it makes more sense to keep the models close to the code that uses them.
 @router.get("/api/models")
 async def list_models() -> dict[str, list[str]]:
-    models_dir = _BACKEND_DIR / "models"
-    model_files = [f.name.split(".pkl")[0] for f in models_dir.glob("*.pkl")]
-    return {"models": model_files}
+    # Answered from the model manifest (see `model_manifest.py`) instead of re-globbing the directory.
+    return {"models": model_manifest.model_names()}
@@ -1,15 +1,25 @@
-import json
 import logging
-from typing import Any
 
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from fastapi import APIRouter, Body, HTTPException
+from fastapi.responses import Response
 from plotly.subplots import make_subplots
 
-from modeling import create_parity_plot, create_residual_plot
+from figure_cache import cached_figure
+from model_artifacts import get_model_evaluation
+from model_manifest import get_all_model_inputs, get_model_summary
+from modeling import create_parity_plot, create_residual_plot, scatter_render_mode
+from routers.plot_response import plot_response
+from scatter_aggregation import (
+    choose_aggregation,
+    create_aggregated_scatter_figure,
+    get_scatter_aggregate,
+    validate_aggregation_request,
+)
 from utils import get_dataset, get_dataset_name_from_model, get_model_and_metadata
+from workloads import run_in_workload
 
 logger = logging.getLogger(__name__)
 
@@ -17,42 +27,43 @@ router = APIRouter()
 
 
 @router.get("/api/overview/{model_name}")
-async def get_model_overview(model_name: str) -> dict[str, Any]:
+@run_in_workload("plotting")
+@cached_figure("overview")
+def get_model_overview(model_name: str, typed_arrays: bool = False) -> Response:
     try:
-        model_and_metadata = get_model_and_metadata(model_name)
+        # Metadata comes from the model manifest and the evaluation arrays from the model's
+        # `.eval.npz` sidecar, so no estimator is deserialized for this page.
+        model_summary = get_model_summary(model_name)
+        evaluation_by_output = get_model_evaluation(model_name)
         dataset_name = get_dataset_name_from_model(model_name)
         # dataset = get_dataset(dataset_name)
-        estimators_by_output = model_and_metadata["estimators_by_output"]
 
         serializable_estimators = {}
-        for output, data in estimators_by_output.items():
+        for output in model_summary["outputs"]:
+            data = evaluation_by_output[output]
 
             parity_plot_fig = create_parity_plot(data, title=f"Parity Plot - {output}", width=600, height=600)
-            parity_plot_json = json.loads(parity_plot_fig.to_json())
             residual_plot_fig = create_residual_plot(data, width=600, height=600)
-            residual_plot_json = json.loads(residual_plot_fig.to_json())
 
             serializable_estimators[output] = {
-                "inputs_numerical": data["inputs_numerical"],
+                "inputs_numerical": model_summary["inputs_by_output"][output],
 
-                # Get the type name as a string
-                # "estimator_type": type(data["estimator"]).__name__,
-                # If you want the full module path, use this instead:
-                "estimator_type": f"{type(data['estimator']).__module__}.{type(data['estimator']).__name__}",
+                # Full module path of the estimator's type, e.g. "sklearn.ensemble._forest.RandomForestRegressor"
+                "estimator_type": model_summary["estimator_types"][output],
 
-                "parity_plot_data": parity_plot_json,
-                "residual_plot_data": residual_plot_json,
+                "parity_plot_data": parity_plot_fig,
+                "residual_plot_data": residual_plot_fig,
             }
 
 
         model_overview_data = {
             "dataset_name": dataset_name,
-            "model_outputs": list(estimators_by_output.keys()),
+            "model_outputs": list(model_summary["outputs"]),
             "estimators_by_output": serializable_estimators,
             # "estimator_results_by_output":
         }
 
-        return model_overview_data
+        return plot_response(model_overview_data, typed_arrays=typed_arrays)
 
     except Exception as e:
         logger.error(str(e))  # Log the error
@@ -60,7 +71,9 @@ async def get_model_overview(model_name: str) -> dict[str, Any]:
 
 
 @router.post("/api/violin-plots/{model_name}")
-async def get_violin_plots(model_name: str, body: dict = Body(...)) -> dict[str, Any]:
+@run_in_workload("plotting")
+@cached_figure("violin-plots")
+def get_violin_plots(model_name: str, body: dict = Body(...), typed_arrays: bool = False) -> Response:
     box_plot_toggle = body.get("box_plot_toggle", [])
     data_points_toggle = body.get("data_points_toggle", [])
     page = body.get("page", 1)
@@ -69,11 +82,6 @@ async def get_violin_plots(model_name: str, body: dict = Body(...)) -> dict[str,
     try:
         model_and_metadata = get_model_and_metadata(model_name)
         dataset_name = get_dataset_name_from_model(model_name)
-        dataset = get_dataset(dataset_name)
-
-        # logger.debug(
-        #     f"Retrieved training dataset for model. [model_name={model_name}, dataset_name={dataset_name}]"
-        # )
 
         # TODO: eventually this needs to distinguish between real-valued outputs and categorical outputs
         outputs = list(model_and_metadata["estimators_by_output"].keys())
@@ -94,6 +102,9 @@ async def get_violin_plots(model_name: str, body: dict = Body(...)) -> dict[str,
         end_idx = start_idx + page_size
         variables_to_show = all_variables[start_idx:end_idx]
 
+        # Only read the columns shown on this page.
+        dataset = get_dataset(dataset_name, columns=variables_to_show)
+
         # Create figure with only the paginated variables
         fig = go.Figure()
         fig = make_subplots(rows=len(variables_to_show), cols=1)
@@ -115,11 +126,10 @@ async def get_violin_plots(model_name: str, body: dict = Body(...)) -> dict[str,
             )
 
         fig.update_layout(height=200 * len(variables_to_show))
-        plot_json = json.loads(fig.to_json())
-        return {
-            "plot_data": plot_json,
+        return plot_response({
+            "plot_data": fig,
             "total_variables": len(all_variables)  # Add total count for frontend pagination
-        }
+        }, typed_arrays=typed_arrays)
 
     except Exception as e:
         logger.error(str(e))
@@ -127,7 +137,9 @@ async def get_violin_plots(model_name: str, body: dict = Body(...)) -> dict[str,
 
 
 @router.get("/api/correlation-heatmap/{model_name}/{correlation_type}")
-async def get_correlation_heatmap(model_name: str, correlation_type: str) -> dict[str, Any]:
+@run_in_workload("plotting")
+@cached_figure("correlation-heatmap")
+def get_correlation_heatmap(model_name: str, correlation_type: str) -> Response:
 
     try:
         model_and_metadata = get_model_and_metadata(model_name)
@@ -138,13 +150,6 @@ async def get_correlation_heatmap(model_name: str, correlation_type: str) -> dic
         #     return px.imshow(my_df)
 
         dataset_name = get_dataset_name_from_model(model_name)
-        dataset = get_dataset(dataset_name)
-
-        train_df = dataset.copy()
-
-        # logger.debug(
-        #     f"Retrieved training dataset for model. [model_name={model_name}, dataset_name={dataset_name}]"
-        # )
 
         # TODO: eventually this needs to distinguish between real-valued outputs and categorical outputs
         outputs = list(model_and_metadata["estimators_by_output"].keys())
@@ -159,6 +164,9 @@ async def get_correlation_heatmap(model_name: str, correlation_type: str) -> dic
         inputs = list(all_estimator_inputs)
         # inputs_reals = inputs
 
+        dataset = get_dataset(dataset_name, columns=inputs + outputs_reals)
+        train_df = dataset.copy()
+
         img = None
 
         if correlation_type == "input-input":
@@ -189,9 +197,7 @@ async def get_correlation_heatmap(model_name: str, correlation_type: str) -> dic
             text_auto=True,
         )
 
-        plot_json = json.loads(fig.to_json())
-
-        return {"plot_data": plot_json}
+        return plot_response({"plot_data": fig})
 
     except Exception as e:
         logger.error(str(e))
@@ -201,14 +207,9 @@ async def get_correlation_heatmap(model_name: str, correlation_type: str) -> dic
 @router.get("/api/variable-options/{model_name}")
 async def get_variable_options(model_name: str) -> dict[str, list[str]]:
     try:
-        model_and_metadata = get_model_and_metadata(model_name=model_name)
-        outputs = list(model_and_metadata["estimators_by_output"].keys())
-        all_estimator_inputs = set()
-        for output in outputs:
-            all_estimator_inputs = all_estimator_inputs.union(
-                set(model_and_metadata["estimators_by_output"][output]["inputs_numerical"])
-            )
-        all_estimator_inputs = list(all_estimator_inputs)
+        model_summary = get_model_summary(model_name)
+        outputs = list(model_summary["outputs"])
+        all_estimator_inputs = get_all_model_inputs(model_summary)
         variable_options = all_estimator_inputs + outputs
         return {"variable_options": variable_options}
 
@@ -219,18 +220,29 @@ async def get_variable_options(model_name: str) -> dict[str, list[str]]:
 
 ### TODO: eventually, consider breaking these page-specific functions out into some other .py files?
 @router.post("/api/scatter-plots/{model_name}")
-async def get_scatter_plot(model_name: str, body: dict = Body(...)) -> dict[str, Any]:
+@run_in_workload("plotting")
+def get_scatter_plot(model_name: str, body: dict = Body(...), typed_arrays: bool = False) -> Response:
     selected_variables = body.get("selected_variables", [])
+    # "auto" aggregates datasets above `AGGREGATION_ROW_THRESHOLD` rows; see `scatter_aggregation.py`.
+    aggregation = body.get("aggregation", "auto")
+    resolution = body.get("resolution")
+    try:
+        validate_aggregation_request(aggregation, resolution, len(selected_variables))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     try:
         dataset_name = get_dataset_name_from_model(model_name)
-        dataset = get_dataset(dataset_name)
+        aggregation_method = None
+        if 1 <= len(selected_variables) <= 3:
+            dataset = get_dataset(dataset_name, columns=selected_variables)
+            aggregation_method = choose_aggregation(dataset, selected_variables, aggregation)
 
-        # logger.debug(
-        #     f"Retrieved training dataset for model. [model_name={model_name}, dataset_name={dataset_name}]"
-        # )
+        if aggregation_method is not None:
+            aggregate = get_scatter_aggregate(dataset_name, dataset, selected_variables, aggregation_method, resolution)
+            fig = create_aggregated_scatter_figure(aggregate, selected_variables)
 
-        if len(selected_variables) == 1:
+        elif len(selected_variables) == 1:
             fig = px.histogram(
                 dataset,
                 x=selected_variables[0],
@@ -242,6 +254,7 @@ async def get_scatter_plot(model_name: str, body: dict = Body(...)) -> dict[str,
                 dataset,
                 x=selected_variables[0],
                 y=selected_variables[1],
+                render_mode=scatter_render_mode(len(dataset)),
             )
 
         elif len(selected_variables) == 3:
@@ -259,9 +272,7 @@ async def get_scatter_plot(model_name: str, body: dict = Body(...)) -> dict[str,
             fig = pd.DataFrame([])
             fig = px.imshow(fig)
 
-        plot_json = json.loads(fig.to_json())
-
-        return {"plot_data": plot_json}
+        return plot_response({"plot_data": fig}, typed_arrays=typed_arrays)
 
     except Exception as e:
         logger.error(str(e))
@@ -271,13 +282,8 @@ async def get_scatter_plot(model_name: str, body: dict = Body(...)) -> dict[str,
 @router.get("/api/output-variable-options/{model_name}")
 async def get_output_variable_options(model_name: str) -> dict[str, list[str]]:
     try:
-        model_and_metadata = get_model_and_metadata(model_name=model_name)
-        outputs = list(model_and_metadata["estimators_by_output"].keys())
-        all_estimator_inputs = set()
-        for output in outputs:
-            all_estimator_inputs = all_estimator_inputs.union(
-                set(model_and_metadata["estimators_by_output"][output]["inputs_numerical"])
-            )
+        model_summary = get_model_summary(model_name)
+        outputs = list(model_summary["outputs"])
         return {"output_variable_options": outputs}
 
     except Exception as e:
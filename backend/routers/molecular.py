@@ -4,12 +4,15 @@ from typing import Any
 
 import pandas as pd
 from fastapi import APIRouter, Body, HTTPException
+from fastapi.responses import Response
 
 from molecule_viz import (
     create_plotly_molecular_space_map,
     process_molecular_space_map_data,
     smiles_to_base64,
 )
+from routers.plot_response import plot_response
+from workloads import run_in_workload
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +21,8 @@ router = APIRouter()
 
 ### TODO: finish this code!
 @router.post("/api/molecular-design/{model_name}")
-async def get_molecular_design_results(model_name: str) -> dict[str, Any]:
+@run_in_workload("molecular")
+def get_molecular_design_results(model_name: str) -> dict[str, Any]:
 
     print('calling backend function...')
 
@@ -49,7 +53,8 @@ async def get_molecular_design_results(model_name: str) -> dict[str, Any]:
 
 
 @router.post("/api/display-molecule-image")
-async def display_molecule_image(body: dict = Body(...)) -> dict[str, str]:
+@run_in_workload("molecular")
+def display_molecule_image(body: dict = Body(...)) -> dict[str, str]:
     smiles = body.get("smiles", [])
 
     print("selected point smiles...", smiles)
@@ -65,7 +70,8 @@ async def display_molecule_image(body: dict = Body(...)) -> dict[str, str]:
 
 ### TODO: finish this code!
 @router.post("/api/molecular-space-map/{model_name}")
-async def get_plotly_molecular_space_map(model_name: str, body: dict = Body(...)) -> dict[str, Any]:
+@run_in_workload("molecular")
+def get_plotly_molecular_space_map(model_name: str, body: dict = Body(...)) -> Response:
     """Create a Plotly molecular space map"""
     molgen_results_dict = body.get("molgen_results", [])
     # color_property = body.get("color_property", [])
@@ -90,9 +96,7 @@ async def get_plotly_molecular_space_map(model_name: str, body: dict = Body(...)
         molecular_space_map = create_plotly_molecular_space_map(molgen_results_df, color_property=default_color_prop)
         print('success!')
 
-        plot_json = json.loads(molecular_space_map.to_json())
-
-        return {"plot_data": plot_json}
+        return plot_response({"plot_data": molecular_space_map})
 
     except Exception as e:
         logger.error(str(e))
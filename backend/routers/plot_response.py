@@ -0,0 +1,170 @@
+"""
+Shared JSON response for endpoints that return Plotly figures.
+
+Handlers used to do `json.loads(fig.to_json())` and let FastAPI re-encode the resulting dicts,
+i.e. a full parse plus a full (slow, pure-Python) encode of every figure. Instead, handlers put
+the figure objects themselves into the usual response envelope:
+
+```python
+return plot_response({"plot_data": fig, "total_variables": len(all_variables)})
+```
+
+Each figure is serialized exactly once (with orjson, which handles NumPy arrays natively) and its
+bytes are spliced into the encoded envelope, so the JSON sent to the client is unchanged.
+
+With ``typed_arrays=True`` (opt-in, e.g. via a `?typed_arrays=true` query parameter), numeric trace
+arrays are sent as base64-encoded typed arrays in Plotly.js's `{"dtype", "bdata", "shape"}` format
+(supported since Plotly.js 2.28) instead of lists of decimal numbers, which is several times smaller
+and much faster for the browser to parse. Float64 data is sent as float32 when that loses no precision
+that matters for plotting (see `FLOAT32_RTOL`).
+"""
+
+import base64
+import secrets
+from typing import Any, Optional
+
+import numpy as np
+import orjson
+import plotly.io as pio
+from fastapi.responses import Response
+from plotly.basedatatypes import BaseFigure
+
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Arrays shorter than this are cheaper to send as plain JSON.
+MIN_TYPED_ARRAY_LENGTH = 16
+
+# Float64 arrays are sent as float32 if every value survives the cast within this relative tolerance
+# (i.e. it's in float32's range; float32 keeps ~7 significant digits, more than any plot or hover label shows).
+FLOAT32_RTOL = 1e-6
+
+# Plotly.js typed-array dtypes; there is no 64-bit integer type.
+_PLOTLYJS_DTYPES = {
+    np.dtype("int8"): "i1",
+    np.dtype("uint8"): "u1",
+    np.dtype("int16"): "i2",
+    np.dtype("uint16"): "u2",
+    np.dtype("int32"): "i4",
+    np.dtype("uint32"): "u4",
+    np.dtype("float32"): "f4",
+    np.dtype("float64"): "f8",
+}
+
+
+def _typed_array_dtype(array: np.ndarray) -> Optional[np.dtype]:
+    """The dtype to send ``array`` as, or None if it should stay a JSON list."""
+    if array.dtype.kind in "iu":
+        if array.dtype in _PLOTLYJS_DTYPES:
+            return array.dtype
+        # 64-bit integers: use the smallest dtype the values fit in.
+        low, high = array.min(), array.max()
+        for dtype in ("int8", "uint8", "int16", "uint16", "int32", "uint32"):
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return np.dtype(dtype)
+        return np.dtype("float64")
+    if array.dtype.kind == "f":
+        if array.dtype.itemsize <= 4:
+            return np.dtype("float32")
+        with np.errstate(over="ignore"):
+            as_float32 = array.astype(np.float32)
+        if np.allclose(as_float32, array, rtol=FLOAT32_RTOL, atol=0, equal_nan=True):
+            return np.dtype("float32")
+        return np.dtype("float64")
+    return None
+
+
+def to_typed_array(value: Any) -> Optional[dict[str, str]]:
+    """Convert a numeric array (NumPy array, or list/tuple of numbers) to a Plotly.js typed-array spec.
+
+    Returns None for anything that should stay as JSON (strings, dates, mixed or short arrays).
+    """
+    if not isinstance(value, np.ndarray):
+        if not value or isinstance(value[0], str):
+            return None
+        try:
+            value = np.asarray(value)
+        except ValueError:  # ragged nested lists
+            return None
+    if value.size < MIN_TYPED_ARRAY_LENGTH or value.dtype.kind == "b":
+        return None
+
+    dtype = _typed_array_dtype(value)
+    if dtype is None:
+        return None
+    data = np.ascontiguousarray(value, dtype=dtype.newbyteorder("<"))
+    spec = {"dtype": _PLOTLYJS_DTYPES[dtype], "bdata": base64.b64encode(data).decode("ascii")}
+    if data.ndim > 1:
+        spec["shape"] = ", ".join(str(size) for size in data.shape)
+    return spec
+
+
+def _encode_typed_arrays(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _encode_typed_arrays(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        spec = to_typed_array(value)
+        if spec is not None:
+            return spec
+        if not isinstance(value, np.ndarray):
+            return [_encode_typed_arrays(item) for item in value]
+    return value
+
+
+def figure_to_json_bytes(fig: BaseFigure, typed_arrays: bool = False) -> bytes:
+    if not typed_arrays:
+        return pio.to_json(fig, validate=False, engine="orjson").encode()
+    fig_dict = fig.to_plotly_json()
+    # Only trace data is converted; layout arrays (ranges, shapes, etc.) are tiny.
+    fig_dict["data"] = [_encode_typed_arrays(trace) for trace in fig_dict["data"]]
+    return pio.to_json(fig_dict, validate=False, engine="orjson").encode()
+
+
+def encode_plot_payload(payload: Any, typed_arrays: bool = False) -> bytes:
+    """Encode ``payload`` to JSON, serializing any Plotly figures nested in it (dicts/lists) only once."""
+    # Figures are swapped for unique placeholder strings while the envelope is encoded; the
+    # per-call nonce makes sure no string in the payload itself can collide with a placeholder.
+    placeholder_prefix = f"__plot_fragment_{secrets.token_hex(8)}_"
+    fragments: dict[bytes, bytes] = {}
+
+    def _swap_figures(value: Any) -> Any:
+        if isinstance(value, BaseFigure):
+            placeholder = f"{placeholder_prefix}{len(fragments)}"
+            fragments[f'"{placeholder}"'.encode()] = figure_to_json_bytes(value, typed_arrays)
+            return placeholder
+        if isinstance(value, dict):
+            return {key: _swap_figures(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [_swap_figures(item) for item in value]
+        return value
+
+    envelope = orjson.dumps(_swap_figures(payload), option=ORJSON_OPTIONS)
+    if not fragments:
+        return envelope
+
+    # Splice all fragments in a single pass over the envelope.
+    parts = []
+    position = 0
+    for placeholder, fragment in fragments.items():
+        start = envelope.index(placeholder, position)
+        parts.append(envelope[position:start])
+        parts.append(fragment)
+        position = start + len(placeholder)
+    parts.append(envelope[position:])
+    return b"".join(parts)
+
+
+class PlotJSONResponse(Response):
+    media_type = "application/json"
+
+    def __init__(self, content: Any, typed_arrays: bool = False, **kwargs: Any):
+        self.typed_arrays = typed_arrays
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return encode_plot_payload(content, typed_arrays=self.typed_arrays)
+
+
+def plot_response(payload: dict[str, Any], typed_arrays: bool = False) -> PlotJSONResponse:
+    return PlotJSONResponse(payload, typed_arrays=typed_arrays)
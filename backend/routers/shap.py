@@ -1,115 +1,161 @@
-import json
 import logging
-from typing import Any
+from typing import Any, Optional
 
-import matplotlib
-import matplotlib.pyplot as plt
-import plotly.express as px
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
 import shap
 from fastapi import APIRouter, Body, HTTPException
-from sklearn.ensemble import BaseEnsemble
-
-from utils import fig2img, get_dataset, get_dataset_name_from_model, get_model_and_metadata
+from fastapi.responses import Response
+
+from artifact_cache import file_fingerprint
+from explainers import ExplainFunction, estimate_seconds_per_row, get_explainer
+from jobs import JobProgress, explainability_jobs
+from model_manifest import get_model_summary
+from routers.jobs import job_response
+from routers.plot_response import plot_response
+from shap_interactions import (
+    compute_interactions,
+    create_interaction_heatmap,
+    estimate_interaction_seconds,
+    get_cached_interactions,
+    mean_abs_interactions,
+    top_interacting_pairs,
+)
+from shap_plots import create_shap_beeswarm_plot, create_shap_class_importance_plot, create_shap_waterfall_plot
+from shap_sampling import DEFAULT_TIME_BUDGET, SummaryRefinement, get_summary_refinement, schedule_refinement
+from shap_store import get_precomputed_explanation, get_shap_store
+from utils import get_dataset, get_dataset_name_from_model, get_dataset_path
+from workloads import run_in_workload
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# SHAP TreeExplainer cost scales with n_samples; Next.js dev rewrites default to a ~30s proxy timeout,
-# so large training sets otherwise cause ECONNRESET. Summary plots do not need every row. We've changed
-# the timeout limit in `next.config.mjs`, but still helpful to limit # of samples here to be safe.
-MAX_SHAP_SUMMARY_SAMPLES = 400
+def _get_explainer(model_name: str, selected_output: str, plot_name: str, pooled: bool = True) -> ExplainFunction:
+    # The backend (XGBoost, tree, linear or kernel SHAP) is picked from the estimator type; see `explainers.py`.
+    try:
+        return get_explainer(model_name, selected_output, pooled=pooled)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Unsupported model type for SHAP {plot_name} plots: {e}")
+
+
+def _explain(
+    model_name: str, selected_output: str, X: pd.DataFrame, plot_name: str, pooled: bool = True
+) -> shap.Explanation:
+    # Read from the precomputed SHAP store when it's current (see `shap_store.py`).
+    shap_values = get_precomputed_explanation(model_name, selected_output, X)
+    if shap_values is None:
+        shap_values = _get_explainer(model_name, selected_output, plot_name, pooled=pooled)(X)
+    return shap_values
+
+
+def _summary_payload(refinement: SummaryRefinement, inputs: list[str]) -> dict[str, Any]:
+    shap_values, _, X_explained, version = refinement.snapshot()
+
+    # Drawn natively with Plotly (see `shap_plots.py`), instead of rendering `shap.summary_plot` to an image.
+    if shap_values.ndim == 3:
+        fig = create_shap_class_importance_plot(shap_values, inputs)
+    else:
+        fig = create_shap_beeswarm_plot(shap_values, X_explained)
+
+    return {
+        "plot_data": fig,
+        "n_samples": len(X_explained),
+        "n_rows": len(refinement.X),
+        "version": version,
+        # From the snapshot, not `refinement.complete`: refinement may have finished since.
+        "complete": len(X_explained) >= refinement.n_target,
+    }
 
 
 @router.post("/api/shap-summary-plots/{model_name}")
-async def get_shap_summary_plot(model_name: str, body: dict = Body(...)) -> dict[str, Any]:
+@run_in_workload("explainability")
+def get_shap_summary_plot(
+    model_name: str, body: dict = Body(...), typed_arrays: bool = False, as_job: bool = False
+) -> Response:
+    """SHAP summary of a time-budgeted, representative sample of rows, refined in the background.
+
+    Clients poll (repeat the request) until ``complete``; each refinement bumps ``version``. With
+    ``as_job=true``, the complete summary is computed as a job instead (see `jobs.py`).
+    """
     try:
         selected_output = body.get("selected_output", [])
+        time_budget = float(body.get("time_budget", DEFAULT_TIME_BUDGET))
         print("selected output is...: ", selected_output)
 
-        model_and_metadata = get_model_and_metadata(model_name)
+        # The model itself is only unpickled if there are no precomputed SHAP values to read.
+        model_summary = get_model_summary(model_name)
         dataset_name = get_dataset_name_from_model(model_name)
-        dataset = get_dataset(dataset_name)
 
         # logger.debug(
         #     f"Retrieved training dataset for model. [model_name={model_name}, dataset_name={dataset_name}]"
         # )
 
-        estimators_by_output = model_and_metadata["estimators_by_output"]
-        estimator = estimators_by_output[selected_output]["estimator"]
-
         # TODO: eventually this needs to distinguish between real-valued outputs and categorical outputs
         # outputs = model_and_metadata["outputs_reals"]
         # outputs_reals = outputs
 
         # TODO: eventually this needs to distinguish between real-valued inputs and categorical inputs
-        inputs = estimators_by_output[selected_output]["inputs_numerical"]
+        inputs = model_summary["inputs_by_output"][selected_output]
         # inputs_reals = inputs
-
-        matplotlib.use("agg")
-        plt.figure()
-
-        ### TODO: need to add some code so this can auto-determine which Explainer to use based on the model type; if something is un-recognized, display an Error
-        ### TODO: clean this line of code up; can probably do it much more elegantly than this overly verbose code...?
-        est_type = str(type(estimator))
-        if (
-            isinstance(estimator, BaseEnsemble)
-            or "GBRegressor" in est_type
-            or "GBClassifier" in est_type
-            or "BoostRegressor" in est_type
-            or "BoostClassifier" in est_type
-        ):
-            explainer = shap.TreeExplainer(estimator)
-        ### TODO: write some code for handling torch Neural Networks (KernelExplainer)
-        # elif:
-        # else:
-            # try:
-                # explainer = shap.KernelExplainer(predict_fn, background)
-            # except:
-
-        ### TODO: write some code for LinearExplainer... or will KernelExplainer work for linear models...?
-        # elif:
-        ### SOMEDAY: write some code for handling "everything else"... if model is un-recognized, display an Error.
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail="Unsupported model type for SHAP summary plots (TreeExplainer).",
-            )
-
+        dataset = get_dataset(dataset_name, columns=inputs)
         X = dataset[inputs]
-        if len(X) > MAX_SHAP_SUMMARY_SAMPLES:
-            X = X.sample(n=MAX_SHAP_SUMMARY_SAMPLES, random_state=42)
-        shap_values = explainer(X)
-        fig = shap.summary_plot(
-            shap_values,
-            features=X,
-            feature_names=inputs,
-            plot_size=(12, 8),
-            show=False,
+
+        # SHAP cost scales with the number of rows, and the frontend proxy times out long requests;
+        # the first response explains as many representative rows as fit in `time_budget` (see `shap_sampling.py`).
+        version_key = (model_summary["content_hash"], file_fingerprint(get_dataset_path(dataset_name)))
+        store = get_shap_store(model_name)
+        # Without precomputed values, the explainer backend's cost model sizes the first sample.
+        seconds_per_row = None
+        if store is None or selected_output not in store.outputs:
+            try:
+                seconds_per_row = estimate_seconds_per_row(model_name, selected_output)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Unsupported model type for SHAP summary plots: {e}")
+        refinement = get_summary_refinement(
+            model_name,
+            selected_output,
+            version_key,
+            X,
+            lambda X_rows: _explain(model_name, selected_output, X_rows, "summary"),
+            seconds_per_row=seconds_per_row,
+            background_explain=lambda X_rows: _explain(model_name, selected_output, X_rows, "summary", pooled=False),
         )
-        fig = plt.gcf()
-        fig = px.imshow(fig2img(fig, dpi=200))
-        fig.update_layout(
-            showlegend=False,
-            xaxis=dict(visible=False),
-            yaxis=dict(visible=False),
-            hovermode=False,
+        if as_job:
+
+            def _complete_summary(progress: JobProgress) -> dict[str, Any]:
+                refinement.start(time_budget)
+                progress.update(refinement.n_done, refinement.n_target)
+                while refinement.refine_step(time_budget):
+                    progress.update(refinement.n_done, refinement.n_target)
+                progress.update(refinement.n_done, refinement.n_target)
+                return _summary_payload(refinement, inputs)
+
+            job = explainability_jobs.submit(("shap-summary", model_name, selected_output, version_key), _complete_summary)
+            return job_response(job)
+
+        refinement.start(time_budget)
+        schedule_refinement(refinement, time_budget)
+        return plot_response(
+            _summary_payload(refinement, inputs),
+            typed_arrays=typed_arrays,
         )
 
-        plot_json = json.loads(fig.to_json())
-
-        return {"plot_data": plot_json}
-
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/api/sample-options/{model_name}")
-async def get_sample_options(model_name: str) -> dict[str, list[str]]:
+@run_in_workload("plotting")
+def get_sample_options(model_name: str) -> dict[str, list[str]]:
     try:
         dataset_name = get_dataset_name_from_model(model_name)
-        dataset = get_dataset(dataset_name)
+        # Only the index is needed here, so don't read any columns.
+        dataset = get_dataset(dataset_name, columns=[])
 
         dataset_sample_index_options = dataset.index.tolist()
         dataset_sample_index_options = [str(item) for item in dataset_sample_index_options]
@@ -121,83 +167,188 @@ async def get_sample_options(model_name: str) -> dict[str, list[str]]:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/api/shap-waterfall-plots/{model_name}")
-async def get_shap_waterfall_plot(model_name: str, body: dict = Body(...)) -> dict[str, Any]:
-    try:
-        selected_output = body.get("selected_output", [])
-        selected_sample = body.get("selected_sample", [])
+# Most waterfalls one batch request may ask for.
+MAX_SHAP_WATERFALL_SAMPLES = 50
+# Waterfall jobs explain (and report progress) this many samples at a time.
+WATERFALL_JOB_CHUNK_ROWS = 5
 
-        # TODO: someday, get this to not require the selected sample to be referred to by an integer value?
-        selected_sample = int(selected_sample[0])
 
-        model_and_metadata = get_model_and_metadata(model_name)
-        dataset_name = get_dataset_name_from_model(model_name)
-        dataset = get_dataset(dataset_name)
+def _sample_inputs(model_name: str, selected_output: str) -> pd.DataFrame:
+    """Inputs of ``selected_output`` for every dataset row."""
+    # The model itself is only unpickled if there are no precomputed SHAP values to read.
+    model_summary = get_model_summary(model_name)
+    dataset_name = get_dataset_name_from_model(model_name)
 
-        # logger.debug(
-        #     f"Retrieved training dataset for model. [model_name={model_name}, dataset_name={dataset_name}]"
-        # )
+    # TODO: eventually this needs to distinguish between real-valued inputs and categorical inputs
+    inputs = model_summary["inputs_by_output"][selected_output]
+    return get_dataset(dataset_name, columns=inputs)[inputs]
 
-        estimators_by_output = model_and_metadata["estimators_by_output"]
-        estimator = estimators_by_output[selected_output]["estimator"]
 
-        # TODO: eventually this needs to distinguish between real-valued outputs and categorical outputs
-        # outputs = model_and_metadata["outputs_reals"]
-        # outputs_reals = outputs
+def _sample_rows(model_name: str, selected_output: str, sample_ids: list[str]) -> pd.DataFrame:
+    """Inputs of ``selected_output`` for the dataset rows labelled ``sample_ids`` (index labels, as strings)."""
+    X = _sample_inputs(model_name, selected_output)
+
+    # Samples are looked up by index label (as listed by `/api/sample-options`), not by position.
+    rows = X.index.astype(str).get_indexer([str(sample_id) for sample_id in sample_ids])
+    if (rows < 0).any():
+        missing = [str(sample_id) for sample_id, row in zip(sample_ids, rows) if row < 0]
+        raise HTTPException(status_code=404, detail=f"Unknown sample(s): {', '.join(missing)}")
+    return X.iloc[rows]
 
-        # TODO: eventually this needs to distinguish between real-valued inputs and categorical inputs
-        inputs = estimators_by_output[selected_output]["inputs_numerical"]
-        # inputs_reals = inputs
 
-        matplotlib.use("agg")
-        plt.figure()
-
-        ### TODO: need to add some code so this can auto-determine which Explainer to use based on the model type; if something is un-recognized, display an Error
-        ### TODO: clean this line of code up; can probably do it much more elegantly than this overly verbose code...?
-        est_type = str(type(estimator))
-        if (
-            isinstance(estimator, BaseEnsemble)
-            or "GBRegressor" in est_type
-            or "GBClassifier" in est_type
-            or "BoostRegressor" in est_type
-            or "BoostClassifier" in est_type
-        ):
-            explainer = shap.TreeExplainer(estimator)
-        ### TODO: write some code for handling torch Neural Networks (KernelExplainer)
-        # elif:
-        ### TODO: write some code for LinearExplainer... or will KernelExplainer work for linear models...?
-        # elif:
-        ### SOMEDAY: write some code for handling "everything else"... if model is un-recognized, display an Error.
-        # else:
+def _waterfall_figure(shap_values: shap.Explanation, X: pd.DataFrame, row: int) -> go.Figure:
+    values = np.asarray(shap_values.values[row])
+    base_values = np.asarray(shap_values.base_values[row])
+    title = f"SHAP Waterfall Plot (sample {X.index[row]})"
+    if values.ndim == 2:
+        # Classifiers have one explanation per class; show the predicted (highest-scoring) class.
+        predicted_class = int(np.argmax(base_values + values.sum(axis=0)))
+        values, base_values = values[:, predicted_class], base_values[predicted_class]
+        title = f"SHAP Waterfall Plot (sample {X.index[row]}, class {predicted_class})"
+    return create_shap_waterfall_plot(values, base_values, X.iloc[row].to_numpy(), list(X.columns), title=title)
 
 
+@router.post("/api/shap-waterfall-plots/{model_name}")
+@run_in_workload("explainability")
+def get_shap_waterfall_plot(model_name: str, body: dict = Body(...)) -> Response:
+    """Waterfall of one sample: ``selected_sample`` is its row position (``[position]``), or ``sample_id``
+    its index label (as listed by `/api/sample-options`, and as taken by the batch endpoint)."""
+    try:
+        selected_output = body.get("selected_output", [])
+
+        if "sample_id" in body:
+            X_one = _sample_rows(model_name, selected_output, [body["sample_id"]])
         else:
+            position = int(body.get("selected_sample", [])[0])
+            X = _sample_inputs(model_name, selected_output)
+            if not 0 <= position < len(X):
+                raise HTTPException(status_code=404, detail=f"Unknown sample position: {position}")
+            X_one = X.iloc[[position]]
+        # With a current precomputed SHAP store (see `shap_store.py`), this is just a row slice.
+        shap_values = _explain(model_name, selected_output, X_one, "waterfall")
+        return plot_response({"plot_data": _waterfall_figure(shap_values, X_one, 0)})
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(str(e))  # Log the error with function name
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/shap-waterfall-plots/{model_name}/batch")
+@run_in_workload("explainability")
+def get_shap_waterfall_plots(
+    model_name: str, body: dict = Body(...), typed_arrays: bool = False, as_job: bool = False
+) -> Response:
+    """Waterfalls of several samples (``sample_ids``, by index label) from a single explainer pass.
+
+    With ``as_job=true``, samples are explained in chunks as a job instead (see `jobs.py`).
+    """
+    try:
+        selected_output = body.get("selected_output", [])
+        sample_ids = [str(sample_id) for sample_id in body.get("sample_ids", [])]
+        if not sample_ids:
+            raise HTTPException(status_code=400, detail="No samples selected.")
+        if len(sample_ids) > MAX_SHAP_WATERFALL_SAMPLES:
             raise HTTPException(
                 status_code=400,
-                detail="Unsupported model type for SHAP waterfall plots (TreeExplainer).",
+                detail=f"At most {MAX_SHAP_WATERFALL_SAMPLES} samples can be compared at once.",
             )
 
-        X_one = dataset[inputs].iloc[[selected_sample]]
-        shap_values = explainer(X_one)
+        X = _sample_rows(model_name, selected_output, sample_ids)
+
+        def _waterfalls(progress: Optional[JobProgress] = None) -> dict[str, Any]:
+            chunk_rows = WATERFALL_JOB_CHUNK_ROWS if progress is not None else len(X)
+            plots = []
+            for start in range(0, len(X), chunk_rows):
+                X_chunk = X.iloc[start : start + chunk_rows]
+                shap_values = _explain(model_name, selected_output, X_chunk, "waterfall")
+                plots += [
+                    {"sample_id": sample_ids[start + row], "plot_data": _waterfall_figure(shap_values, X_chunk, row)}
+                    for row in range(len(X_chunk))
+                ]
+                if progress is not None:
+                    progress.update(len(plots), len(X))
+            return {"plots": plots}
+
+        if as_job:
+            version_key = (
+                get_model_summary(model_name)["content_hash"],
+                file_fingerprint(get_dataset_path(get_dataset_name_from_model(model_name))),
+                selected_output,
+                tuple(sample_ids),
+            )
+            return job_response(explainability_jobs.submit(("shap-waterfall", model_name, version_key), _waterfalls))
+        return plot_response(_waterfalls(), typed_arrays=typed_arrays)
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=500, detail=str(e))
 
-        fig = shap.waterfall_plot(
-            shap_values[0],
-        )
-        fig = plt.gcf()
-
-        fig = px.imshow(fig2img(fig, dpi=150, bbox_inches="tight"))
-        fig.update_layout(
-            showlegend=False,
-            xaxis=dict(visible=False),
-            yaxis=dict(visible=False),
-            hovermode=False,
-        )
 
-        plot_json = json.loads(fig.to_json())
+def _interaction_payload(interactions: dict[str, Any], include_main_effects: bool) -> dict[str, Any]:
+    mean_abs = mean_abs_interactions(interactions["values"])
+    return {
+        "plot_data": create_interaction_heatmap(mean_abs, interactions["inputs"], include_main_effects),
+        "top_pairs": top_interacting_pairs(mean_abs, interactions["inputs"]),
+        "n_rows": len(interactions["index"]),
+    }
 
-        return {"plot_data": plot_json}
 
+@router.get("/api/shap-interaction-cost/{model_name}")
+@run_in_workload("explainability")
+def get_shap_interaction_cost(model_name: str, selected_output: str) -> dict[str, Any]:
+    """Estimated time to compute ``selected_output``'s SHAP interaction values, and whether they're cached."""
+    try:
+        return estimate_interaction_seconds(model_name, selected_output)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(str(e))  # Log the error with function name
+        logger.error(str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/shap-interaction-plots/{model_name}")
+@run_in_workload("explainability")
+def get_shap_interaction_plot(model_name: str, body: dict = Body(...), typed_arrays: bool = False) -> Response:
+    """Heatmap of mean |SHAP interaction value| per feature pair, plus the most strongly interacting pairs.
+
+    Served from the on-disk cache when it's current; otherwise the interaction values are computed as
+    a job (see `jobs.py`) and this returns `202` with the job id.
+    """
+    try:
+        selected_output = body.get("selected_output", [])
+        include_main_effects = bool(body.get("include_main_effects", False))
+
+        interactions = get_cached_interactions(model_name, selected_output)
+        if interactions is not None:
+            return plot_response(_interaction_payload(interactions, include_main_effects), typed_arrays=typed_arrays)
+
+        # Check the model is supported before queueing anything.
+        estimate_interaction_seconds(model_name, selected_output)
+
+        def _compute(progress: JobProgress) -> dict[str, Any]:
+            interactions = compute_interactions(model_name, selected_output, progress=progress.update)
+            return _interaction_payload(interactions, include_main_effects)
+
+        # `include_main_effects` only changes the rendering; the interaction values are computed once for both
+        # (see `compute_interactions`).
+        key = (
+            "shap-interactions",
+            model_name,
+            get_model_summary(model_name)["content_hash"],
+            file_fingerprint(get_dataset_path(get_dataset_name_from_model(model_name))),
+            selected_output,
+            include_main_effects,
+        )
+        return job_response(explainability_jobs.submit(key, _compute))
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(str(e))
         raise HTTPException(status_code=500, detail=str(e))
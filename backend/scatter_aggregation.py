@@ -0,0 +1,241 @@
+"""
+Server-side aggregation for the Scatter Plots page on large datasets.
+
+Above `AGGREGATION_ROW_THRESHOLD` rows, sending every point to the browser produces huge responses
+and freezes the page, so `get_scatter_plot` switches to one of these representations:
+- "bin": a binned histogram (1 variable, without the per-point rug), a 2D grid of counts rendered
+  as a heatmap (2 variables), or voxel counts rendered as sized/colored markers (3 variables);
+- "decimate": a density-preserving subsample of the points (2-3 variables), which keeps isolated
+  points/outliers visible.
+
+Aggregates are computed with vectorized NumPy and cached in the artifact cache per
+(dataset, variables, method, resolution); they're invalidated together with the dataset file.
+"""
+
+import os
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from artifact_cache import artifact_cache
+from modeling import scatter_render_mode
+from utils import get_dataset_path
+
+
+AGGREGATION_ROW_THRESHOLD = 50_000
+AGGREGATION_METHODS = ("auto", "none", "bin", "decimate")
+
+# Default bins per axis, by number of variables.
+DEFAULT_BIN_RESOLUTION = {1: 200, 2: 200, 3: 40}
+# Decimation stratifies points on a grid with this many cells per axis...
+DEFAULT_DECIMATION_RESOLUTION = 100
+# ...and keeps roughly this many points in total.
+MAX_DECIMATED_POINTS = 20_000
+# Allowed requested resolutions (cells per axis), by number of variables: a 3D grid has resolution³ cells.
+MIN_RESOLUTION = 10
+MAX_RESOLUTION = {1: 500, 2: 500, 3: 100}
+
+
+def validate_aggregation_request(aggregation: Any, resolution: Any, n_variables: int) -> None:
+    """Raise ValueError unless ``aggregation`` is a known method and ``resolution`` (if given) is an
+    integer number of cells per axis within the bounds for ``n_variables`` variables."""
+    if aggregation not in AGGREGATION_METHODS:
+        raise ValueError(f"Unknown aggregation '{aggregation}'; expected one of {AGGREGATION_METHODS}.")
+    if resolution is None or not 1 <= n_variables <= 3:
+        return
+    max_resolution = MAX_RESOLUTION[n_variables]
+    is_int = isinstance(resolution, int) and not isinstance(resolution, bool)
+    if not is_int or not MIN_RESOLUTION <= resolution <= max_resolution:
+        raise ValueError(
+            f"resolution must be an integer from {MIN_RESOLUTION} to {max_resolution} for {n_variables} "
+            f"variable(s) (provided: {resolution!r})."
+        )
+
+
+def choose_aggregation(dataset: pd.DataFrame, variables: list[str], requested: str = "auto") -> Optional[str]:
+    """Aggregation method to use for plotting ``variables`` of ``dataset``, or None to plot every point."""
+    if requested not in AGGREGATION_METHODS:
+        raise ValueError(f"Unknown aggregation '{requested}'; expected one of {AGGREGATION_METHODS}.")
+    if requested == "none" or not 1 <= len(variables) <= 3:
+        return None
+    if requested == "auto" and len(dataset) <= AGGREGATION_ROW_THRESHOLD:
+        return None
+
+    numeric = all(pd.api.types.is_numeric_dtype(dataset[variable]) for variable in variables)
+    if len(variables) == 1:
+        # A histogram is already an aggregate; there's nothing to decimate for a single variable.
+        return "bin" if numeric else None
+    if requested == "decimate" or not numeric:
+        return "decimate"
+    return "bin"
+
+
+def _numeric_values(dataset: pd.DataFrame, variables: list[str]) -> np.ndarray:
+    """(n_rows, n_variables) float array of the selected variables, without rows containing NaNs."""
+    values = dataset[variables].to_numpy(dtype=float)
+    return values[np.isfinite(values).all(axis=1)]
+
+
+def _grid_cells(values: np.ndarray, resolution: int) -> np.ndarray:
+    """Flat index of the grid cell (``resolution`` cells per axis) that each row of ``values`` falls in."""
+    low = values.min(axis=0)
+    span = values.max(axis=0) - low
+    span[span == 0] = 1.0
+    bins = np.clip(((values - low) / span * resolution).astype(np.int64), 0, resolution - 1)
+    return np.ravel_multi_index(bins.T, (resolution,) * values.shape[1])
+
+
+def decimate_points(values: np.ndarray, max_points: int, resolution: int, seed: int = 0) -> np.ndarray:
+    """Indices of a density-preserving subsample of ``values`` (about ``max_points`` rows).
+
+    Rows are stratified on a grid; each occupied cell keeps a share of its points proportional to
+    its count (so the point density is preserved), but at least one, so sparse regions and outliers
+    don't disappear.
+    """
+    n_rows = len(values)
+    if n_rows <= max_points:
+        return np.arange(n_rows)
+
+    cells = _grid_cells(values, resolution)
+    _, cell_of_row, counts = np.unique(cells, return_inverse=True, return_counts=True)
+    quota = np.maximum(1, (counts * max_points) // n_rows)
+
+    # Order rows by cell and randomly within each cell, then keep the first `quota` of each cell.
+    rng = np.random.default_rng(seed)
+    order = np.argsort(cell_of_row + rng.random(n_rows))
+    cell_starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank_in_cell = np.empty(n_rows, dtype=np.int64)
+    rank_in_cell[order] = np.arange(n_rows) - cell_starts[cell_of_row[order]]
+    return np.sort(np.flatnonzero(rank_in_cell < quota[cell_of_row]))
+
+
+def bin_points(values: np.ndarray, resolution: int) -> dict[str, np.ndarray]:
+    """Counts of ``values`` on a regular grid with ``resolution`` bins per axis.
+
+    Returns the bin ``centers`` of each axis and the ``counts`` array; for 3 variables only the
+    occupied voxels are returned (``centers`` then holds one coordinate array per axis).
+    """
+    counts, edges = np.histogramdd(values, bins=resolution)
+    centers = [(edge[:-1] + edge[1:]) / 2 for edge in edges]
+    if values.shape[1] < 3:
+        return {"counts": counts, "centers": centers, "widths": [np.diff(edge) for edge in edges]}
+
+    occupied = np.nonzero(counts)
+    return {
+        "counts": counts[occupied],
+        "centers": [axis_centers[index] for axis_centers, index in zip(centers, occupied)],
+        "widths": [np.diff(edge) for edge in edges],
+    }
+
+
+def compute_scatter_aggregate(
+    dataset: pd.DataFrame, variables: list[str], method: str, resolution: int
+) -> dict[str, Any]:
+    n_rows = len(dataset)
+    if method == "decimate":
+        # Categorical variables are stratified by category.
+        codes = {
+            variable: dataset[variable] if pd.api.types.is_numeric_dtype(dataset[variable])
+            else pd.Series(pd.factorize(dataset[variable])[0], index=dataset.index)
+            for variable in variables
+        }
+        values = pd.DataFrame(codes).to_numpy(dtype=float)
+        # Rows with missing values aren't plotted anyway.
+        plotted_rows = np.flatnonzero(np.isfinite(values).all(axis=1))
+        rows = plotted_rows[decimate_points(values[plotted_rows], MAX_DECIMATED_POINTS, resolution)]
+        return {"method": method, "n_rows": n_rows, "sample": dataset.iloc[rows][variables]}
+
+    return {"method": method, "n_rows": n_rows, **bin_points(_numeric_values(dataset, variables), resolution)}
+
+
+def _aggregate_nbytes(aggregate: dict[str, Any], stamp: tuple[int, int]) -> int:
+    if "sample" in aggregate:
+        return int(aggregate["sample"].memory_usage(deep=True).sum())
+    arrays = [aggregate["counts"], *aggregate["centers"], *aggregate["widths"]]
+    return int(sum(array.nbytes for array in arrays))
+
+
+def get_scatter_aggregate(
+    dataset_name: str, dataset: pd.DataFrame, variables: list[str], method: str, resolution: Optional[int] = None
+) -> dict[str, Any]:
+    """Aggregate of ``dataset`` (the ``variables`` columns of ``dataset_name``), cached per dataset file."""
+    if resolution is None:
+        resolution = DEFAULT_DECIMATION_RESOLUTION if method == "decimate" else DEFAULT_BIN_RESOLUTION[len(variables)]
+
+    def _compute(path: str) -> dict[str, Any]:
+        return compute_scatter_aggregate(dataset, variables, method, resolution)
+
+    dataset_path = get_dataset_path(dataset_name)
+    if not os.path.exists(dataset_path):
+        return _compute(dataset_path)
+    return artifact_cache.get(
+        dataset_path,
+        _compute,
+        variant=("scatter-aggregate", tuple(variables), method, resolution),
+        sizeof=_aggregate_nbytes,
+    )
+
+
+def create_aggregated_scatter_figure(aggregate: dict[str, Any], variables: list[str]) -> go.Figure:
+    """Plotly figure for an aggregate returned by `get_scatter_aggregate`."""
+    n_rows = aggregate["n_rows"]
+
+    if aggregate["method"] == "decimate":
+        sample = aggregate["sample"]
+        title = f"Showing {len(sample):,} of {n_rows:,} points (density-preserving subsample)"
+        if len(variables) == 2:
+            fig = px.scatter(
+                sample, x=variables[0], y=variables[1], title=title, render_mode=scatter_render_mode(len(sample))
+            )
+        else:
+            fig = px.scatter_3d(sample, x=variables[0], y=variables[1], z=variables[2], title=title)
+            fig.update_layout(margin=dict(r=0, l=0, b=0, t=40))
+        return fig
+
+    counts = aggregate["counts"]
+    centers = aggregate["centers"]
+    if len(variables) == 1:
+        fig = go.Figure(go.Bar(x=centers[0], y=counts, width=aggregate["widths"][0], name=variables[0]))
+        fig.update_layout(bargap=0, xaxis_title=variables[0], yaxis_title="count")
+        title = f"{n_rows:,} points in {len(counts)} bins"
+
+    elif len(variables) == 2:
+        # Empty cells are left transparent.
+        z = np.where(counts > 0, counts, np.nan).T
+        fig = go.Figure(
+            go.Heatmap(
+                x=centers[0], y=centers[1], z=z,
+                colorscale="Viridis", colorbar=dict(title="count"),
+                hovertemplate=f"{variables[0]}: %{{x}}<br>{variables[1]}: %{{y}}<br>count: %{{z}}<extra></extra>",
+            )
+        )
+        fig.update_layout(xaxis_title=variables[0], yaxis_title=variables[1])
+        title = f"{n_rows:,} points binned on a {len(centers[0])}×{len(centers[1])} grid"
+
+    else:
+        fig = go.Figure(
+            go.Scatter3d(
+                x=centers[0], y=centers[1], z=centers[2],
+                mode="markers",
+                marker=dict(
+                    size=3 + 9 * np.sqrt(counts / max(counts.max(initial=0), 1)),
+                    color=counts,
+                    colorscale="Viridis",
+                    colorbar=dict(title="count"),
+                    opacity=0.8,
+                ),
+                customdata=counts,
+                hovertemplate="count: %{customdata}<extra></extra>",
+            )
+        )
+        fig.update_layout(
+            scene=dict(xaxis_title=variables[0], yaxis_title=variables[1], zaxis_title=variables[2]),
+            margin=dict(r=0, l=0, b=0, t=40),
+        )
+        title = f"{n_rows:,} points in {len(counts):,} occupied voxels"
+
+    fig.update_layout(title=title)
+    return fig
@@ -0,0 +1,231 @@
+"""
+SHAP interaction values: which pairs of inputs (e.g. formulation ingredients) interact.
+
+Interaction values cost about as much as SHAP values times the number of features per row, far too
+slow to compute inline. So:
+- `estimate_interaction_seconds` predicts the cost first, from the explainer backend's cost model
+  (see `explainers.py`);
+- `compute_interactions` explains rows in chunks, reporting progress after each, over the
+  whole dataset or (above `MAX_INTERACTION_ROWS` rows) a representative subset of it;
+- the (rows x features x features) tensor is symmetric, so only its upper triangle is cached, as
+  float32, in `models/{model-name}.{output-index}.shap-interactions.npz`; the file records the
+  model's content hash and the dataset's hash, and is ignored once either changes;
+- `create_interaction_heatmap` plots the mean |interaction value| of every pair of features.
+
+Only the tree backends ("xgboost", via `pred_interactions`, and "tree") support interaction values.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from artifact_cache import artifact_cache, file_fingerprint
+from explainers import explainer_backend, get_tree_explainer
+from model_artifacts import MODELS_DIR
+from model_manifest import get_model_summary
+from shap_sampling import representative_rows
+from utils import get_dataset, get_dataset_path, get_model_and_metadata
+
+MAX_INTERACTION_ROWS = int(os.environ.get("SHAP_INTERACTION_MAX_ROWS", 1000))
+INTERACTION_CHUNK_ROWS = 25
+# Interaction values cost about this many times the SHAP values, per feature (measured on sklearn forests).
+INTERACTION_COST_FACTOR = 1.7
+INTERACTION_BACKENDS = ("xgboost", "tree")
+TOP_PAIRS = 10
+
+# Per-(model, output) locks, so each output's interaction values are computed by one caller at a time.
+_computing: dict[tuple[str, str], threading.Lock] = {}
+_computing_lock = threading.Lock()
+
+
+def interactions_path(model_name: str, output: str) -> str:
+    output_index = get_model_summary(model_name)["outputs"].index(output)
+    return os.path.join(MODELS_DIR, f"{model_name}.{output_index}.shap-interactions.npz")
+
+
+def _estimator_and_inputs(model_name: str, output: str) -> tuple[Any, list[str]]:
+    data = get_model_and_metadata(model_name)["estimators_by_output"][output]
+    estimator = data["estimator"]
+    if explainer_backend(estimator).name not in INTERACTION_BACKENDS:
+        raise ValueError(
+            f"SHAP interaction values are only supported for tree models (not {type(estimator).__name__})."
+        )
+    return estimator, list(data["inputs_numerical"])
+
+
+def _dataset_inputs(model_name: str, output: str) -> pd.DataFrame:
+    summary = get_model_summary(model_name)
+    inputs = summary["inputs_by_output"][output]
+    return get_dataset(summary["dataset_name"], columns=inputs)[inputs]
+
+
+def _interaction_rows(model_name: str, output: str) -> pd.DataFrame:
+    """The rows to explain: the whole dataset, or a representative subset of `MAX_INTERACTION_ROWS` rows
+    (choosing it clusters the dataset, so it's only done when computing)."""
+    X = _dataset_inputs(model_name, output)
+    if len(X) > MAX_INTERACTION_ROWS:
+        X = X.iloc[np.sort(representative_rows(X, MAX_INTERACTION_ROWS))]
+    return X
+
+
+def estimate_interaction_seconds(model_name: str, output: str) -> dict[str, Any]:
+    """Predicted cost of computing ``output``'s interaction values (and whether they're already cached)."""
+    estimator, inputs = _estimator_and_inputs(model_name, output)
+    n_rows = min(len(_dataset_inputs(model_name, output)), MAX_INTERACTION_ROWS)
+    seconds_per_row = explainer_backend(estimator).seconds_per_row(estimator, len(inputs))
+    return {
+        "n_rows": n_rows,
+        "n_features": len(inputs),
+        "estimated_seconds": seconds_per_row * INTERACTION_COST_FACTOR * len(inputs) * n_rows,
+        "cached": get_cached_interactions(model_name, output) is not None,
+    }
+
+
+def _interaction_function(model_name: str, output: str) -> Callable[[pd.DataFrame], np.ndarray]:
+    """``X -> (rows, features, features[, classes])`` interaction values."""
+    estimator, _ = _estimator_and_inputs(model_name, output)
+    if explainer_backend(estimator).name == "xgboost":
+        import xgboost
+
+        booster = estimator.get_booster()
+
+        def xgboost_interactions(X: pd.DataFrame) -> np.ndarray:
+            values = booster.predict(xgboost.DMatrix(X), pred_interactions=True)
+            if values.ndim == 4:
+                # Multi-class: (rows, classes, features + bias, features + bias) -> (rows, features, features, classes)
+                return values[:, :, :-1, :-1].transpose(0, 2, 3, 1)
+            return values[:, :-1, :-1]
+
+        return xgboost_interactions
+
+    explainer = get_tree_explainer(model_name, output)
+    return lambda X: np.asarray(explainer.shap_interaction_values(X))
+
+
+def compute_interactions(
+    model_name: str, output: str, progress: Optional[Callable[[int, int], None]] = None
+) -> dict[str, Any]:
+    """Compute ``output``'s interaction values in chunks of rows, and cache them on disk.
+
+    Concurrent calls for the same output (e.g. jobs rendering with and without the main effects) compute them once.
+    """
+    with _computing_lock:
+        lock = _computing.setdefault((model_name, output), threading.Lock())
+    with lock:
+        cached = get_cached_interactions(model_name, output)
+        if cached is not None:
+            if progress is not None:
+                progress(len(cached["index"]), len(cached["index"]))
+            return cached
+        return _compute_interactions(model_name, output, progress)
+
+
+def _compute_interactions(
+    model_name: str, output: str, progress: Optional[Callable[[int, int], None]] = None
+) -> dict[str, Any]:
+    interactions = _interaction_function(model_name, output)
+    X = _interaction_rows(model_name, output)
+    chunks = [X.iloc[start : start + INTERACTION_CHUNK_ROWS] for start in range(0, len(X), INTERACTION_CHUNK_ROWS)]
+
+    # One chunk at a time: `shap_interaction_values` holds the GIL throughout, so threads wouldn't run in parallel.
+    results = []
+    for chunk in chunks:
+        results.append(interactions(chunk))
+        if progress is not None:
+            progress(sum(len(result) for result in results), len(X))
+
+    values = np.concatenate(results)
+    n_features = values.shape[1]
+    upper = np.triu_indices(n_features)
+    summary = get_model_summary(model_name)
+    path = interactions_path(model_name, output)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(
+        tmp_path,
+        model_hash=np.array(summary["content_hash"]),
+        dataset_hash=np.array(file_fingerprint(get_dataset_path(summary["dataset_name"])) or ""),
+        index=X.index.astype(str).to_numpy(dtype=str),
+        inputs=np.array(list(X.columns), dtype=str),
+        upper=values[:, upper[0], upper[1]].astype(np.float32),
+    )
+    os.replace(tmp_path, path)
+    artifact_cache.invalidate(path)
+    return get_cached_interactions(model_name, output)
+
+
+def _load_interactions(path: str) -> dict[str, Any]:
+    with np.load(path, allow_pickle=False) as npz:
+        return {key: npz[key] for key in npz.files}
+
+
+def _expand(upper: np.ndarray, n_features: int) -> np.ndarray:
+    """(rows, features, features[, classes]) tensor from its upper triangle (rows, n_pairs[, classes])."""
+    values = np.empty((upper.shape[0], n_features, n_features, *upper.shape[2:]), dtype=upper.dtype)
+    rows, cols = np.triu_indices(n_features)
+    values[:, rows, cols] = upper
+    values[:, cols, rows] = upper
+    return values
+
+
+def get_cached_interactions(model_name: str, output: str) -> Optional[dict[str, Any]]:
+    """The cached interaction values of ``output`` (``index``, ``inputs`` and the full ``values`` tensor), if current."""
+    path = interactions_path(model_name, output)
+    if not os.path.exists(path):
+        return None
+    cached = artifact_cache.get(path, _load_interactions)
+    summary = get_model_summary(model_name)
+    dataset_hash = file_fingerprint(get_dataset_path(summary["dataset_name"])) or ""
+    if (str(cached["model_hash"]), str(cached["dataset_hash"])) != (summary["content_hash"], dataset_hash):
+        return None
+    inputs = [str(name) for name in cached["inputs"]]
+    return {"index": cached["index"], "inputs": inputs, "values": _expand(cached["upper"], len(inputs))}
+
+
+def mean_abs_interactions(values: np.ndarray) -> np.ndarray:
+    """(features, features) mean |interaction value| over rows (and classes)."""
+    mean_abs = np.abs(values).mean(axis=0)
+    return mean_abs.mean(axis=-1) if mean_abs.ndim == 3 else mean_abs
+
+
+def top_interacting_pairs(mean_abs: np.ndarray, inputs: list[str], n: int = TOP_PAIRS) -> list[dict[str, Any]]:
+    """The ``n`` feature pairs with the strongest interactions.
+
+    An interaction is split evenly between the (i, j) and (j, i) entries, so a pair's strength is twice either.
+    """
+    rows, cols = np.triu_indices(len(inputs), k=1)
+    strengths = 2 * mean_abs[rows, cols]
+    order = np.argsort(-strengths)[:n]
+    return [
+        {"features": [inputs[rows[i]], inputs[cols[i]]], "mean_abs_interaction": float(strengths[i])}
+        for i in order
+    ]
+
+
+def create_interaction_heatmap(
+    mean_abs: np.ndarray, inputs: list[str], include_main_effects: bool = False
+) -> go.Figure:
+    """Heatmap of mean |SHAP interaction value| per pair of features.
+
+    Main effects (the diagonal) usually dwarf the interactions, so they're hidden by default.
+    """
+    z = mean_abs.astype(float).copy()
+    if not include_main_effects:
+        np.fill_diagonal(z, np.nan)
+    fig = go.Figure(
+        go.Heatmap(
+            x=inputs, y=inputs, z=z,
+            colorscale="Viridis",
+            colorbar=dict(title="mean |interaction|"),
+            hovertemplate="%{y} × %{x}<br>mean |interaction|: %{z:.4g}<extra></extra>",
+        )
+    )
+    fig.update_layout(
+        title="SHAP Interaction Values (mean |value| over rows)",
+        yaxis=dict(autorange="reversed"),
+        template="plotly_white",
+    )
+    return fig
@@ -0,0 +1,228 @@
+"""
+Native Plotly SHAP plots.
+
+`shap.summary_plot` draws with matplotlib; rendering that to a PNG and wrapping the raster in
+`px.imshow` is slow, sends a large pixel payload and loses hover/zoom. The beeswarm here computes the
+same layout as SHAP's (points piled up symmetrically around each feature's row, within bins of
+SHAP value) with vectorized NumPy, and draws it as a Plotly scatter colored by feature value.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from modeling import WEBGL_POINT_THRESHOLD
+
+# Same defaults as `shap.summary_plot`.
+MAX_DISPLAY_FEATURES = 20
+BEESWARM_BINS = 100
+# SHAP's blue -> red colormap for low -> high feature values.
+SHAP_COLORSCALE = [[0.0, "#008bfb"], [1.0, "#ff0051"]]
+MISSING_VALUE_COLOR = "#777777"
+
+
+def beeswarm_offsets(shap_values, n_bins=BEESWARM_BINS, row_height=0.4, seed=0):
+    """Vertical offsets of a beeswarm row for each point in ``shap_values`` (n_rows, n_features).
+
+    Each feature's points are binned by SHAP value; within a bin, points are stacked alternately
+    above and below the row (0, +1, -1, +2, -2, ...) in random order, and each feature's offsets
+    are scaled to fit within ``row_height``.
+    """
+    shap_values = np.asarray(shap_values, dtype=float)
+    n_rows, n_features = shap_values.shape
+    if n_rows == 0:
+        return np.zeros_like(shap_values)
+
+    low = np.nanmin(shap_values, axis=0)
+    span = np.nanmax(shap_values, axis=0) - low
+    quantized = np.round(n_bins * (shap_values - low) / (span + 1e-8))
+    quantized = np.nan_to_num(quantized, nan=-1).astype(np.int64)
+
+    # Rank each point within its (feature, bin) group: sort by group, randomly within each group.
+    groups = (np.arange(n_features) * (n_bins + 2) + quantized + 1).ravel(order="F")
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(groups.size), groups))
+    sorted_groups = groups[order]
+    group_starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    group_sizes = np.diff(np.r_[group_starts, groups.size])
+    rank = np.empty(groups.size, dtype=np.int64)
+    rank[order] = np.arange(groups.size) - np.repeat(group_starts, group_sizes)
+
+    layer = rank.reshape((n_rows, n_features), order="F")
+    offsets = np.ceil(layer / 2) * np.where(layer % 2 == 1, 1.0, -1.0)
+    return offsets * (0.9 * row_height / (np.abs(offsets).max(axis=0) + 1))
+
+
+def _normalized_feature_values(values):
+    """Feature values scaled to [0, 1] between their 5th and 95th percentiles (like SHAP's colors)."""
+    low, high = np.nanpercentile(values, 5), np.nanpercentile(values, 95)
+    if high <= low:
+        low, high = np.nanmin(values), np.nanmax(values)
+    if high <= low:
+        return np.full(values.shape, 0.5)
+    return np.clip((values - low) / (high - low), 0, 1)
+
+
+def create_shap_beeswarm_plot(
+    shap_values, features, max_display=MAX_DISPLAY_FEATURES, title="SHAP Summary Plot",
+    webgl_threshold=WEBGL_POINT_THRESHOLD,
+):
+    """Beeswarm of ``shap_values`` (n_rows, n_features), colored by the values in ``features`` (a DataFrame).
+
+    Features are sorted by mean |SHAP value|, most important on top; only the top ``max_display`` are shown.
+    Uses WebGL markers when more than ``webgl_threshold`` points are plotted.
+    """
+    shap_values = np.asarray(shap_values, dtype=float)
+    feature_names = [str(name) for name in features.columns]
+    # Non-numeric features are drawn as missing (gray).
+    feature_values = features.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+
+    importance = np.nanmean(np.abs(shap_values), axis=0)
+    shown = np.argsort(-importance, kind="stable")[:max_display][::-1]  # least important first (bottom)
+    offsets = beeswarm_offsets(shap_values[:, shown])
+
+    n_points = len(shap_values) * len(shown)
+    Scatter = go.Scattergl if n_points > webgl_threshold else go.Scatter
+    marker_size = 4 if n_points > webgl_threshold else 6
+
+    fig = go.Figure()
+    for row, feature in enumerate(shown):
+        x = shap_values[:, feature]
+        y = row + offsets[:, row]
+        values = feature_values[:, feature]
+        missing = np.isnan(values)
+        hovertemplate = "SHAP value: %{x:.4g}<br>" + feature_names[feature] + ": %{customdata:.4g}<extra></extra>"
+        if missing.any():
+            fig.add_trace(
+                Scatter(
+                    x=x[missing], y=y[missing], mode="markers", name=feature_names[feature],
+                    marker=dict(color=MISSING_VALUE_COLOR, size=marker_size),
+                    hovertemplate="SHAP value: %{x:.4g}<br>" + feature_names[feature] + ": missing<extra></extra>",
+                    showlegend=False,
+                )
+            )
+        fig.add_trace(
+            Scatter(
+                x=x[~missing], y=y[~missing], mode="markers", name=feature_names[feature],
+                marker=dict(color=_normalized_feature_values(values[~missing]), coloraxis="coloraxis", size=marker_size),
+                customdata=values[~missing],
+                hovertemplate=hovertemplate,
+                showlegend=False,
+            )
+        )
+
+    fig.add_vline(x=0, line_color="#999999", line_width=1)
+    fig.update_layout(
+        title=title,
+        coloraxis=dict(
+            colorscale=SHAP_COLORSCALE, cmin=0, cmax=1,
+            colorbar=dict(title="Feature value", tickvals=[0, 1], ticktext=["Low", "High"]),
+        ),
+        xaxis=dict(title="SHAP value (impact on model output)", zeroline=False),
+        yaxis=dict(
+            tickvals=list(range(len(shown))),
+            ticktext=[feature_names[feature] for feature in shown],
+            range=[-0.5, len(shown) - 0.5],
+            showgrid=False,
+            zeroline=False,
+        ),
+        hovermode="closest",
+        template="plotly_white",
+    )
+    return fig
+
+
+def create_shap_class_importance_plot(
+    shap_values, feature_names, class_names=None, max_display=MAX_DISPLAY_FEATURES, title="SHAP Summary Plot"
+):
+    """Stacked bars of mean |SHAP value| per class, for classifier SHAP values (n_rows, n_features, n_classes).
+
+    This is what `shap.summary_plot` draws for multi-class explanations.
+    """
+    shap_values = np.asarray(shap_values, dtype=float)
+    n_classes = shap_values.shape[2]
+    if class_names is None:
+        class_names = [f"Class {i}" for i in range(n_classes)]
+
+    importance = np.nanmean(np.abs(shap_values), axis=0)  # (n_features, n_classes)
+    shown = np.argsort(-importance.sum(axis=1), kind="stable")[:max_display][::-1]
+    fig = go.Figure(
+        [
+            go.Bar(
+                x=importance[shown, i],
+                y=[feature_names[feature] for feature in shown],
+                orientation="h",
+                name=str(class_names[i]),
+            )
+            for i in range(n_classes)
+        ]
+    )
+    fig.update_layout(
+        title=title,
+        barmode="stack",
+        xaxis_title="mean(|SHAP value|) (average impact on model output magnitude)",
+        template="plotly_white",
+    )
+    return fig
+
+
+def create_shap_waterfall_plot(
+    shap_values, base_value, feature_values, feature_names, max_display=10, title="SHAP Waterfall Plot"
+):
+    """Waterfall of one sample's ``shap_values`` (n_features,), from ``base_value`` (E[f(X)]) up to f(x).
+
+    Like `shap.waterfall_plot`, the largest contributions are on top and the smallest are collapsed
+    into one "N other features" bar, so at most ``max_display`` bars are drawn.
+    """
+    shap_values = np.asarray(shap_values, dtype=float)
+    base_value = float(base_value)
+    prediction = base_value + np.nansum(shap_values)
+
+    order = np.argsort(-np.abs(shap_values), kind="stable")
+    if len(order) > max_display:
+        shown, rest = order[: max_display - 1], order[max_display - 1 :]
+    else:
+        shown, rest = order, order[:0]
+
+    # Bars are listed bottom-to-top: the collapsed features first, then the smallest contribution.
+    labels, contributions = [], []
+    if len(rest):
+        labels.append(f"{len(rest)} other features")
+        contributions.append(float(np.nansum(shap_values[rest])))
+    for feature in shown[::-1]:
+        value = feature_values[feature]
+        value_label = f"{value:.4g}" if isinstance(value, (int, float, np.number)) else str(value)
+        labels.append(f"{feature_names[feature]} = {value_label}")
+        contributions.append(float(shap_values[feature]))
+
+    fig = go.Figure(
+        go.Waterfall(
+            orientation="h",
+            y=labels,
+            x=contributions,
+            base=base_value,
+            measure=["relative"] * len(contributions),
+            text=[f"{contribution:+.3g}" for contribution in contributions],
+            textposition="outside",
+            increasing=dict(marker=dict(color=SHAP_COLORSCALE[1][1])),
+            decreasing=dict(marker=dict(color=SHAP_COLORSCALE[0][1])),
+            connector=dict(line=dict(color="#bbbbbb", width=1)),
+            hovertemplate="%{y}<br>SHAP value: %{x:.4g}<extra></extra>",
+        )
+    )
+    fig.add_vline(
+        x=base_value, line_dash="dot", line_color="#999999",
+        annotation_text=f"E[f(X)] = {base_value:.4g}", annotation_position="bottom",
+    )
+    fig.add_vline(
+        x=prediction, line_dash="dot", line_color="#999999",
+        annotation_text=f"f(x) = {prediction:.4g}", annotation_position="top",
+    )
+    fig.update_layout(
+        title=title,
+        xaxis_title="Model output",
+        yaxis=dict(type="category"),
+        showlegend=False,
+        template="plotly_white",
+    )
+    return fig
@@ -0,0 +1,240 @@
+"""
+Time-budgeted, progressively refined SHAP summaries.
+
+Explaining every row of a large dataset can take minutes, longer than the frontend proxy waits.
+Instead of a fixed blind cap on the number of rows, a summary request:
+1. estimates the explainer's cost per row (from the explainer backend's cost model, see
+   `explainers.py`, or by timing a small pilot), then refines the estimate on every call;
+2. explains as many rows as fit in the time budget (`SHAP_SUMMARY_TIME_BUDGET` seconds, or a
+   per-request ``time_budget``, less the time spent choosing them), chosen to be representative
+   of the dataset (the rows nearest to k-means centroids, then rows drawn from every cluster in
+   proportion to its size);
+3. keeps explaining further rows in the background, one budget-sized chunk at a time, until the
+   whole dataset (up to `SHAP_SUMMARY_MAX_ROWS` rows) is explained.
+
+Each refinement bumps the summary's ``version``; clients poll the summary endpoint until it
+reports ``complete``. With a precomputed SHAP store (see `shap_store.py`) the per-row cost is
+tiny, so the first response already covers the whole dataset.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+import shap
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import pairwise_distances_argmin
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIME_BUDGET = float(os.environ.get("SHAP_SUMMARY_TIME_BUDGET", 5.0))
+MAX_SUMMARY_ROWS = int(os.environ.get("SHAP_SUMMARY_MAX_ROWS", 20_000))
+# The first response explains at least this many rows (or the whole dataset, if smaller).
+MIN_SUMMARY_ROWS = 50
+PILOT_ROWS = 16
+# k-means takes longer the more clusters it fits, so larger samples draw several rows per cluster instead.
+MAX_CLUSTERS = 128
+# Weight of the newest measurement in the running per-row cost estimate.
+COST_SMOOTHING = 0.5
+
+
+def representative_rows(X: pd.DataFrame, n: int, seed: int = 0) -> np.ndarray:
+    """Positions of ``n`` rows of ``X`` spread over its distribution, in an order whose every prefix is too.
+
+    Rows are clustered with k-means into at most `MAX_CLUSTERS` clusters: the row nearest each centroid comes
+    first, then rows drawn from every cluster in proportion to its size. Features are standardized first;
+    categorical features are clustered on their category codes.
+    """
+    n_rows = len(X)
+    if n >= n_rows:
+        return np.arange(n_rows)
+
+    codes = {
+        name: column if pd.api.types.is_numeric_dtype(column) else pd.Series(pd.factorize(column)[0], index=X.index)
+        for name, column in X.items()
+    }
+    values = pd.DataFrame(codes).to_numpy(dtype=float)
+    values = np.where(np.isnan(values), np.nanmedian(values, axis=0), values)
+    values = np.nan_to_num(values)
+    scale = values.std(axis=0)
+    values = (values - values.mean(axis=0)) / np.where(scale > 0, scale, 1.0)
+
+    n_clusters = min(n, MAX_CLUSTERS)
+    kmeans = MiniBatchKMeans(
+        n_clusters=n_clusters, n_init=1, max_iter=20, batch_size=max(1024, 3 * n_clusters), random_state=seed
+    )
+    labels = kmeans.fit_predict(values)
+    rng = np.random.default_rng(seed)
+    # Several centroids can share a nearest row.
+    nearest = rng.permutation(np.unique(pairwise_distances_argmin(kmeans.cluster_centers_, values)))
+
+    # Stratified order of the other rows: the j-th (random) row of a cluster of size s is keyed by about j / s.
+    shuffled = rng.permutation(n_rows)
+    by_cluster = shuffled[np.argsort(labels[shuffled], kind="stable")]
+    sizes = np.bincount(labels, minlength=n_clusters)
+    rank = np.empty(n_rows)
+    rank[by_cluster] = np.arange(n_rows) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    stratified = np.argsort((rank + rng.random(n_rows)) / sizes[labels], kind="stable")
+    rest = stratified[~np.isin(stratified, nearest)]
+    return np.concatenate([nearest, rest])[:n]
+
+
+class SummaryRefinement:
+    """SHAP values of a growing, representative-first subset of a dataset's rows."""
+
+    def __init__(
+        self,
+        X: pd.DataFrame,
+        explain: Callable[[pd.DataFrame], shap.Explanation],
+        max_rows: int = MAX_SUMMARY_ROWS,
+        seconds_per_row: Optional[float] = None,
+        background_explain: Optional[Callable[[pd.DataFrame], shap.Explanation]] = None,
+    ):
+        """``seconds_per_row`` is an a-priori cost estimate (e.g. the explainer backend's cost model);
+        without one, the cost is measured on a small pilot first. ``background_explain`` (``explain`` by
+        default) is used for the background refinement (see `schedule_refinement`)."""
+        self.X = X
+        self.explain = explain
+        self.background_explain = background_explain or explain
+        self.n_target = min(len(X), max_rows)
+        self.seconds_per_row = seconds_per_row
+        self.version = 0
+        self.order: Optional[np.ndarray] = None
+        self._values: list[np.ndarray] = []
+        self._base_values: list[np.ndarray] = []
+        self._n_done = 0
+        self._lock = threading.Lock()
+        self._refine_lock = threading.Lock()
+        self.refining = False
+
+    @property
+    def complete(self) -> bool:
+        return self._n_done >= self.n_target
+
+    @property
+    def n_done(self) -> int:
+        return self._n_done
+
+    def _timed_explain(
+        self, rows: np.ndarray, explain: Optional[Callable[[pd.DataFrame], shap.Explanation]] = None
+    ) -> shap.Explanation:
+        start = time.perf_counter()
+        explanation = (explain or self.explain)(self.X.iloc[rows])
+        seconds_per_row = (time.perf_counter() - start) / max(len(rows), 1)
+        if self.seconds_per_row is None:
+            self.seconds_per_row = seconds_per_row
+        else:
+            self.seconds_per_row += COST_SMOOTHING * (seconds_per_row - self.seconds_per_row)
+        return explanation
+
+    def rows_for_budget(self, time_budget: float) -> int:
+        """Rows that can be explained within ``time_budget`` seconds at the measured cost."""
+        if not self.seconds_per_row:
+            return self.n_target
+        return int(time_budget / self.seconds_per_row)
+
+    def _append(self, *explanations: shap.Explanation) -> None:
+        with self._lock:
+            for explanation in explanations:
+                self._values.append(np.asarray(explanation.values))
+                self._base_values.append(np.asarray(explanation.base_values))
+                self._n_done += len(explanation.values)
+            self.version += 1
+
+    def start(self, time_budget: float, seed: int = 0) -> None:
+        """Explain a first representative subset of rows, sized to fit ``time_budget`` seconds."""
+        if self.version > 0:
+            return
+        with self._refine_lock:
+            if self.version > 0:
+                return
+            started = time.perf_counter()
+            rng = np.random.default_rng(seed)
+            explained = []
+            pilot = np.array([], dtype=int)
+            if self.seconds_per_row is None:
+                pilot = np.sort(rng.choice(len(self.X), min(PILOT_ROWS, self.n_target), replace=False))
+                explained.append(self._timed_explain(pilot))
+            # Choosing the rows takes about as long however many are chosen, so size the sample by what's left after it.
+            n_candidates = len(pilot) + min(self.n_target, max(MIN_SUMMARY_ROWS, self.rows_for_budget(time_budget)))
+            candidates = representative_rows(self.X, n_candidates, seed=seed)
+            remaining = time_budget - (time.perf_counter() - started)
+            n_first = min(self.n_target, max(MIN_SUMMARY_ROWS, len(pilot) + self.rows_for_budget(remaining)))
+
+            first = candidates[~np.isin(candidates, pilot)][: n_first - len(pilot)]
+            rest = rng.permutation(np.setdiff1d(np.arange(len(self.X)), np.concatenate([pilot, first])))
+            self.order = np.concatenate([pilot, first, rest])
+            if len(first):
+                explained.append(self._timed_explain(first))
+            self._append(*explained)
+
+    def refine_step(self, time_budget: float, background: bool = False) -> bool:
+        """Explain the next budget-sized chunk of rows (with ``background_explain`` if ``background``);
+        returns False once there is nothing left to do."""
+        with self._refine_lock:
+            if self.order is None or self.complete:
+                return False
+            n_chunk = max(MIN_SUMMARY_ROWS, self.rows_for_budget(time_budget))
+            rows = self.order[self._n_done : min(self._n_done + n_chunk, self.n_target)]
+            self._append(self._timed_explain(rows, self.background_explain if background else None))
+            return not self.complete
+
+    def snapshot(self) -> tuple[np.ndarray, np.ndarray, pd.DataFrame, int]:
+        """(SHAP values, base values, explained rows of X, version) of the current summary."""
+        with self._lock:
+            values = np.concatenate(self._values)
+            base_values = np.concatenate(self._base_values)
+            return values, base_values, self.X.iloc[self.order[: len(values)]], self.version
+
+
+# (model name, output) -> (model/dataset version key, refinement)
+_refinements: dict[tuple[str, str], tuple[tuple, SummaryRefinement]] = {}
+_refinements_lock = threading.Lock()
+# Refinement runs on a single background thread, with each refinement's `background_explain` (explaining
+# in-process, not on the explainers' worker pools), so it never takes more than one core from requests.
+_refine_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shap-summary-refine")
+
+
+def get_summary_refinement(
+    model_name: str,
+    output: str,
+    version_key: tuple,
+    X: pd.DataFrame,
+    explain: Callable[[pd.DataFrame], shap.Explanation],
+    seconds_per_row: Optional[float] = None,
+    background_explain: Optional[Callable[[pd.DataFrame], shap.Explanation]] = None,
+) -> SummaryRefinement:
+    """The refinement of ``output``'s summary for this ``version_key`` (model & dataset hashes), creating it if needed."""
+    with _refinements_lock:
+        existing = _refinements.get((model_name, output))
+        if existing is not None and existing[0] == version_key:
+            return existing[1]
+        refinement = SummaryRefinement(
+            X, explain, seconds_per_row=seconds_per_row, background_explain=background_explain
+        )
+        _refinements[(model_name, output)] = (version_key, refinement)
+        return refinement
+
+
+def _refine(refinement: SummaryRefinement, time_budget: float) -> None:
+    try:
+        while refinement.refine_step(time_budget, background=True):
+            pass
+    except Exception as e:
+        logger.warning(f"Could not refine SHAP summary: {e}")
+    finally:
+        refinement.refining = False
+
+
+def schedule_refinement(refinement: SummaryRefinement, time_budget: float = DEFAULT_TIME_BUDGET) -> None:
+    """Keep explaining rows of ``refinement`` in the background until it's complete (no-op if already running)."""
+    with _refinements_lock:
+        if refinement.refining or refinement.complete:
+            return
+        refinement.refining = True
+    _refine_executor.submit(_refine, refinement, time_budget)
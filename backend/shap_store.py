@@ -0,0 +1,233 @@
+"""
+Precomputed SHAP values, stored next to each model.
+
+Explaining rows on request means loading the model, building an explainer and running it, even
+when the waterfall page only needs one row. Instead, the SHAP matrix and base values of every row
+of a model's dataset (for every output with a fast explainer backend, see `explainers.py`) are
+computed once, in the background, and saved as float32 arrays to `models/{model-name}.shap.npz`. The file records the
+model's content hash and the dataset's hash, and is ignored (and recomputed) once either changes.
+
+With a current store, `/api/shap-waterfall-plots` is a row slice and `/api/shap-summary-plots` a
+read. Stores are computed in the background on startup (set `SHAP_PRECOMPUTE=0` to disable) and
+whenever a SHAP endpoint finds one missing or stale; to compute them up front, run (from the
+`backend` directory):
+```bash
+python shap_store.py
+```
+"""
+
+import argparse
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import shap
+
+from artifact_cache import artifact_cache, file_fingerprint
+from explainers import explainer_backend, get_explainer
+from model_artifacts import MODELS_DIR
+from model_manifest import get_all_model_inputs, get_model_summary, model_manifest
+from utils import get_dataset, get_dataset_path, get_model_and_metadata
+
+logger = logging.getLogger(__name__)
+
+SHAP_SUFFIX = ".shap.npz"
+
+
+def shap_store_path(model_name: str) -> str:
+    return os.path.join(MODELS_DIR, f"{model_name}{SHAP_SUFFIX}")
+
+
+def _expected_hashes(model_name: str) -> tuple[str, Optional[str]]:
+    summary = get_model_summary(model_name)
+    return summary["content_hash"], file_fingerprint(get_dataset_path(summary["dataset_name"]))
+
+
+def _supports_precompute(estimator) -> bool:
+    try:
+        return explainer_backend(estimator).precompute
+    except ValueError:
+        return False
+
+
+def compute_shap_store(model_name: str) -> str:
+    """Explain every row of ``model_name``'s dataset for each tree-model output and save the store.
+
+    Returns the path written.
+    """
+    summary = get_model_summary(model_name)
+    model_hash, dataset_hash = _expected_hashes(model_name)
+    estimators_by_output = get_model_and_metadata(model_name)["estimators_by_output"]
+    dataset = get_dataset(summary["dataset_name"], columns=get_all_model_inputs(summary))
+
+    # Kernel SHAP is far too slow to explain every row up front.
+    outputs = [
+        output for output in summary["outputs"]
+        if _supports_precompute(estimators_by_output[output]["estimator"])
+    ]
+    blobs: dict[str, np.ndarray] = {
+        "model_hash": np.array(model_hash),
+        "dataset_hash": np.array(dataset_hash or ""),
+        "index": dataset.index.astype(str).to_numpy(dtype=str),
+        "outputs": np.array(outputs, dtype=str),
+    }
+    for i, output in enumerate(outputs):
+        inputs = summary["inputs_by_output"][output]
+        explanation = get_explainer(model_name, output, pooled=False)(dataset[inputs])
+        blobs[f"{i}__inputs"] = np.array(inputs, dtype=str)
+        blobs[f"{i}__values"] = np.asarray(explanation.values, dtype=np.float32)
+        blobs[f"{i}__base_values"] = np.asarray(explanation.base_values, dtype=np.float32)
+
+    path = shap_store_path(model_name)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, **blobs)
+    os.replace(tmp_path, path)
+    return path
+
+
+class ShapStore:
+    """Lazily-read view of a `.shap.npz` store; arrays are loaded on first access per key."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._arrays: dict[str, np.ndarray] = {}
+        with np.load(path, allow_pickle=False) as npz:
+            self.model_hash = str(npz["model_hash"])
+            self.dataset_hash = str(npz["dataset_hash"])
+            self.outputs: list[str] = [str(output) for output in npz["outputs"]]
+            self.index = pd.Index(npz["index"])
+
+    def _array(self, key: str) -> np.ndarray:
+        with self._lock:
+            if key not in self._arrays:
+                with np.load(self.path, allow_pickle=False) as npz:
+                    self._arrays[key] = npz[key]
+            return self._arrays[key]
+
+    def inputs(self, output: str) -> list[str]:
+        return [str(name) for name in self._array(f"{self.outputs.index(output)}__inputs")]
+
+    def values(self, output: str) -> np.ndarray:
+        """SHAP values of every row: (n_rows, n_inputs), or (n_rows, n_inputs, n_classes) for classifiers."""
+        return self._array(f"{self.outputs.index(output)}__values")
+
+    def base_values(self, output: str) -> np.ndarray:
+        return self._array(f"{self.outputs.index(output)}__base_values")
+
+    def explanation(self, output: str, X: pd.DataFrame) -> Optional[shap.Explanation]:
+        """`shap.Explanation` for the rows of ``X`` (matched by index label), or None if any row is missing.
+
+        Also None if the stored index has duplicate labels, since rows can't be matched by label then.
+        """
+        if not self.index.is_unique:
+            return None
+        rows = self.index.get_indexer(X.index.astype(str))
+        if (rows < 0).any() or list(X.columns) != self.inputs(output):
+            return None
+        return shap.Explanation(
+            values=self.values(output)[rows],
+            base_values=self.base_values(output)[rows],
+            data=X.to_numpy(),
+            feature_names=list(X.columns),
+        )
+
+
+def get_shap_store(model_name: str) -> Optional[ShapStore]:
+    """The current SHAP store of ``model_name``, or None (scheduling a recompute) if it's missing or stale."""
+    path = shap_store_path(model_name)
+    try:
+        expected = _expected_hashes(model_name)
+        if os.path.exists(path):
+            store = artifact_cache.get(path, ShapStore)
+            if (store.model_hash, store.dataset_hash) == expected:
+                return store
+    except Exception as e:
+        logger.warning(f"Could not read SHAP store of '{model_name}': {e}")
+    schedule_shap_precompute(model_name)
+    return None
+
+
+def get_precomputed_explanation(model_name: str, output: str, X: pd.DataFrame) -> Optional[shap.Explanation]:
+    """Precomputed SHAP values for the rows of ``X`` (the inputs of ``output``), if available."""
+    store = get_shap_store(model_name)
+    if store is None or output not in store.outputs:
+        return None
+    return store.explanation(output, X)
+
+
+def shap_precompute_enabled() -> bool:
+    return os.environ.get("SHAP_PRECOMPUTE", "1") != "0"
+
+
+# A single background thread, explaining in-process (not on the explainers' worker pools), so precomputation
+# never takes more than one core from requests.
+_precompute_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shap-precompute")
+_scheduled: set[str] = set()
+# model name -> (model hash, dataset hash) for which precomputing failed, so it isn't retried on every request.
+_failed: dict[str, tuple[str, Optional[str]]] = {}
+_scheduled_lock = threading.Lock()
+
+
+def _precompute(model_name: str) -> None:
+    try:
+        path = compute_shap_store(model_name)
+        logger.info(f"Precomputed SHAP values for '{model_name}' ({path})")
+    except Exception as e:
+        logger.warning(f"Could not precompute SHAP values for '{model_name}': {e}")
+        try:
+            _failed[model_name] = _expected_hashes(model_name)
+        except Exception:
+            pass
+    finally:
+        with _scheduled_lock:
+            _scheduled.discard(model_name)
+
+
+def schedule_shap_precompute(model_name: str) -> None:
+    """Compute the SHAP store of ``model_name`` in the background (no-op if it's already scheduled)."""
+    if not shap_precompute_enabled():
+        return
+    with _scheduled_lock:
+        if model_name in _scheduled:
+            return
+        try:
+            if _failed.get(model_name) == _expected_hashes(model_name):
+                return
+        except Exception:
+            return
+        _scheduled.add(model_name)
+    _precompute_executor.submit(_precompute, model_name)
+
+
+def precompute_all_shap_stores() -> None:
+    """Schedule a background precompute for every indexed model whose store is missing or stale."""
+    for model_name in model_manifest.model_names():
+        if model_manifest.get(model_name)["error"] is None:
+            # `get_shap_store` schedules the precompute if needed.
+            get_shap_store(model_name)
+
+
+def start_shap_precompute() -> None:
+    """Check (and refresh) every model's SHAP store in the background; used on app startup."""
+    if shap_precompute_enabled():
+        _precompute_executor.submit(precompute_all_shap_stores)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Precompute SHAP values (`.shap.npz`) for the models.")
+    parser.add_argument("--model", action="append", help="Model name(s); defaults to every model.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    for model_name in args.model or model_manifest.model_names():
+        try:
+            print(f"wrote {compute_shap_store(model_name)}")
+        except Exception as e:
+            print(f"skipping {model_name}: {e}")
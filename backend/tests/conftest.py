@@ -1,9 +1,14 @@
 """Shared fixtures for backend tests."""
 
+import os
+
 import pytest
 from fastapi.testclient import TestClient
 
-from main import app
+# Don't write precomputed SHAP stores into `backend/models` while the tests run.
+os.environ.setdefault("SHAP_PRECOMPUTE", "0")
+
+from main import app  # noqa: E402
 
 
 @pytest.fixture
@@ -29,7 +29,7 @@ def test_correlation_heatmap_returns_plot_for_supported_types(
 ):
     monkeypatch.setattr("routers.models.get_model_and_metadata", lambda model_name: _mock_metadata())
     monkeypatch.setattr("routers.models.get_dataset_name_from_model", lambda model_name: "demo")
-    monkeypatch.setattr("routers.models.get_dataset", lambda dataset_name: _mock_dataset())
+    monkeypatch.setattr("routers.models.get_dataset", lambda dataset_name, columns=None: _mock_dataset())
 
     response = client.get(f"/api/correlation-heatmap/demo_model/{correlation_type}")
     assert response.status_code == 200
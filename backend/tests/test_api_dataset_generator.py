@@ -139,7 +139,7 @@ def test_dataset_generator_enforces_ingredient_count_bounds_wide_format():
 
 
 def test_dataset_generator_enforces_required_ingredients_wide_format():
-    np.random.seed(0)
+    rng = np.random.default_rng(0)
     inputs = {
         "general": {},
         "formulation": {
@@ -167,6 +167,7 @@ def test_dataset_generator_enforces_required_ingredients_wide_format():
         output_format="wide",
         min_ingredients_per_formulation=4,
         max_ingredients_per_formulation=7,
+        rng=rng,
     )
 
     base_min = inputs["formulation"]["Ice Cream Base"]["min"]
@@ -181,7 +182,7 @@ def test_dataset_generator_enforces_required_ingredients_wide_format():
 
 
 def test_dataset_generator_enforces_per_ingredient_bounds_wide_format():
-    np.random.seed(0)
+    rng = np.random.default_rng(0)
     inputs = {
         "general": {},
         "formulation": {
@@ -209,6 +210,7 @@ def test_dataset_generator_enforces_per_ingredient_bounds_wide_format():
         output_format="wide",
         min_ingredients_per_formulation=4,
         max_ingredients_per_formulation=7,
+        rng=rng,
     )
 
     for ingredient, bounds in inputs["formulation"].items():
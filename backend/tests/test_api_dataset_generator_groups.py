@@ -22,7 +22,7 @@ def _build_grouped(formulation, groups, **kwargs):
 
 
 def test_group_sum_bounds_and_counts_respected_wide_format():
-    np.random.seed(0)
+    rng = np.random.default_rng(0)
     formulation = {
         "A": {"min": 0.1, "max": 0.3, "units": "", "required": False},
         "B": {"min": 0.1, "max": 0.3, "units": "", "required": False},
@@ -40,6 +40,7 @@ def test_group_sum_bounds_and_counts_respected_wide_format():
         num_rows=200,
         min_ingredients_per_formulation=2,
         max_ingredients_per_formulation=4,
+        rng=rng,
     )
 
     g1 = df[["A", "B"]].sum(axis=1)
@@ -62,7 +63,7 @@ def test_group_sum_bounds_and_counts_respected_wide_format():
 
 
 def test_optional_group_can_be_absent_but_required_group_always_present():
-    np.random.seed(1)
+    rng = np.random.default_rng(1)
     formulation = {
         "Base": {"min": 0.5, "max": 1.0, "units": "", "required": True},
         "X": {"min": 0.05, "max": 0.3, "units": "", "required": False},
@@ -79,6 +80,7 @@ def test_optional_group_can_be_absent_but_required_group_always_present():
         num_rows=300,
         min_ingredients_per_formulation=1,
         max_ingredients_per_formulation=3,
+        rng=rng,
     )
 
     # Required ingredient -> its group is always present.
@@ -0,0 +1,81 @@
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+import dataset_shards
+
+
+def _formulation_body(num_rows):
+    return {
+        "general_inputs": [{"name": "temp", "min": 0.0, "max": 100.0, "units": "C"}],
+        "formulation_groups": [
+            {
+                "name": "resins",
+                "min": 0.0,
+                "max": 1.0,
+                "min_ingredients": 1,
+                "max_ingredients": 3,
+                "ingredients": [
+                    {"name": "UDMA", "min": 0.0, "max": 1.0, "units": ""},
+                    {"name": "IBOA", "min": 0.0, "max": 1.0, "units": ""},
+                    {"name": "HDDA", "min": 0.0, "max": 1.0, "units": ""},
+                ],
+            }
+        ],
+        "outputs": [{"name": "modulus", "min": 100.0, "max": 10000.0, "units": "MPa"}],
+        "num_rows": num_rows,
+        "noise": 0.01,
+    }
+
+
+def test_streamed_dataset_is_a_zip_of_consistent_chunks(client, monkeypatch):
+    monkeypatch.setattr(dataset_shards, "DATASET_SHARD_ROWS", 7)
+    response = client.post("/api/dataset-generator?stream=true", json=_formulation_body(30))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.namelist() == ["components.csv", "dataset.csv"]
+    assert pd.read_csv(archive.open("components.csv"))["id"].tolist() == ["UDMA", "IBOA", "HDDA"]
+
+    dataset = pd.read_csv(archive.open("dataset.csv"))
+    assert dataset["Formulation_ID"].tolist() == list(range(1, 31))
+    assert list(dataset.columns[:3]) == ["Formulation_ID", "modulus-MPa", "temp-C"]
+    # Every shard has room for the largest possible formulation.
+    assert [col for col in dataset.columns if col.endswith("_amount")] == [
+        f"component-{i}_amount" for i in range(1, 4)
+    ]
+    amounts = dataset.filter(like="_amount").fillna(0).sum(axis=1)
+    assert ((amounts - 100).abs() < 1e-6).all()
+
+
+def test_streamed_dataset_without_formulations(client):
+    body = {
+        "general_inputs": [{"name": "temp", "min": 0.0, "max": 100.0, "units": "C"}],
+        "outputs": [{"name": "yield_", "min": 0.0, "max": 1.0, "units": ""}],
+        "num_rows": 12,
+    }
+    response = client.post("/api/dataset-generator?stream=true", json=body)
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.namelist() == ["dataset.csv"]
+    assert len(pd.read_csv(archive.open("dataset.csv"))) == 12
+
+
+def test_streamed_dataset_validates_before_streaming(client):
+    body = _formulation_body(10)
+    body["formulation_groups"][0]["max"] = 0.5
+    response = client.post("/api/dataset-generator?stream=true", json=body)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("num_rows", [None, "many", 0, -5, 2.5, 10**12])
+@pytest.mark.parametrize("stream", [False, True])
+def test_invalid_num_rows_is_rejected_before_streaming(client, num_rows, stream):
+    body = _formulation_body(num_rows)
+    if num_rows is None:
+        del body["num_rows"]
+    response = client.post(f"/api/dataset-generator?stream={str(stream).lower()}", json=body)
+    assert response.status_code == 400
+    assert "num_rows" in response.json()["detail"]
@@ -1,23 +1,21 @@
 import plotly.graph_objects as go
 
 
-class DummyEstimator:
-    pass
-
-
-def _mock_overview_payload():
+def _mock_model_summary():
     return {
-        "estimators_by_output": {
-            "y_strength": {
-                "inputs_numerical": ["x_temp", "x_pressure"],
-                "estimator": DummyEstimator(),
-            }
-        }
+        "outputs": ["y_strength"],
+        "inputs_by_output": {"y_strength": ["x_temp", "x_pressure"]},
+        "estimator_types": {"y_strength": "tests.DummyEstimator"},
     }
 
 
+def _mock_model_evaluation():
+    return {"y_strength": {"y_test": None, "y_pred_test": None, "metrics": None}}
+
+
 def test_model_overview_returns_expected_shape(client, monkeypatch):
-    monkeypatch.setattr("routers.models.get_model_and_metadata", lambda model_name: _mock_overview_payload())
+    monkeypatch.setattr("routers.models.get_model_summary", lambda model_name: _mock_model_summary())
+    monkeypatch.setattr("routers.models.get_model_evaluation", lambda model_name: _mock_model_evaluation())
     monkeypatch.setattr(
         "routers.models.get_dataset_name_from_model",
         lambda model_name: "demo_dataset",
@@ -51,7 +49,8 @@ def test_model_overview_returns_expected_shape(client, monkeypatch):
 
 
 def test_model_overview_returns_500_on_plot_failure(client, monkeypatch):
-    monkeypatch.setattr("routers.models.get_model_and_metadata", lambda model_name: _mock_overview_payload())
+    monkeypatch.setattr("routers.models.get_model_summary", lambda model_name: _mock_model_summary())
+    monkeypatch.setattr("routers.models.get_model_evaluation", lambda model_name: _mock_model_evaluation())
     monkeypatch.setattr(
         "routers.models.get_dataset_name_from_model",
         lambda model_name: "demo_dataset",
@@ -65,3 +64,15 @@ def test_model_overview_returns_500_on_plot_failure(client, monkeypatch):
     response = client.get("/api/overview/demo_model")
     assert response.status_code == 500
     assert response.json()["detail"] == "plot generation failed"
+
+
+def test_model_overview_does_not_unpickle_estimators(client, monkeypatch):
+    def _raise(*args, **kwargs):
+        raise AssertionError("the overview should not load the model pickle")
+
+    monkeypatch.setattr("model_artifacts.get_model_and_metadata", _raise)
+    monkeypatch.setattr("model_manifest.get_model_and_metadata", _raise)
+
+    response = client.get("/api/overview/diabetes_RF")
+    assert response.status_code == 200
+    assert response.json()["model_outputs"] == ["target"]
@@ -2,14 +2,12 @@ import pandas as pd
 
 
 def test_variable_options_returns_union_of_inputs_and_outputs(client, monkeypatch):
-    mock_metadata = {
-        "estimators_by_output": {
-            "y1": {"inputs_numerical": ["x1", "x2"]},
-            "y2": {"inputs_numerical": ["x2", "x3"]},
-        }
+    mock_summary = {
+        "outputs": ["y1", "y2"],
+        "inputs_by_output": {"y1": ["x1", "x2"], "y2": ["x2", "x3"]},
     }
 
-    monkeypatch.setattr("routers.models.get_model_and_metadata", lambda model_name: mock_metadata)
+    monkeypatch.setattr("routers.models.get_model_summary", lambda model_name: mock_summary)
 
     response = client.get("/api/variable-options/demo_model")
     assert response.status_code == 200
@@ -21,14 +19,12 @@ def test_variable_options_returns_union_of_inputs_and_outputs(client, monkeypatc
 
 
 def test_output_variable_options_returns_outputs_only(client, monkeypatch):
-    mock_metadata = {
-        "estimators_by_output": {
-            "y1": {"inputs_numerical": ["x1", "x2"]},
-            "y2": {"inputs_numerical": ["x2", "x3"]},
-        }
+    mock_summary = {
+        "outputs": ["y1", "y2"],
+        "inputs_by_output": {"y1": ["x1", "x2"], "y2": ["x2", "x3"]},
     }
 
-    monkeypatch.setattr("routers.models.get_model_and_metadata", lambda model_name: mock_metadata)
+    monkeypatch.setattr("routers.models.get_model_summary", lambda model_name: mock_summary)
 
     response = client.get("/api/output-variable-options/demo_model")
     assert response.status_code == 200
@@ -39,7 +35,7 @@ def test_variable_options_returns_500_when_model_lookup_fails(client, monkeypatc
     def _raise(*args, **kwargs):
         raise RuntimeError("model lookup failed")
 
-    monkeypatch.setattr("routers.models.get_model_and_metadata", _raise)
+    monkeypatch.setattr("routers.models.get_model_summary", _raise)
 
     response = client.get("/api/variable-options/bad_model")
     assert response.status_code == 500
@@ -56,7 +52,7 @@ def test_scatter_plot_two_variables_returns_plot_json(client, monkeypatch):
     )
 
     monkeypatch.setattr("routers.models.get_dataset_name_from_model", lambda model_name: "demo")
-    monkeypatch.setattr("routers.models.get_dataset", lambda dataset_name: dataset)
+    monkeypatch.setattr("routers.models.get_dataset", lambda dataset_name, columns=None: dataset)
 
     response = client.post(
         "/api/scatter-plots/demo_model",
@@ -24,7 +24,7 @@ def test_violin_plots_returns_plot_json_and_total_variables(client, monkeypatch)
         "routers.models.get_dataset_name_from_model",
         lambda model_name: "demo_dataset",
     )
-    monkeypatch.setattr("routers.models.get_dataset", lambda dataset_name: _mock_dataset())
+    monkeypatch.setattr("routers.models.get_dataset", lambda dataset_name, columns=None: _mock_dataset())
 
     response = client.post(
         "/api/violin-plots/demo_model",
@@ -49,7 +49,7 @@ def test_violin_plots_pagination_returns_one_trace(client, monkeypatch):
         "routers.models.get_dataset_name_from_model",
         lambda model_name: "demo_dataset",
     )
-    monkeypatch.setattr("routers.models.get_dataset", lambda dataset_name: _mock_dataset())
+    monkeypatch.setattr("routers.models.get_dataset", lambda dataset_name, columns=None: _mock_dataset())
 
     response = client.post(
         "/api/violin-plots/demo_model",
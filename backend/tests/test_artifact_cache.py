@@ -0,0 +1,117 @@
+import os
+import pickle
+
+import pandas as pd
+
+from artifact_cache import ArtifactCache
+
+
+def _write_pickle(path, value):
+    with open(path, "wb") as f:
+        pickle.dump(value, f)
+
+
+def _load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def test_artifact_cache_loads_each_artifact_once(tmp_path):
+    path = tmp_path / "demo_RF.pkl"
+    _write_pickle(path, {"estimators_by_output": {}})
+    cache = ArtifactCache(max_bytes=10_000_000)
+
+    first = cache.get(str(path), _load_pickle)
+    second = cache.get(str(path), _load_pickle)
+
+    assert first is second
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["loads_by_path"] == {str(path): 1}
+
+
+def test_artifact_cache_evicts_derived_entries_with_their_parent(tmp_path):
+    model_path = tmp_path / "demo_RF.pkl"
+    other_path = tmp_path / "other_RF.pkl"
+    _write_pickle(model_path, {"estimators_by_output": {}})
+    _write_pickle(other_path, {"estimators_by_output": {}})
+    size = os.path.getsize(model_path)
+    cache = ArtifactCache(max_bytes=3 * size)
+
+    cache.get(str(model_path), _load_pickle)
+    cache.get(str(model_path), lambda path: "explainer", variant="explainer", evict_with=None)
+    assert cache.stats()["entries"] == 2
+
+    # Loading two more artifacts evicts the model, and its explainer goes with it.
+    cache.get(str(other_path), _load_pickle)
+    cache.get(str(other_path), _load_pickle, variant="copy")
+    assert cache.stats()["entries"] == 2
+    assert str(model_path) not in {key[0] for key in cache._entries}
+
+
+def test_derived_entry_survives_evicting_its_parent_while_stored(tmp_path):
+    model_path = tmp_path / "demo_RF.pkl"
+    _write_pickle(model_path, {"estimators_by_output": {}})
+    size = os.path.getsize(model_path)
+    cache = ArtifactCache(max_bytes=size + 10)
+
+    cache.get(str(model_path), _load_pickle)
+    # Storing the explainer evicts the model, but not the explainer itself.
+    cache.get(str(model_path), lambda path: "explainer", variant="explainer", evict_with=None, sizeof=lambda value, stamp: 20)
+    assert list(cache._entries) == [(str(model_path), "explainer")]
+    cache.get(str(model_path), lambda path: "other", variant="explainer", evict_with=None)
+    assert cache.stats()["hits"] == 1
+
+    # Once the model is loaded again, the explainer is evicted along with it.
+    other_path = tmp_path / "other_RF.pkl"
+    _write_pickle(other_path, {"estimators_by_output": {}})
+    cache.max_bytes = 2 * size + 10
+    cache.get(str(model_path), _load_pickle)
+    cache.get(str(model_path), lambda path: "other", variant="explainer", evict_with=None)
+    cache.get(str(other_path), _load_pickle)
+    assert list(cache._entries) == [(str(other_path), None)]
+
+
+def test_artifact_cache_reloads_when_file_changes(tmp_path):
+    path = tmp_path / "demo_dataset.pkl"
+    _write_pickle(path, pd.DataFrame({"x": [1.0, 2.0]}))
+    cache = ArtifactCache(max_bytes=10_000_000)
+    assert len(cache.get(str(path), _load_pickle)) == 2
+
+    _write_pickle(path, pd.DataFrame({"x": [1.0, 2.0, 3.0]}))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert len(cache.get(str(path), _load_pickle)) == 3
+    assert cache.stats()["misses"] == 2
+
+
+def test_artifact_cache_evicts_least_recently_used(tmp_path):
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.pkl"
+        _write_pickle(path, b"x" * 1000)
+        paths.append(str(path))
+    size = os.path.getsize(paths[0])
+    cache = ArtifactCache(max_bytes=2 * size)
+
+    cache.get(paths[0], _load_pickle)
+    cache.get(paths[1], _load_pickle)
+    cache.get(paths[0], _load_pickle)  # "a" is now most recently used
+    cache.get(paths[2], _load_pickle)  # evicts "b"
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    cache.get(paths[0], _load_pickle)
+    assert cache.stats()["hits"] == 2
+    cache.get(paths[1], _load_pickle)
+    assert cache.stats()["loads_by_path"][paths[1]] == 2
+
+
+def test_cache_stats_endpoint_reports_counters(client):
+    response = client.get("/api/cache-stats")
+    assert response.status_code == 200
+    stats = response.json()["artifact_cache"]
+    assert {"hits", "misses", "evictions", "bytes", "max_bytes"} <= set(stats)
@@ -0,0 +1,121 @@
+import io
+import zipfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+import pytest
+
+import dataset_shards
+from dataset_shards import generate_dataset, shard_plan
+
+
+def _build_kwargs(output_format="compact"):
+    return {
+        "inputs": {
+            "general": {"temp": {"min": 0.0, "max": 100.0, "units": "C"}},
+            "formulation": {
+                name: {"min": 0.05, "max": 0.6, "units": "", "required": False} for name in ["A", "B", "C", "D", "E"]
+            },
+        },
+        "outputs": {"y": {"min": 0.0, "max": 1.0, "units": ""}},
+        "noise": 0.01,
+        "coefs": None,
+        "output_format": output_format,
+        "min_ingredients_per_formulation": 2,
+        "max_ingredients_per_formulation": 4,
+        "formulation_groups": None,
+    }
+
+
+def test_shard_plan_splits_rows_and_shares_coefficients(monkeypatch):
+    monkeypatch.setattr(dataset_shards, "DATASET_SHARD_ROWS", 40)
+    build_kwargs, shards = shard_plan(100, _build_kwargs(), seed=3)
+    assert [rows for rows, _ in shards] == [40, 40, 20]
+    assert build_kwargs["coefs"].shape == (1, 6)
+    # The shards' seeds are independent children of the request's seed.
+    assert len({tuple(seed.generate_state(4)) for _, seed in shards}) == 3
+
+
+@pytest.mark.parametrize("output_format", ["compact", "wide"])
+def test_same_seed_generates_the_same_dataset(monkeypatch, output_format):
+    monkeypatch.setattr(dataset_shards, "DATASET_SHARD_ROWS", 40)
+    first = generate_dataset(100, _build_kwargs(output_format), seed=11)
+    second = generate_dataset(100, _build_kwargs(output_format), seed=11)
+    other = generate_dataset(100, _build_kwargs(output_format), seed=12)
+
+    assert len(first) == 100
+    assert first.to_csv(index=None) == second.to_csv(index=None)
+    assert not first.equals(other)
+
+
+def test_process_pool_shards_match_in_process_shards(monkeypatch):
+    monkeypatch.setattr(dataset_shards, "DATASET_SHARD_ROWS", 40)
+    in_process = generate_dataset(150, _build_kwargs(), seed=5)
+
+    monkeypatch.setattr(dataset_shards, "DATASET_GENERATION_WORKERS", 2)
+    try:
+        pooled = generate_dataset(150, _build_kwargs(), seed=5)
+    finally:
+        dataset_shards._reset_pool()
+
+    assert pooled.to_csv(index=None) == in_process.to_csv(index=None)
+
+
+class _BrokenPool:
+    def __init__(self):
+        self.shutdown_calls = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool("a worker died"))
+        return future
+
+    def shutdown(self, **kwargs):
+        self.shutdown_calls.append(kwargs)
+
+
+def test_broken_pool_falls_back_in_process_without_cancelling_other_work(monkeypatch):
+    monkeypatch.setattr(dataset_shards, "DATASET_SHARD_ROWS", 40)
+    expected = generate_dataset(100, _build_kwargs(), seed=7)
+
+    broken = _BrokenPool()
+    monkeypatch.setattr(dataset_shards, "DATASET_GENERATION_WORKERS", 2)
+    monkeypatch.setattr(dataset_shards, "_pool", broken)
+    assert generate_dataset(100, _build_kwargs(), seed=7).to_csv(index=None) == expected.to_csv(index=None)
+    # Shut down without cancelling the shards other requests submitted, and replaced on next use.
+    assert broken.shutdown_calls == [{"wait": False}]
+    assert dataset_shards._pool is None
+
+    # A request that finds its pool already replaced leaves the new one alone.
+    replacement = _BrokenPool()
+    monkeypatch.setattr(dataset_shards, "_pool", replacement)
+    dataset_shards._reset_pool(broken=broken)
+    assert dataset_shards._pool is replacement and not replacement.shutdown_calls
+
+
+def _seeded_body(seed):
+    return {
+        "general_inputs": [{"name": "temp", "min": 0.0, "max": 100.0, "units": "C"}],
+        "outputs": [{"name": "modulus", "min": 100.0, "max": 10000.0, "units": "MPa"}],
+        "num_rows": 25,
+        "seed": seed,
+    }
+
+
+def test_seeded_requests_are_reproducible_and_match_streaming(client, monkeypatch):
+    monkeypatch.setattr(dataset_shards, "DATASET_SHARD_ROWS", 10)
+    first = client.post("/api/dataset-generator", json=_seeded_body(42)).json()["csv_string"]
+    second = client.post("/api/dataset-generator", json=_seeded_body(42)).json()["csv_string"]
+    assert first == second
+
+    streamed = client.post("/api/dataset-generator?stream=true", json=_seeded_body(42))
+    assert zipfile.ZipFile(io.BytesIO(streamed.content)).read("dataset.csv").decode() == first
+    assert len(pd.read_csv(io.StringIO(first))) == 25
+
+
+@pytest.mark.parametrize("seed", [-1, 1.5, "42", True])
+def test_invalid_seed_is_rejected(client, seed):
+    response = client.post("/api/dataset-generator", json=_seeded_body(seed))
+    assert response.status_code == 400
+    assert "seed" in response.json()["detail"]
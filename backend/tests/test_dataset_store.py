@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from dataset_store import convert_pickled_datasets, read_arrow_dataset, write_arrow_dataset
+
+
+def _demo_df():
+    return pd.DataFrame(
+        {"x1": [1.0, 2.0, 3.0], "x2": [4, 5, 6], "y": [0.1, 0.2, 0.3]},
+        index=pd.Index([10, 20, 30], name="sample"),
+    )
+
+
+def test_read_arrow_dataset_round_trips_frame_and_index(tmp_path):
+    path = str(tmp_path / "demo_dataset.arrow")
+    df = _demo_df()
+    write_arrow_dataset(df, path)
+
+    loaded = read_arrow_dataset(path)
+    pd.testing.assert_frame_equal(loaded, df)
+
+
+def test_read_arrow_dataset_projects_columns(tmp_path):
+    path = str(tmp_path / "demo_dataset.arrow")
+    write_arrow_dataset(_demo_df(), path)
+
+    loaded = read_arrow_dataset(path, columns=["y", "x1"])
+    assert list(loaded.columns) == ["y", "x1"]
+    assert list(loaded.index) == [10, 20, 30]
+
+    index_only = read_arrow_dataset(path, columns=[])
+    assert index_only.shape == (3, 0)
+    assert list(index_only.index) == [10, 20, 30]
+
+    with pytest.raises(KeyError):
+        read_arrow_dataset(path, columns=["missing"])
+
+
+def test_convert_pickled_datasets_writes_arrow_siblings(tmp_path):
+    _demo_df().to_pickle(tmp_path / "demo_dataset.pkl")
+
+    written = convert_pickled_datasets(str(tmp_path))
+    assert written == [str(tmp_path / "demo_dataset.arrow")]
+    pd.testing.assert_frame_equal(read_arrow_dataset(written[0]), _demo_df())
+
+    # Already converted datasets are skipped unless overwrite is requested.
+    assert convert_pickled_datasets(str(tmp_path)) == []
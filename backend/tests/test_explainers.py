@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+import pytest
+import shap
+from sklearn.linear_model import LinearRegression, PoissonRegressor, Ridge, SGDRegressor
+
+from artifact_cache import artifact_cache
+from explainers import (
+    EXPLAINER_BACKENDS,
+    ExplainerBackend,
+    explainer_backend,
+    get_explainer,
+    get_explainer_backend,
+    get_tree_explainer,
+    is_tree_model,
+    register_explainer_backend,
+)
+from model_artifacts import MODELS_DIR
+from parallel_explain import ProcessPoolExplainer
+from utils import get_model_and_metadata
+
+
+def test_tree_explainer_is_built_once_per_model_and_output():
+    first = get_tree_explainer("linnerud_RF", "Weight")
+    assert get_tree_explainer("linnerud_RF", "Weight") is first
+    assert get_tree_explainer("linnerud_RF", "Waist") is not first
+
+
+def test_tree_explainer_is_dropped_with_the_model():
+    explainer = get_tree_explainer("diabetes_RF", "target")
+    artifact_cache.invalidate(f"{MODELS_DIR}/diabetes_RF.pkl")
+    assert get_tree_explainer("diabetes_RF", "target") is not explainer
+
+
+def test_is_tree_model():
+    estimator = get_model_and_metadata("diabetes_RF")["estimators_by_output"]["target"]["estimator"]
+    assert is_tree_model(estimator)
+    assert not is_tree_model(object())
+
+
+def test_unsupported_estimator_raises(monkeypatch):
+    monkeypatch.setattr(
+        "explainers.get_model_and_metadata",
+        lambda model_name: {"estimators_by_output": {"y": {"estimator": object()}}},
+    )
+    with pytest.raises(ValueError, match="Unsupported model type"):
+        get_tree_explainer("iris_RF", "y")
+
+
+def _regression_data(n_rows=200, n_features=4):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(n_rows, n_features)), columns=[f"x{i}" for i in range(n_features)])
+    y = X.to_numpy() @ np.arange(1, n_features + 1) + rng.normal(scale=0.1, size=n_rows)
+    return X, y
+
+
+def test_xgboost_backend_matches_tree_explainer():
+    xgboost = pytest.importorskip("xgboost")
+    X, y = _regression_data()
+    estimator = xgboost.XGBRegressor(n_estimators=20, max_depth=3).fit(X, y)
+    backend = explainer_backend(estimator)
+    assert backend.name == "xgboost"
+
+    explanation = backend.build(estimator, X)(X.iloc[:10])
+    expected = shap.TreeExplainer(estimator)(X.iloc[:10])
+    np.testing.assert_allclose(explanation.values, expected.values, atol=1e-4)
+    np.testing.assert_allclose(explanation.base_values, expected.base_values, atol=1e-4)
+
+
+def test_xgboost_backend_multiclass_shape():
+    xgboost = pytest.importorskip("xgboost")
+    X, y = _regression_data()
+    estimator = xgboost.XGBClassifier(n_estimators=5, max_depth=2).fit(X, np.digitize(y, [-2, 2]))
+    explanation = explainer_backend(estimator).build(estimator, X)(X.iloc[:7])
+    assert explanation.values.shape == (7, 4, 3)
+    assert explanation.base_values.shape == (7, 3)
+
+
+def test_linear_backend_is_closed_form_and_additive():
+    X, y = _regression_data()
+    estimator = LinearRegression().fit(X, y)
+    backend = explainer_backend(estimator)
+    assert backend.name == "linear"
+
+    explanation = backend.build(estimator, X)(X.iloc[:10])
+    np.testing.assert_allclose(
+        explanation.values.sum(axis=1) + explanation.base_values, estimator.predict(X.iloc[:10]), rtol=1e-10
+    )
+    np.testing.assert_allclose(explanation.values[:, 0], estimator.coef_[0] * (X["x0"][:10] - X["x0"].mean()))
+
+
+class _BlackBox:
+    def predict(self, X):
+        X = np.asarray(X)
+        return X[:, 0] * X[:, 1] + 2 * X[:, 2]
+
+
+@pytest.mark.parametrize(
+    "estimator, backend_name",
+    [(Ridge(), "linear"), (SGDRegressor(), "linear"), (PoissonRegressor(), "kernel")],
+)
+def test_linear_backend_only_for_models_linear_in_their_inputs(estimator, backend_name):
+    X, y = _regression_data()
+    # Poisson regression predicts exp(X @ coef_ + intercept_), which isn't linear.
+    estimator.fit(X, np.abs(y))
+    assert explainer_backend(estimator).name == backend_name
+
+
+def test_kernel_backend_for_black_box_models():
+    X, _ = _regression_data(n_rows=100, n_features=3)
+    estimator = _BlackBox()
+    backend = explainer_backend(estimator)
+    assert backend.name == "kernel"
+    assert not backend.precompute
+
+    explanation = backend.build(estimator, X)(X.iloc[:20])
+    assert explanation.values.shape == (20, 3)
+    np.testing.assert_allclose(
+        explanation.values.sum(axis=1) + explanation.base_values, estimator.predict(X.iloc[:20]), atol=1e-6
+    )
+
+
+def test_cost_models_rank_backends():
+    X, y = _regression_data()
+    forest = get_model_and_metadata("diabetes_RF")["estimators_by_output"]["target"]["estimator"]
+    linear_cost = explainer_backend(LinearRegression().fit(X, y)).seconds_per_row(None, 10)
+    tree_cost = explainer_backend(forest).seconds_per_row(forest, 10)
+    kernel_cost = explainer_backend(_BlackBox()).seconds_per_row(_BlackBox(), 10)
+    assert linear_cost < tree_cost < kernel_cost
+
+
+def test_registered_backends_take_precedence():
+    backend = ExplainerBackend("constant", lambda estimator: isinstance(estimator, _BlackBox), None, lambda e, n: 0.0)
+    register_explainer_backend(backend, index=0)
+    try:
+        assert explainer_backend(_BlackBox()) is backend
+    finally:
+        EXPLAINER_BACKENDS.remove(backend)
+    assert explainer_backend(_BlackBox()).name == "kernel"
+
+
+def test_get_explainer_is_cached():
+    explain = get_explainer("linnerud_RF", "Pulse")
+    assert get_explainer("linnerud_RF", "Pulse") is explain
+    assert get_explainer_backend("linnerud_RF", "Pulse").name == "tree"
+
+
+def test_unpooled_explainer_explains_in_process(monkeypatch):
+    monkeypatch.setattr("explainers.PROCESS_WORKERS", 2)
+    artifact_cache.invalidate(f"{MODELS_DIR}/linnerud_RF.pkl")
+    try:
+        pooled = get_explainer("linnerud_RF", "Waist")
+        assert isinstance(pooled, ProcessPoolExplainer)
+        assert get_explainer("linnerud_RF", "Waist", pooled=False) is pooled.explain
+    finally:
+        artifact_cache.invalidate(f"{MODELS_DIR}/linnerud_RF.pkl")
@@ -0,0 +1,101 @@
+import os
+import threading
+
+import figure_cache as figure_cache_module
+from artifact_cache import file_fingerprint
+from figure_cache import FigureCache, etag_matches, figure_cache, make_etag
+
+
+def test_figure_cache_evicts_least_recently_used_entries():
+    cache = FigureCache(max_bytes=10)
+    cache.put("a", make_etag(b"aaaa"), b"aaaa")
+    cache.put("b", make_etag(b"bbbb"), b"bbbb")
+    assert cache.get("a")[1] == b"aaaa"  # "b" is now the least recently used entry
+
+    cache.put("c", make_etag(b"cccc"), b"cccc")
+    assert cache.get("b") is None
+    assert cache.get("a")[1] == b"aaaa"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 8
+
+
+def test_figure_cache_spills_evicted_entries_to_disk(tmp_path):
+    cache = FigureCache(max_bytes=10, spill_dir=str(tmp_path))
+    cache.put("a", make_etag(b"aaaaaa"), b"aaaaaa")
+    cache.put("b", make_etag(b"bbbbbb"), b"bbbbbb")
+
+    assert cache.stats()["spilled_entries"] == 1
+    assert os.listdir(tmp_path) == ["a.bin"]
+    assert cache.get("a") == (make_etag(b"aaaaaa"), b"aaaaaa")
+    # Reading it back moved "a" into memory and spilled "b" instead.
+    assert os.listdir(tmp_path) == ["b.bin"]
+
+
+def test_etag_matches():
+    etag = make_etag(b"body")
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+def test_file_fingerprint_changes_with_content(tmp_path):
+    path = tmp_path / "dataset.arrow"
+    path.write_bytes(b"one")
+    first = file_fingerprint(str(path))
+    assert file_fingerprint(str(path)) == first
+
+    path.write_bytes(b"other")
+    assert file_fingerprint(str(path)) != first
+    assert file_fingerprint(str(tmp_path / "missing.arrow")) is None
+
+
+def test_overview_revalidation_returns_304(client):
+    figure_cache.clear()
+
+    response = client.get("/api/overview/diabetes_RF")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "no-cache"
+
+    revalidated = client.get("/api/overview/diabetes_RF", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+    # Different request parameters are cached separately.
+    typed = client.get("/api/overview/diabetes_RF?typed_arrays=true", headers={"If-None-Match": etag})
+    assert typed.status_code == 200
+    assert typed.headers["etag"] != etag
+
+    stats = figure_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["not_modified"] == 1
+
+
+def test_cache_key_is_computed_on_the_workload_pool(client, monkeypatch):
+    figure_cache.clear()
+    threads = []
+    compute_key = figure_cache_module.figure_cache_key
+
+    def recording_key(*args):
+        threads.append(threading.current_thread().name)
+        return compute_key(*args)
+
+    monkeypatch.setattr(figure_cache_module, "figure_cache_key", recording_key)
+    assert client.get("/api/overview/diabetes_RF").status_code == 200
+    assert client.get("/api/overview/diabetes_RF").status_code == 200
+    assert len(threads) == 2
+    assert all(name.startswith("workload-plotting") for name in threads)
+
+
+def test_cache_key_follows_the_model_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(figure_cache_module, "MODELS_DIR", str(tmp_path))
+    model_path = tmp_path / "diabetes_RF.pkl"
+    assert figure_cache_module.figure_cache_key("overview", "diabetes_RF", {}) is None
+
+    model_path.write_bytes(b"model")
+    key = figure_cache_module.figure_cache_key("overview", "diabetes_RF", {})
+    # Replacing the model changes the key right away, without waiting for a manifest rescan.
+    model_path.write_bytes(b"retrained model")
+    assert figure_cache_module.figure_cache_key("overview", "diabetes_RF", {}) not in (None, key)
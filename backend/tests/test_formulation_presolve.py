@@ -0,0 +1,162 @@
+import numpy as np
+import pytest
+
+import utils
+from formulation_presolve import presolve_formulation
+from utils import estimate_formulation_acceptance_rate, group_aware_sample_formulation_space
+
+
+def _presolve(mins, maxs, group_index, group_lowers, group_uppers, group_min_counts, group_max_counts,
+              min_count, max_count, required=None, **kwargs):
+    return presolve_formulation(
+        mins, maxs, required or [False] * len(mins), group_index, group_lowers, group_uppers,
+        group_min_counts, group_max_counts, min_count, max_count, **kwargs,
+    )
+
+
+def test_bounds_propagate_between_groups():
+    # Group 1 alone can't reach 100%, so group 2 is always present, with at least 0.7 of the formulation
+    # (more than one of its ingredients can hold).
+    presolve = _presolve(
+        mins=[0.1, 0.1, 0.3, 0.3], maxs=[0.2, 0.2, 0.5, 0.5], group_index=[0, 0, 1, 1],
+        group_lowers=[0.0, 0.2], group_uppers=[0.3, 0.9], group_min_counts=[0, 0], group_max_counts=[2, 2],
+        min_count=1, max_count=4,
+    )
+    assert presolve.group_forced.tolist() == [True, True]
+    assert presolve.group_lowers.tolist() == pytest.approx([0.1, 0.7])
+    assert presolve.group_count_lows.tolist() == [1, 2]
+    assert presolve.group_count_highs.tolist() == [2, 2]
+    assert presolve.min_count == 3
+
+
+def test_ingredients_that_cannot_fit_are_never_present():
+    presolve = _presolve(
+        mins=[0.4, 0.05, 0.05], maxs=[0.6, 0.3, 0.3], group_index=[0, 0, 0],
+        group_lowers=[0.0], group_uppers=[1.0], group_min_counts=[1], group_max_counts=[3],
+        min_count=1, max_count=3, required=[True, False, False],
+        ingredient_names=["base", "a", "b"],
+    )
+    assert presolve.ingredient_uppers.tolist() == pytest.approx([0.6, 0.3, 0.3])
+    # The base is at most 0.6, so the other two are both needed to reach 100%.
+    assert presolve.group_count_lows.tolist() == [3]
+
+    presolve = _presolve(
+        mins=[0.3, 0.3, 0.8], maxs=[0.5, 0.5, 0.9], group_index=[0, 0, 0],
+        group_lowers=[0.0], group_uppers=[1.0], group_min_counts=[1], group_max_counts=[3],
+        min_count=1, max_count=3, required=[True, True, False],
+    )
+    # Ingredient 2 doesn't fit alongside the two required ones.
+    assert presolve.ingredient_possible.tolist() == [True, True, False]
+    assert presolve.group_count_highs.tolist() == [2]
+
+
+def test_required_ingredient_that_cannot_fit_is_reported():
+    with pytest.raises(ValueError, match="Ingredient 'base' is required, but in Group 'carrier'"):
+        _presolve(
+            mins=[0.5, 0.1], maxs=[0.9, 0.4], group_index=[0, 1], group_lowers=[0.0, 0.0],
+            group_uppers=[0.4, 1.0], group_min_counts=[1, 0], group_max_counts=[1, 1],
+            min_count=1, max_count=2, required=[True, False],
+            ingredient_names=["base", "additive"], group_names=["carrier", "additives"],
+        )
+
+
+def test_infeasible_forced_group_is_reported():
+    with pytest.raises(ValueError, match="Group 'resins' must always be present, but it needs at least 1 ingredient, and only 0"):
+        _presolve(
+            mins=[0.01, 0.01, 0.1], maxs=[0.1, 0.1, 0.9], group_index=[0, 0, 1],
+            group_lowers=[0.5, 0.0], group_uppers=[0.6, 1.0], group_min_counts=[1, 0], group_max_counts=[2, 1],
+            min_count=1, max_count=3, group_names=["resins", "fillers"],
+        )
+
+
+def test_optional_group_that_cannot_fit_is_never_present():
+    presolve = _presolve(
+        mins=[0.1, 0.6, 0.3], maxs=[0.9, 0.7, 0.9], group_index=[0, 1, 2], group_lowers=[0.0, 0.0, 0.0],
+        group_uppers=[1.0, 0.5, 1.0], group_min_counts=[1, 0, 0], group_max_counts=[1, 1, 1],
+        min_count=1, max_count=3,
+    )
+    assert presolve.group_possible.tolist() == [True, False, True]
+    assert presolve.ingredient_possible.tolist() == [True, False, True]
+    assert presolve.max_count == 2
+
+
+def test_sampler_skips_ingredients_that_cannot_be_present():
+    config = dict(
+        n_ingredients=3, constraints=[(0.3, 0.5), (0.3, 0.5), (0.8, 0.9)], required=[True, True, False],
+        min_ingredients_per_formulation=2, max_ingredients_per_formulation=3,
+    )
+    samples = group_aware_sample_formulation_space(n_samples=200, rng=np.random.default_rng(0), **config)
+    assert (samples[:, 2] == 0).all()
+    assert np.allclose(samples.sum(axis=1), 1.0)
+
+
+def test_presolve_does_not_change_the_samples(monkeypatch):
+    # A group whose counts the presolve narrows (3 ingredients of 0.15 to 0.2 can't exceed 0.35 together),
+    # alongside a free group: the presence rates must be those of the plain rejection sampler.
+    config = dict(
+        n_ingredients=5, constraints=[(0.15, 0.2)] * 3 + [(0.0, 1.0)] * 2, group_index=[0, 0, 0, 1, 1],
+        group_constraints=[(0.0, 0.35), (0.0, 1.0)], group_min_counts=[0, 0], group_max_counts=[3, 2],
+        min_ingredients_per_formulation=1, max_ingredients_per_formulation=5,
+    )
+    presolved = group_aware_sample_formulation_space(n_samples=2000, rng=np.random.default_rng(0), **config)
+
+    monkeypatch.setattr(utils, "presolve_formulation", lambda *args, **kwargs: None)
+    plain = group_aware_sample_formulation_space(n_samples=2000, rng=np.random.default_rng(0), **config)
+
+    np.testing.assert_array_equal(presolved, plain)
+
+
+def test_acceptance_rate_estimate():
+    presolve, rate = estimate_formulation_acceptance_rate(
+        n_ingredients=4, constraints=[(0.1, 0.2), (0.1, 0.2), (0.3, 0.5), (0.3, 0.5)],
+        group_index=[0, 0, 1, 1], group_constraints=[(0.0, 0.3), (0.2, 0.9)],
+        group_min_counts=[0, 0], group_max_counts=[2, 2],
+        min_ingredients_per_formulation=1, max_ingredients_per_formulation=4,
+        rng=np.random.default_rng(0),
+    )
+    assert presolve.group_forced.tolist() == [True, True]
+    assert 0.0 < rate <= 1.0
+
+
+def _grouped_body(**overrides):
+    body = {
+        "general_inputs": [],
+        "formulation_groups": [
+            {
+                "name": "resins", "min": 0.5, "max": 0.6, "min_ingredients": 1, "max_ingredients": 2,
+                "ingredients": [
+                    {"name": "UDMA", "min": 0.01, "max": 0.1, "units": ""},
+                    {"name": "IBOA", "min": 0.01, "max": 0.1, "units": ""},
+                ],
+            },
+            {
+                "name": "fillers", "min": 0.0, "max": 1.0, "min_ingredients": 0, "max_ingredients": 1,
+                "ingredients": [{"name": "silica", "min": 0.1, "max": 0.9, "units": ""}],
+            },
+        ],
+        "outputs": [{"name": "modulus", "min": 100.0, "max": 10000.0, "units": "MPa"}],
+        "num_rows": 10,
+    }
+    body.update(overrides)
+    return body
+
+
+def test_generation_rejects_infeasible_groups_with_the_reason(client):
+    response = client.post("/api/dataset-generator", json=_grouped_body())
+    assert response.status_code == 400
+    assert "Group 'resins' must always be present" in response.json()["detail"]
+
+
+def test_presolve_endpoint_reports_bounds_and_acceptance_rate(client):
+    body = _grouped_body()
+    body["formulation_groups"][0]["min"] = 0.1
+    response = client.post("/api/dataset-generator/presolve", json=body)
+    assert response.status_code == 200
+    payload = response.json()
+    assert [group["name"] for group in payload["presolve"]["groups"]] == ["resins", "fillers"]
+    # The resins hold at most 0.2, so the fillers are always present, with at least 0.8.
+    fillers = payload["presolve"]["groups"][1]
+    assert fillers["forced"] and fillers["min"] == pytest.approx(0.8)
+    assert 0.0 < payload["acceptance_rate"] <= 1.0
+
+    assert client.post("/api/dataset-generator/presolve", json=_grouped_body()).status_code == 400
@@ -22,7 +22,7 @@ def _five_ingredient_constraints():
 
 
 def test_gibbs_samples_sum_to_one():
-    np.random.seed(1)
+    rng = np.random.default_rng(1)
     constraints = _five_ingredient_constraints()
 
     samples = gibbs_sample_formulation_space(
@@ -32,6 +32,7 @@ def test_gibbs_samples_sum_to_one():
         burn_in=20,
         min_ingredients_per_formulation=3,
         max_ingredients_per_formulation=5,
+        rng=rng,
     )
 
     assert samples.shape == (50, 5)
@@ -39,7 +40,7 @@ def test_gibbs_samples_sum_to_one():
 
 
 def test_gibbs_enforces_present_ingredient_count_bounds():
-    np.random.seed(1)
+    rng = np.random.default_rng(1)
     constraints = _five_ingredient_constraints()
 
     samples = gibbs_sample_formulation_space(
@@ -49,6 +50,7 @@ def test_gibbs_enforces_present_ingredient_count_bounds():
         burn_in=30,
         min_ingredients_per_formulation=3,
         max_ingredients_per_formulation=5,
+        rng=rng,
     )
 
     present_counts = np.sum(samples > 0.0, axis=1)
@@ -57,7 +59,7 @@ def test_gibbs_enforces_present_ingredient_count_bounds():
 
 
 def test_gibbs_enforces_required_ingredients():
-    np.random.seed(2)
+    rng = np.random.default_rng(2)
     constraints = [
         (0.4, 0.85),  # required carrier
         (0.02, 0.35),
@@ -74,6 +76,7 @@ def test_gibbs_enforces_required_ingredients():
         min_ingredients_per_formulation=2,
         max_ingredients_per_formulation=4,
         required=required,
+        rng=rng,
     )
 
     carrier = samples[:, 0]
@@ -86,7 +89,7 @@ def test_gibbs_enforces_required_ingredients():
 
 
 def test_gibbs_enforces_per_ingredient_bounds():
-    np.random.seed(3)
+    rng = np.random.default_rng(3)
     constraints = _five_ingredient_constraints()
 
     samples = gibbs_sample_formulation_space(
@@ -96,6 +99,7 @@ def test_gibbs_enforces_per_ingredient_bounds():
         burn_in=40,
         min_ingredients_per_formulation=3,
         max_ingredients_per_formulation=5,
+        rng=rng,
     )
 
     for j, (lo, hi) in enumerate(constraints):
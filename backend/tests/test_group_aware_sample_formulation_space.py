@@ -0,0 +1,134 @@
+"""Direct unit tests for the batched `group_aware_sample_formulation_space` sampler.
+
+The batched helpers draw many formulations at once; their distributions are
+compared against the one-formulation-at-a-time helpers they replace.
+"""
+
+import numpy as np
+import pytest
+from scipy.stats import ks_2samp
+
+from utils import (
+    _allocate_present,
+    _batch_choose_present_groups,
+    _batch_fill_remaining_room,
+    _batch_sample_constrained_simplex,
+    _fill_remaining_room,
+    _sample_constrained_simplex,
+    group_aware_sample_formulation_space,
+)
+
+
+def _grouped_config():
+    return dict(
+        n_ingredients=7,
+        constraints=[(0.05, 0.5), (0, 0.4), (0.1, 0.3), (0, 1), (0.2, 0.6), (0, 0.3), (0.05, 0.2)],
+        required=[True, False, False, False, False, False, False],
+        group_index=[0, 0, 1, 1, 2, 2, 2],
+        group_constraints=[(0.2, 0.7), (0.1, 0.6), (0.3, 0.9)],
+        group_min_counts=[1, 0, 0],
+        group_max_counts=[2, 2, 3],
+        min_ingredients_per_formulation=2,
+        max_ingredients_per_formulation=5,
+    )
+
+
+def test_batch_fill_remaining_room_matches_single_row_version():
+    rng = np.random.default_rng(0)
+    room = np.array([0.3, 0.1, 0.5, 0.2])
+    single = np.array([_fill_remaining_room(room, 0.6, rng) for _ in range(3000)])
+    # Zero-room padding (e.g. absent ingredients) must not change the allocation.
+    padded = np.array([0.3, 0.1, 0.0, 0.5, 0.2])
+    batch = _batch_fill_remaining_room(np.tile(padded, (3000, 1)), np.full(3000, 0.6), rng)
+    assert (batch[:, 2] == 0).all()
+    batch = batch[:, [0, 1, 3, 4]]
+
+    assert np.allclose(batch.sum(axis=1), 0.6)
+    assert (batch <= room + 1e-12).all()
+    for j in range(len(room)):
+        assert ks_2samp(single[:, j], batch[:, j]).pvalue > 1e-3
+
+
+def test_batch_constrained_simplex_matches_single_row_version():
+    rng = np.random.default_rng(1)
+    mins = np.array([0.1, 0.0, 0.2, 0.05])
+    maxs = np.array([0.5, 0.3, 0.6, 0.2])
+    required = np.array([True, False, False, False])
+    single = np.array(
+        [_sample_constrained_simplex(0.7, mins, maxs, required, min_count=3, max_count=3, rng=rng) for _ in range(3000)]
+    )
+    batch, ok = _batch_sample_constrained_simplex(np.full(3000, 0.7), np.full(3000, 3), mins, maxs, required, rng)
+
+    assert ok.all()
+    assert ((batch > 0).sum(axis=1) == 3).all()
+    assert np.allclose(batch.sum(axis=1), 0.7)
+    for j in range(len(mins)):
+        assert abs((single[:, j] > 0).mean() - (batch[:, j] > 0).mean()) < 0.05
+        assert ks_2samp(single[:, j], batch[:, j]).pvalue > 1e-3
+
+
+def test_batch_constrained_simplex_skips_impossible_rows():
+    rng = np.random.default_rng(4)
+    mins, maxs = np.array([0.1, 0.1, 0.1]), np.array([0.2, 0.2, 0.2])
+    _, ok = _batch_sample_constrained_simplex(
+        np.array([0.3, 0.5, 0.05]), np.array([2, 2, 1]), mins, maxs, np.zeros(3, dtype=bool), rng
+    )
+    # 0.5 is above any two upper bounds; 0.05 is below any lower bound.
+    assert ok.tolist() == [True, False, False]
+    assert _allocate_present(np.array([0]), 0.05, mins, maxs, 3, rng) is None
+
+
+def test_batch_present_groups_top_up_and_drop():
+    rng = np.random.default_rng(2)
+    forced = np.array([True, False, False])
+    present, ok = _batch_choose_present_groups(
+        4000, forced, group_lowers=np.array([0.1, 0.6, 0.5]), group_uppers=np.array([0.5, 0.9, 0.6]), rng=rng
+    )
+    assert ok.all()
+    assert present[:, 0].all()
+    # Both optional groups together overshoot 1.0, and at least one is needed to reach it.
+    assert (present[:, 1] ^ present[:, 2]).all()
+
+
+def test_group_aware_samples_respect_all_constraints():
+    config = _grouped_config()
+    samples = group_aware_sample_formulation_space(n_samples=5000, rng=np.random.default_rng(3), **config)
+
+    assert samples.shape == (5000, 7)
+    assert np.allclose(samples.sum(axis=1), 1.0, atol=1e-7)
+    present = samples > 0
+    assert present[:, 0].all()
+    counts = present.sum(axis=1)
+    assert ((counts >= 2) & (counts <= 5)).all()
+    mins, maxs = np.array(config["constraints"]).T
+    assert (samples <= maxs + 1e-12).all()
+    assert ((samples >= mins - 1e-12) | ~present).all()
+    group_index = np.array(config["group_index"])
+    for g, (lower, upper) in enumerate(config["group_constraints"]):
+        totals = samples[:, group_index == g].sum(axis=1)
+        totals = totals[totals > 0]
+        assert ((totals >= lower - 1e-9) & (totals <= upper + 1e-9)).all()
+        counts = present[:, group_index == g].sum(axis=1)
+        assert (counts <= config["group_max_counts"][g]).all()
+
+
+def test_infeasible_configuration_raises_before_sampling():
+    # Caught by the presolve, with the reason, rather than after thousands of failed attempts.
+    with pytest.raises(ValueError, match="totals range from 1.500 to 1.800"):
+        group_aware_sample_formulation_space(
+            n_ingredients=3,
+            constraints=[(0.5, 0.6)] * 3,
+            n_samples=10,
+            min_ingredients_per_formulation=3,
+            max_ingredients_per_formulation=3,
+        )
+
+
+def test_same_seed_draws_the_same_samples():
+    config = _grouped_config()
+    first = group_aware_sample_formulation_space(n_samples=500, rng=np.random.default_rng(5), **config)
+    second = group_aware_sample_formulation_space(n_samples=500, rng=np.random.default_rng(5), **config)
+    other = group_aware_sample_formulation_space(n_samples=500, rng=np.random.default_rng(6), **config)
+
+    assert np.array_equal(first, second)
+    assert not np.array_equal(first, other)
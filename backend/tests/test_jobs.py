@@ -0,0 +1,142 @@
+import threading
+import time
+
+import routers.jobs
+from jobs import JobQueue
+
+
+def _wait(queue, job, timeout=10):
+    deadline = time.time() + timeout
+    while not queue.get(job.id).finished and time.time() < deadline:
+        time.sleep(0.01)
+    return queue.get(job.id)
+
+
+def test_duplicate_submissions_share_a_job():
+    queue = JobQueue("test", max_workers=1)
+    release = threading.Event()
+    calls = []
+
+    def work(progress):
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    first = queue.submit(("plot", "model", 1), work)
+    assert queue.submit(("plot", "model", 1), work) is first
+    assert queue.submit(("plot", "model", 2), work) is not first
+    release.set()
+    assert _wait(queue, first).result == "result"
+    # Finished jobs are reused too, until they expire.
+    assert queue.submit(("plot", "model", 1), work) is first
+    assert len(calls) == 2
+
+
+def test_progress_and_eta():
+    queue = JobQueue("test", max_workers=1)
+    halfway = threading.Event()
+    release = threading.Event()
+
+    def work(progress):
+        progress.update(5, 10)
+        halfway.set()
+        release.wait(5)
+        progress.update(10)
+        return 42
+
+    job = queue.submit("key", work)
+    halfway.wait(5)
+    time.sleep(0.05)
+    status = job.to_dict()
+    assert status["status"] == "running"
+    assert (status["done"], status["total"]) == (5, 10)
+    assert status["eta_seconds"] > 0
+    release.set()
+    job = _wait(queue, job)
+    assert (job.status, job.result, job.progress.done) == ("done", 42, 10)
+
+
+def test_failed_jobs_are_retried_on_resubmission():
+    queue = JobQueue("test", max_workers=1)
+
+    def fail(progress):
+        raise ValueError("boom")
+
+    job = _wait(queue, queue.submit("key", fail))
+    assert job.status == "failed"
+    assert job.error == "boom"
+    retried = queue.submit("key", lambda progress: "ok")
+    assert retried is not job
+    assert _wait(queue, retried).result == "ok"
+
+
+def test_finished_jobs_expire():
+    queue = JobQueue("test", max_workers=1, ttl_seconds=0)
+    job = queue.submit("key", lambda progress: "ok")
+    deadline = time.time() + 5
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    assert queue.get(job.id) is None
+    assert queue.submit("key", lambda progress: "ok") is not job
+
+
+def _poll(client, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = client.get(f"/api/jobs/{job_id}").json()
+        if status["status"] in ("done", "failed"):
+            return status
+        time.sleep(0.1)
+    raise AssertionError("job did not finish")
+
+
+def test_shap_waterfall_job(client):
+    body = {"selected_output": "Weight", "sample_ids": [str(i) for i in range(8)]}
+    response = client.post("/api/shap-waterfall-plots/linnerud_RF/batch?as_job=true", json=body)
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert client.post("/api/shap-waterfall-plots/linnerud_RF/batch?as_job=true", json=body).json()["job_id"] == job_id
+
+    status = _poll(client, job_id)
+    assert status["status"] == "done"
+    assert (status["done"], status["total"]) == (8, 8)
+    assert [plot["sample_id"] for plot in status["result"]["plots"]] == body["sample_ids"]
+
+
+def test_finished_job_result_is_encoded_once(client, monkeypatch):
+    body = {"selected_output": "Weight", "sample_ids": ["3", "4"]}
+    job_id = client.post("/api/shap-waterfall-plots/linnerud_RF/batch?as_job=true", json=body).json()["job_id"]
+    first = _poll(client, job_id)
+
+    encoded = []
+    encode = routers.jobs.encode_plot_payload
+    monkeypatch.setattr(routers.jobs, "encode_plot_payload", lambda *args, **kwargs: encoded.append(1) or encode(*args, **kwargs))
+    assert client.get(f"/api/jobs/{job_id}").json()["result"] == first["result"]
+    assert client.get(f"/api/jobs/{job_id}?typed_arrays=true").json()["status"] == "done"
+    client.get(f"/api/jobs/{job_id}?typed_arrays=true")
+    assert len(encoded) == 1
+
+
+def test_shap_waterfall_job_is_not_reused_after_the_dataset_changes(client, monkeypatch):
+    body = {"selected_output": "Weight", "sample_ids": ["1", "2"]}
+    job_id = client.post("/api/shap-waterfall-plots/linnerud_RF/batch?as_job=true", json=body).json()["job_id"]
+    _poll(client, job_id)
+
+    monkeypatch.setattr("routers.shap.file_fingerprint", lambda path: "regenerated")
+    response = client.post("/api/shap-waterfall-plots/linnerud_RF/batch?as_job=true", json=body)
+    assert response.json()["job_id"] != job_id
+    _poll(client, response.json()["job_id"])
+
+
+def test_shap_summary_job_explains_every_row(client):
+    response = client.post(
+        "/api/shap-summary-plots/linnerud_RF?as_job=true", json={"selected_output": "Waist", "time_budget": 0.01}
+    )
+    assert response.status_code == 202
+    status = _poll(client, response.json()["job_id"])
+    assert status["result"]["complete"]
+    assert status["result"]["n_samples"] == status["total"] == 20
+
+
+def test_unknown_job(client):
+    assert client.get("/api/jobs/does-not-exist").status_code == 404
@@ -0,0 +1,83 @@
+import pickle
+
+import numpy as np
+
+import model_artifacts
+from model_artifacts import ModelEvaluation, evaluation_path, get_model_evaluation, save_evaluation, save_model_artifact
+from model_manifest import file_sha256
+
+
+class DummyEstimator:
+    pass
+
+
+def _model_and_metadata():
+    return {
+        "estimators_by_output": {
+            "y (units)": {
+                "estimator": DummyEstimator(),
+                "inputs_numerical": ["x1", "x2"],
+                "metrics": {"test": {"R^2": np.float64(0.9), "Coverage Fraction": None}},
+                "y_train": np.array([1.0, 2.0]),
+                "y_pred_train": np.array([1.1, 2.1]),
+                "y_pred_train_uncertainty": None,
+                "y_test": np.array([3.0, 4.0]),
+                "y_pred_test": np.array([2.9, 4.2], dtype=np.float32),
+                "y_pred_test_uncertainty": None,
+            }
+        }
+    }
+
+
+def test_save_model_artifact_splits_estimators_from_evaluation(tmp_path):
+    save_model_artifact("demo_RF", _model_and_metadata(), models_dir=str(tmp_path))
+
+    with open(tmp_path / "demo_RF.pkl", "rb") as f:
+        stored = pickle.load(f)["estimators_by_output"]["y (units)"]
+    assert isinstance(stored["estimator"], DummyEstimator)
+    assert "y_test" not in stored
+    assert "y_pred_test" not in stored
+
+    evaluation = ModelEvaluation(evaluation_path("demo_RF", str(tmp_path)))
+    assert evaluation.outputs == ["y (units)"]
+    results = evaluation.by_output()["y (units)"]
+    assert results["metrics"] == {"test": {"R^2": 0.9, "Coverage Fraction": None}}
+    np.testing.assert_array_equal(results["y_test"], [3.0, 4.0])
+    assert results["y_pred_test"].dtype == np.float32
+    assert results["y_pred_test_uncertainty"] is None
+
+
+def test_model_evaluation_loads_arrays_lazily(tmp_path):
+    save_model_artifact("demo_RF", _model_and_metadata(), models_dir=str(tmp_path))
+    evaluation = ModelEvaluation(evaluation_path("demo_RF", str(tmp_path)))
+
+    assert evaluation._arrays == {}
+    evaluation.array("y (units)", "y_test")
+    assert list(evaluation._arrays) == ["0__y_test"]
+
+
+def test_sidecar_records_the_model_file_hash(tmp_path):
+    save_model_artifact("demo_RF", _model_and_metadata(), models_dir=str(tmp_path))
+    evaluation = ModelEvaluation(evaluation_path("demo_RF", str(tmp_path)))
+    assert evaluation.model_hash == file_sha256(tmp_path / "demo_RF.pkl")
+
+
+def test_stale_sidecar_is_recomputed_from_the_model(tmp_path, monkeypatch):
+    path = str(tmp_path / "demo_RF.eval.npz")
+    save_evaluation(path, _model_and_metadata()["estimators_by_output"], "old-model-hash")
+
+    # The model was retrained (in the single-file layout) since the sidecar was written.
+    retrained = _model_and_metadata()
+    retrained["estimators_by_output"]["y (units)"]["y_test"] = np.array([5.0, 6.0])
+    monkeypatch.setattr(model_artifacts, "evaluation_path", lambda model_name: path)
+    monkeypatch.setattr(model_artifacts.model_manifest, "get", lambda model_name: {"content_hash": "new-model-hash"})
+    monkeypatch.setattr(model_artifacts, "get_model_and_metadata", lambda model_name: retrained)
+
+    np.testing.assert_array_equal(get_model_evaluation("demo_RF")["y (units)"]["y_test"], [5.0, 6.0])
+    assert ModelEvaluation(path).model_hash == "new-model-hash"
+
+    def _raise(model_name):
+        raise AssertionError("a current sidecar should be read without loading the model")
+
+    monkeypatch.setattr(model_artifacts, "get_model_and_metadata", _raise)
+    np.testing.assert_array_equal(get_model_evaluation("demo_RF")["y (units)"]["y_test"], [5.0, 6.0])
@@ -0,0 +1,69 @@
+import json
+import os
+import pickle
+
+from model_manifest import ModelManifest, get_all_model_inputs
+
+
+class DummyEstimator:
+    pass
+
+
+def _write_model(path, outputs):
+    model_and_metadata = {
+        "estimators_by_output": {
+            output: {"estimator": DummyEstimator(), "inputs_numerical": inputs}
+            for output, inputs in outputs.items()
+        }
+    }
+    with open(path, "wb") as f:
+        pickle.dump(model_and_metadata, f)
+
+
+def test_manifest_indexes_models_and_persists_to_disk(tmp_path):
+    _write_model(tmp_path / "demo_RF.pkl", {"y1": ["x1", "x2"], "y2": ["x2", "x3"]})
+    manifest = ModelManifest(tmp_path)
+
+    entry = manifest.get("demo_RF")
+    assert entry["outputs"] == ["y1", "y2"]
+    assert entry["dataset_name"] == "demo_dataset"
+    assert entry["estimator_types"]["y1"].endswith(".DummyEstimator")
+    assert len(entry["content_hash"]) == 64
+    assert get_all_model_inputs(entry) == ["x1", "x2", "x3"]
+
+    with open(tmp_path / "manifest.json") as f:
+        assert [m["name"] for m in json.load(f)["models"]] == ["demo_RF"]
+
+
+def test_manifest_reuses_persisted_entries_without_unpickling(tmp_path, monkeypatch):
+    _write_model(tmp_path / "demo_RF.pkl", {"y1": ["x1"]})
+    ModelManifest(tmp_path).refresh()
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("unchanged models should not be re-indexed")
+
+    monkeypatch.setattr("model_manifest.describe_model", _fail)
+    assert ModelManifest(tmp_path).model_names() == ["demo_RF"]
+
+
+def test_manifest_picks_up_added_and_changed_models(tmp_path):
+    _write_model(tmp_path / "demo_RF.pkl", {"y1": ["x1"]})
+    manifest = ModelManifest(tmp_path)
+    assert manifest.model_names() == ["demo_RF"]
+
+    _write_model(tmp_path / "other_RF.pkl", {"z": ["x9"]})
+    assert manifest.model_names() == ["demo_RF", "other_RF"]
+
+    _write_model(tmp_path / "demo_RF.pkl", {"y1": ["x1"], "y2": ["x1"]})
+    stat = os.stat(tmp_path / "demo_RF.pkl")
+    os.utime(tmp_path / "demo_RF.pkl", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert manifest.refresh()
+    assert manifest.get("demo_RF")["outputs"] == ["y1", "y2"]
+
+
+def test_manifest_keeps_unreadable_models_listed(tmp_path):
+    (tmp_path / "broken_RF.pkl").write_bytes(b"not a pickle")
+    manifest = ModelManifest(tmp_path)
+
+    assert manifest.model_names() == ["broken_RF"]
+    assert manifest.get("broken_RF")["error"]
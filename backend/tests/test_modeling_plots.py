@@ -1,6 +1,6 @@
 import numpy as np
 
-from modeling import create_parity_plot, create_residual_plot
+from modeling import UNCERTAINTY_BAND_BINS, create_parity_plot, create_residual_plot
 
 
 def _sample_model_results():
@@ -38,3 +38,46 @@ def test_create_residual_plot_returns_scatter_with_zero_line():
     assert fig.layout.shapes
     assert fig.layout.shapes[0]["type"] == "line"
     assert list(fig.layout.xaxis.range) == [0.5, 4.5]
+
+
+def _dense_model_results(n_points=5000):
+    rng = np.random.default_rng(0)
+    y_test = rng.normal(size=n_points)
+    results = _sample_model_results()
+    results.update(
+        y_test=y_test,
+        y_pred_test=y_test + rng.normal(scale=0.1, size=n_points),
+        y_pred_test_uncertainty=np.full(n_points, 0.1),
+    )
+    return results
+
+
+def test_dense_parity_plot_uses_webgl_and_an_uncertainty_band():
+    fig = create_parity_plot(_dense_model_results())
+
+    band, points = fig.data
+    assert points.type == "scattergl"
+    assert points.error_y.array is None
+    assert band.fill == "toself"
+    assert len(band.x) <= 2 * UNCERTAINTY_BAND_BINS
+
+
+def test_parity_plot_webgl_threshold_is_configurable():
+    fig = create_parity_plot(_sample_model_results(), webgl_threshold=2)
+    assert [trace.type for trace in fig.data] == ["scatter", "scattergl"]
+
+    fig = create_parity_plot(_dense_model_results(), webgl_threshold=10_000)
+    assert [trace.type for trace in fig.data] == ["scatter"]
+    assert fig.data[0].error_y.array is not None
+
+
+def test_dense_residual_plot_uses_webgl():
+    assert create_residual_plot(_dense_model_results()).data[0].type == "scattergl"
+    assert create_residual_plot(_sample_model_results()).data[0].type == "scatter"
+
+
+def test_dense_parity_plot_without_finite_uncertainty_has_no_band():
+    results = _dense_model_results()
+    results["y_pred_test_uncertainty"] = np.full(len(results["y_test"]), np.nan)
+    fig = create_parity_plot(results)
+    assert [trace.type for trace in fig.data] == ["scattergl"]
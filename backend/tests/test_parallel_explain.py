@@ -0,0 +1,95 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import shap
+
+import parallel_explain
+from explainers import get_tree_explainer
+from model_manifest import get_model_summary
+from parallel_explain import ProcessPoolExplainer, _chunk_bounds
+from utils import get_dataset
+
+_unpickled = 0
+
+
+class PidExplainer:
+    """Explains each row as (worker pid, times this explainer was unpickled in the worker)."""
+
+    def __init__(self):
+        self.name = "pid"
+
+    def __setstate__(self, state):
+        global _unpickled
+        self.__dict__.update(state)
+        _unpickled += 1
+
+    def __call__(self, X):
+        values = np.tile([os.getpid(), _unpickled], (len(X), 1)).astype(float)
+        return shap.Explanation(values=values, base_values=X.index.to_numpy(dtype=float))
+
+
+def test_chunk_bounds_cover_rows_in_order():
+    bounds = _chunk_bounds(2500, 2)
+    assert bounds[0][0] == 0 and bounds[-1][1] == 2500
+    assert all(stop == start for (_, stop), (start, _) in zip(bounds, bounds[1:]))
+    assert len(bounds) == 3
+    assert len(_chunk_bounds(10, 4)) == 4
+
+
+def test_small_inputs_are_explained_in_process():
+    explain = ProcessPoolExplainer(PidExplainer(), workers=2, min_parallel_rows=100)
+    explanation = explain(pd.DataFrame({"a": range(10)}))
+    assert (explanation.values[:, 0] == os.getpid()).all()
+    assert explain._pool is None
+
+
+def test_explainer_is_shipped_to_each_worker_once():
+    explain = ProcessPoolExplainer(PidExplainer(), workers=2, min_parallel_rows=1)
+    try:
+        X = pd.DataFrame({"a": range(40)})
+        explain(X)
+        explanation = explain(X)
+    finally:
+        explain.close()
+    assert (explanation.values[:, 0] != os.getpid()).all()
+    assert (explanation.values[:, 1] == 1).all()
+    np.testing.assert_array_equal(explanation.base_values, np.arange(40))
+
+
+def test_parallel_explanation_matches_serial(monkeypatch):
+    summary = get_model_summary("diabetes_RF")
+    inputs = summary["inputs_by_output"]["target"]
+    X = get_dataset(summary["dataset_name"], columns=inputs)[inputs].iloc[:60]
+    explainer = get_tree_explainer("diabetes_RF", "target")
+    monkeypatch.setattr(parallel_explain, "MAX_CHUNK_ROWS", 16)
+
+    explain = ProcessPoolExplainer(explainer, workers=2, min_parallel_rows=1)
+    try:
+        parallel = explain(X)
+    finally:
+        explain.close()
+    serial = explainer(X)
+    np.testing.assert_allclose(parallel.values, serial.values)
+    np.testing.assert_allclose(parallel.base_values, serial.base_values)
+    assert parallel.feature_names == inputs
+
+
+def test_least_recently_used_pools_are_closed(monkeypatch):
+    monkeypatch.setattr(parallel_explain, "MAX_EXPLAINER_POOLS", 1)
+    first = ProcessPoolExplainer(PidExplainer(), workers=2, min_parallel_rows=1)
+    second = ProcessPoolExplainer(PidExplainer(), workers=2, min_parallel_rows=1)
+    X = pd.DataFrame({"a": range(40)})
+    try:
+        # Concurrent calls: closing the other explainer's pool doesn't cancel the chunks already submitted to it.
+        with ThreadPoolExecutor(max_workers=2) as threads:
+            explanations = list(threads.map(lambda explain: explain(X), [first, second]))
+        for explanation in explanations:
+            np.testing.assert_array_equal(explanation.base_values, np.arange(40))
+        # Only the most recently used pool is still running.
+        assert (first._pool is None) != (second._pool is None)
+    finally:
+        first.close()
+        second.close()
+    assert not parallel_explain._pooled
@@ -0,0 +1,95 @@
+import base64
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+
+from routers.plot_response import encode_plot_payload, plot_response, to_typed_array
+
+
+def _figure():
+    return go.Figure(go.Scatter(x=np.arange(4), y=np.array([0.5, np.nan, 1.5, 2.0], dtype=np.float32)))
+
+
+def test_encode_plot_payload_matches_json_roundtrip():
+    fig = _figure()
+    payload = {
+        "plot_data": fig,
+        "total_variables": 3,
+        "by_output": {"y": {"parity_plot_data": fig, "inputs": ["a", "b"]}},
+        "figures": [fig, fig],
+    }
+
+    expected = {
+        "plot_data": json.loads(fig.to_json()),
+        "total_variables": 3,
+        "by_output": {"y": {"parity_plot_data": json.loads(fig.to_json()), "inputs": ["a", "b"]}},
+        "figures": [json.loads(fig.to_json()), json.loads(fig.to_json())],
+    }
+    assert json.loads(encode_plot_payload(payload)) == expected
+
+
+def test_encode_plot_payload_handles_numpy_and_plain_payloads():
+    assert json.loads(encode_plot_payload({"counts": np.array([1, 2]), "name": "__plot_fragment_0"})) == {
+        "counts": [1, 2],
+        "name": "__plot_fragment_0",
+    }
+
+
+def test_plot_response_is_json():
+    response = plot_response({"plot_data": _figure()})
+    assert response.media_type == "application/json"
+    assert json.loads(response.body)["plot_data"]["data"][0]["type"] == "scatter"
+
+
+def test_to_typed_array_uses_float32_when_precision_allows():
+    values = np.linspace(0.0, 1.0, 50)
+    spec = to_typed_array(values)
+    assert spec["dtype"] == "f4"
+    decoded = np.frombuffer(base64.b64decode(spec["bdata"]), dtype="<f4")
+    np.testing.assert_allclose(decoded, values, rtol=1e-6)
+
+    # Values outside float32's range stay float64.
+    spec = to_typed_array(np.full(50, 1e300))
+    assert spec["dtype"] == "f8"
+    np.testing.assert_array_equal(np.frombuffer(base64.b64decode(spec["bdata"]), dtype="<f8"), np.full(50, 1e300))
+
+
+def test_to_typed_array_downcasts_int64_and_keeps_shape():
+    spec = to_typed_array(np.arange(40, dtype=np.int64).reshape(8, 5) * 100_000)
+    assert spec["dtype"] == "i4"
+    assert spec["shape"] == "8, 5"
+
+
+def test_to_typed_array_skips_non_numeric_and_short_arrays():
+    assert to_typed_array(["a"] * 50) is None
+    assert to_typed_array(np.arange(3.0)) is None
+    assert to_typed_array(np.ones(50, dtype=bool)) is None
+
+
+def test_typed_arrays_encode_trace_arrays_only():
+    x = np.linspace(0.0, 10.0, 100)
+    fig = go.Figure(go.Scatter(x=x, y=x**2, text=[str(v) for v in x]))
+    fig.update_layout(xaxis=dict(range=[0, 10]))
+
+    plot_data = json.loads(encode_plot_payload({"plot_data": fig}, typed_arrays=True))["plot_data"]
+    trace = plot_data["data"][0]
+    assert set(trace["x"]) == {"dtype", "bdata"}
+    assert trace["y"]["dtype"] == "f4"
+    assert trace["text"][0] == "0.0"
+    assert plot_data["layout"]["xaxis"]["range"] == [0, 10]
+
+    values = np.random.default_rng(0).normal(size=1000)
+    payload = {"plot_data": go.Figure(go.Scatter(x=values, y=values))}
+    default_data = json.loads(encode_plot_payload(payload))["plot_data"]["data"]
+    typed_data = json.loads(encode_plot_payload(payload, typed_arrays=True))["plot_data"]["data"]
+    assert len(json.dumps(typed_data)) < len(json.dumps(default_data)) / 3
+
+def test_scatter_plot_typed_arrays_query_parameter(client):
+    response = client.post(
+        "/api/scatter-plots/diabetes_RF?typed_arrays=true",
+        json={"selected_variables": ["age", "bmi"]},
+    )
+    assert response.status_code == 200
+    trace = response.json()["plot_data"]["data"][0]
+    assert trace["x"]["dtype"] in {"f4", "f8"}
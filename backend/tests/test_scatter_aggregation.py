@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scatter_aggregation import (
+    AGGREGATION_ROW_THRESHOLD,
+    bin_points,
+    choose_aggregation,
+    compute_scatter_aggregate,
+    create_aggregated_scatter_figure,
+    decimate_points,
+)
+
+
+def _large_dataset(n_rows=AGGREGATION_ROW_THRESHOLD + 1000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "a": rng.normal(size=n_rows),
+            "b": rng.normal(size=n_rows),
+            "c": rng.uniform(size=n_rows),
+            "label": rng.choice(["x", "y"], size=n_rows),
+        }
+    )
+
+
+def test_choose_aggregation_uses_threshold_and_requested_method():
+    small = pd.DataFrame({"a": [1.0, 2.0], "b": [3.0, 4.0]})
+    large = _large_dataset()
+
+    assert choose_aggregation(small, ["a", "b"]) is None
+    assert choose_aggregation(large, ["a", "b"]) == "bin"
+    assert choose_aggregation(large, ["a", "b"], "none") is None
+    assert choose_aggregation(large, ["a", "b"], "decimate") == "decimate"
+    assert choose_aggregation(small, ["a", "b"], "decimate") == "decimate"
+    assert choose_aggregation(large, ["a"], "decimate") == "bin"
+    # Non-numeric variables can't be binned.
+    assert choose_aggregation(large, ["a", "label"]) == "decimate"
+    with pytest.raises(ValueError):
+        choose_aggregation(large, ["a"], "hexagons")
+
+
+def test_decimate_points_preserves_density_and_keeps_outliers():
+    rng = np.random.default_rng(1)
+    dense = rng.normal(size=(100_000, 2))
+    outlier = np.array([[50.0, 50.0]])
+    values = np.vstack([dense, outlier])
+
+    rows = decimate_points(values, max_points=5_000, resolution=50)
+
+    assert len(rows) < 10_000
+    assert len(values) - 1 in rows
+    # The subsample keeps the shape of the distribution.
+    sample = values[rows[rows < len(dense)]]
+    assert abs(np.mean(np.abs(sample[:, 0]) < 1) - np.mean(np.abs(dense[:, 0]) < 1)) < 0.03
+
+
+def test_decimate_points_keeps_everything_below_the_target():
+    values = np.arange(20.0).reshape(10, 2)
+    np.testing.assert_array_equal(decimate_points(values, max_points=100, resolution=10), np.arange(10))
+
+
+def test_bin_points_counts_every_row():
+    values = np.random.default_rng(2).uniform(size=(1000, 2))
+    binned = bin_points(values, resolution=10)
+    assert binned["counts"].shape == (10, 10)
+    assert binned["counts"].sum() == 1000
+
+    voxels = bin_points(np.random.default_rng(3).uniform(size=(1000, 3)), resolution=5)
+    assert voxels["counts"].sum() == 1000
+    assert (voxels["counts"] > 0).all()
+    assert len(voxels["centers"]) == 3
+
+
+def test_aggregated_figures_by_number_of_variables():
+    dataset = _large_dataset()
+
+    histogram = create_aggregated_scatter_figure(compute_scatter_aggregate(dataset, ["a"], "bin", 50), ["a"])
+    assert histogram.data[0].type == "bar"
+
+    heatmap = create_aggregated_scatter_figure(compute_scatter_aggregate(dataset, ["a", "b"], "bin", 50), ["a", "b"])
+    assert heatmap.data[0].type == "heatmap"
+
+    voxels = create_aggregated_scatter_figure(compute_scatter_aggregate(dataset, ["a", "b", "c"], "bin", 10), ["a", "b", "c"])
+    assert voxels.data[0].type == "scatter3d"
+
+    decimated = compute_scatter_aggregate(dataset, ["a", "label"], "decimate", 20)
+    assert len(decimated["sample"]) < len(dataset)
+    assert create_aggregated_scatter_figure(decimated, ["a", "label"]).data[0].type in {"scatter", "scattergl"}
+
+
+def test_scatter_plot_endpoint_aggregates_large_datasets(client, monkeypatch):
+    dataset = _large_dataset()
+    monkeypatch.setattr("routers.models.get_dataset_name_from_model", lambda model_name: "demo_dataset")
+    monkeypatch.setattr("routers.models.get_dataset", lambda dataset_name, columns=None: dataset[columns])
+
+    response = client.post("/api/scatter-plots/demo_model", json={"selected_variables": ["a", "b"]})
+    assert response.status_code == 200
+    assert response.json()["plot_data"]["data"][0]["type"] == "heatmap"
+
+    response = client.post(
+        "/api/scatter-plots/demo_model", json={"selected_variables": ["a", "b"], "aggregation": "none"}
+    )
+    assert response.status_code == 200
+    assert len(response.json()["plot_data"]["data"][0]["x"]) == len(dataset)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"selected_variables": ["a", "b"], "aggregation": "hexagons"},
+        {"selected_variables": ["a", "b"], "resolution": 0},
+        {"selected_variables": ["a", "b"], "resolution": -5},
+        {"selected_variables": ["a", "b"], "resolution": 12.5},
+        {"selected_variables": ["a", "b"], "resolution": "50"},
+        {"selected_variables": ["a", "b", "c"], "resolution": 200},
+        {"selected_variables": ["a"], "resolution": 10**6},
+    ],
+)
+def test_scatter_plot_endpoint_rejects_invalid_aggregation_requests(client, monkeypatch, body):
+    monkeypatch.setattr("routers.models.get_dataset_name_from_model", lambda model_name: "demo_dataset")
+    monkeypatch.setattr("routers.models.get_dataset", lambda dataset_name, columns=None: _large_dataset()[columns])
+    response = client.post("/api/scatter-plots/demo_model", json=body)
+    assert response.status_code == 400
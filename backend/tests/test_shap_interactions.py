@@ -0,0 +1,138 @@
+import time
+
+import numpy as np
+import pytest
+
+import shap_interactions
+from explainers import get_tree_explainer
+from model_manifest import get_model_summary
+from shap_interactions import (
+    _expand,
+    compute_interactions,
+    create_interaction_heatmap,
+    estimate_interaction_seconds,
+    get_cached_interactions,
+    mean_abs_interactions,
+    top_interacting_pairs,
+)
+from utils import get_dataset
+
+
+@pytest.fixture
+def interactions_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(shap_interactions, "MODELS_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_upper_triangle_round_trip():
+    values = np.random.default_rng(0).normal(size=(5, 4, 4, 2))
+    values = values + values.transpose(0, 2, 1, 3)
+    rows, cols = np.triu_indices(4)
+    np.testing.assert_array_equal(_expand(values[:, rows, cols], 4), values)
+
+
+def test_compute_and_cache_interactions(interactions_dir):
+    progress = []
+    interactions = compute_interactions("linnerud_RF", "Pulse", progress=lambda done, total: progress.append((done, total)))
+    assert progress[-1] == (20, 20)
+    assert list(interactions_dir.glob("linnerud_RF.2.shap-interactions.npz"))
+
+    summary = get_model_summary("linnerud_RF")
+    X = get_dataset(summary["dataset_name"], columns=interactions["inputs"])[interactions["inputs"]]
+    expected = get_tree_explainer("linnerud_RF", "Pulse").shap_interaction_values(X)
+    np.testing.assert_allclose(interactions["values"], expected, rtol=1e-5, atol=1e-4)
+    assert get_cached_interactions("linnerud_RF", "Pulse") is not None
+
+
+def test_cost_estimate_caps_rows_without_choosing_them(interactions_dir, monkeypatch):
+    def _raise(X, n):
+        raise AssertionError("estimating the cost should not cluster the dataset")
+
+    monkeypatch.setattr(shap_interactions, "representative_rows", _raise)
+    monkeypatch.setattr(shap_interactions, "MAX_INTERACTION_ROWS", 15)
+    estimate = estimate_interaction_seconds("linnerud_RF", "Pulse")
+    assert estimate["n_rows"] == 15
+    assert estimate["estimated_seconds"] > 0
+
+
+def test_stale_interactions_are_ignored(interactions_dir, monkeypatch):
+    compute_interactions("linnerud_RF", "Pulse")
+    summary = get_model_summary("linnerud_RF")
+    monkeypatch.setattr(shap_interactions, "get_model_summary", lambda model_name: {**summary, "content_hash": "new"})
+    assert get_cached_interactions("linnerud_RF", "Pulse") is None
+
+
+def test_top_pairs_and_heatmap():
+    mean_abs = np.array([[5.0, 0.1, 0.3], [0.1, 4.0, 0.2], [0.3, 0.2, 3.0]])
+    pairs = top_interacting_pairs(mean_abs, ["a", "b", "c"], n=2)
+    assert [pair["features"] for pair in pairs] == [["a", "c"], ["b", "c"]]
+    assert pairs[0]["mean_abs_interaction"] == pytest.approx(0.6)
+
+    fig = create_interaction_heatmap(mean_abs, ["a", "b", "c"])
+    assert np.isnan(np.asarray(fig.data[0].z, dtype=float).diagonal()).all()
+    assert mean_abs_interactions(np.ones((3, 2, 2, 4))).shape == (2, 2)
+
+
+def _poll(client, job_id):
+    for _ in range(300):
+        status = client.get(f"/api/jobs/{job_id}").json()
+        if status["status"] in ("done", "failed"):
+            return status
+        time.sleep(0.1)
+    raise AssertionError("job did not finish")
+
+
+def test_toggling_main_effects_computes_the_interactions_once(client, interactions_dir, monkeypatch):
+    computed = []
+    compute = shap_interactions._compute_interactions
+
+    def slow_compute(*args):
+        computed.append(args[:2])
+        time.sleep(0.5)
+        return compute(*args)
+
+    monkeypatch.setattr(shap_interactions, "_compute_interactions", slow_compute)
+    job_ids = [
+        client.post(
+            "/api/shap-interaction-plots/linnerud_RF",
+            json={"selected_output": "Weight", "include_main_effects": include_main_effects},
+        ).json()["job_id"]
+        for include_main_effects in (False, True)
+    ]
+    without_main, with_main = [_poll(client, job_id) for job_id in job_ids]
+    assert computed == [("linnerud_RF", "Weight")]
+    assert np.isnan(np.asarray(without_main["result"]["plot_data"]["data"][0]["z"], dtype=float).diagonal()).all()
+    assert not np.isnan(np.asarray(with_main["result"]["plot_data"]["data"][0]["z"], dtype=float).diagonal()).any()
+
+
+def test_interaction_job_is_not_reused_after_the_dataset_changes(client, interactions_dir, monkeypatch):
+    monkeypatch.setattr("routers.shap.get_cached_interactions", lambda model_name, output: None)
+    body = {"selected_output": "Pulse"}
+    job_id = client.post("/api/shap-interaction-plots/linnerud_RF", json=body).json()["job_id"]
+    assert _poll(client, job_id)["status"] == "done"
+
+    monkeypatch.setattr("routers.shap.file_fingerprint", lambda path: "regenerated")
+    new_job_id = client.post("/api/shap-interaction-plots/linnerud_RF", json=body).json()["job_id"]
+    assert new_job_id != job_id
+    assert _poll(client, new_job_id)["status"] == "done"
+
+
+def test_interaction_endpoints(client, interactions_dir):
+    cost = client.get("/api/shap-interaction-cost/linnerud_RF", params={"selected_output": "Waist"}).json()
+    assert cost["n_rows"] == 20 and cost["n_features"] == 3 and not cost["cached"]
+    assert cost["estimated_seconds"] > 0
+
+    response = client.post("/api/shap-interaction-plots/linnerud_RF", json={"selected_output": "Waist"})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    for _ in range(300):
+        status = client.get(f"/api/jobs/{job_id}").json()
+        if status["status"] in ("done", "failed"):
+            break
+        time.sleep(0.1)
+    assert status["status"] == "done"
+    assert len(status["result"]["top_pairs"]) == 3
+
+    response = client.post("/api/shap-interaction-plots/linnerud_RF", json={"selected_output": "Waist"})
+    assert response.status_code == 200
+    assert response.json()["plot_data"]["data"][0]["type"] == "heatmap"
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+import routers.shap
+from shap_plots import (
+    beeswarm_offsets,
+    create_shap_beeswarm_plot,
+    create_shap_class_importance_plot,
+    create_shap_waterfall_plot,
+)
+
+
+def test_beeswarm_offsets_stack_symmetrically_within_row():
+    shap_values = np.zeros((5, 1))  # every point in the same bin
+    offsets = beeswarm_offsets(shap_values, row_height=0.4)[:, 0]
+    assert sorted(np.round(offsets / offsets.max(), 6)) == [-1, -0.5, 0, 0.5, 1]
+    assert np.abs(offsets).max() < 0.4
+
+
+def test_beeswarm_offsets_are_independent_per_feature_and_bin():
+    rng = np.random.default_rng(0)
+    shap_values = np.column_stack([rng.normal(size=300), np.linspace(-1, 1, 300)])
+    offsets = beeswarm_offsets(shap_values)
+    # Evenly spread SHAP values (at most a few per bin) barely pile up.
+    assert np.abs(offsets[:, 1]).max() < np.abs(offsets[:, 0]).max()
+    assert offsets.shape == shap_values.shape
+
+
+def test_beeswarm_plot_orders_features_by_importance():
+    rng = np.random.default_rng(0)
+    features = pd.DataFrame({"a": rng.normal(size=50), "b": rng.normal(size=50), "c": [np.nan] * 5 + [1.0] * 45})
+    shap_values = np.column_stack([features["a"] * 0.1, features["b"] * 3, np.ones(50) * 0.5])
+    fig = create_shap_beeswarm_plot(shap_values, features)
+    assert list(fig.layout.yaxis.ticktext) == ["a", "c", "b"]
+    assert {trace.type for trace in fig.data} == {"scatter"}
+    # The missing values of "c" are drawn in their own (gray) trace.
+    assert sum(len(trace.x) for trace in fig.data) == 150
+
+
+def test_beeswarm_plot_uses_webgl_for_many_points():
+    features = pd.DataFrame(np.random.default_rng(0).normal(size=(400, 6)), columns=list("abcdef"))
+    fig = create_shap_beeswarm_plot(features.to_numpy(), features, webgl_threshold=2000)
+    assert {trace.type for trace in fig.data} == {"scattergl"}
+
+
+def test_class_importance_plot():
+    shap_values = np.random.default_rng(0).normal(size=(20, 4, 3))
+    fig = create_shap_class_importance_plot(shap_values, ["w", "x", "y", "z"])
+    assert [trace.name for trace in fig.data] == ["Class 0", "Class 1", "Class 2"]
+    assert fig.layout.barmode == "stack"
+
+
+def test_shap_summary_endpoint_returns_native_plot(client):
+    response = client.post("/api/shap-summary-plots/linnerud_RF", json={"selected_output": "Weight"})
+    assert response.status_code == 200
+    traces = response.json()["plot_data"]["data"]
+    assert traces and all(trace["type"] in ("scatter", "scattergl") for trace in traces)
+
+    response = client.post("/api/shap-summary-plots/iris_RF", json={"selected_output": "Iris Class"})
+    assert response.status_code == 200
+    assert response.json()["plot_data"]["data"][0]["type"] == "bar"
+
+
+def test_waterfall_plot_collapses_small_contributions():
+    shap_values = np.array([0.5, -2.0, 0.01, 0.02, 1.0])
+    fig = create_shap_waterfall_plot(shap_values, 10.0, [1, 2, 3, 4, 5], list("abcde"), max_display=4)
+    (trace,) = fig.data
+    # Bottom to top: the 2 smallest collapsed, then by increasing |SHAP value|.
+    assert list(trace.y) == ["2 other features", "a = 1", "e = 5", "b = 2"]
+    np.testing.assert_allclose(trace.x, [0.03, 0.5, 1.0, -2.0])
+    assert trace.base == 10.0
+    assert trace.orientation == "h"
+
+
+def test_shap_waterfall_batch_endpoint_looks_up_samples_by_label(client):
+    response = client.post(
+        "/api/shap-waterfall-plots/linnerud_RF/batch",
+        json={"selected_output": "Pulse", "sample_ids": ["7", "2", "13"]},
+    )
+    assert response.status_code == 200
+    plots = response.json()["plots"]
+    assert [plot["sample_id"] for plot in plots] == ["7", "2", "13"]
+    assert all(plot["plot_data"]["data"][0]["type"] == "waterfall" for plot in plots)
+
+    single = client.post(
+        "/api/shap-waterfall-plots/linnerud_RF", json={"selected_output": "Pulse", "selected_sample": ["2"]}
+    ).json()["plot_data"]["data"][0]
+    assert single["x"] == plots[1]["plot_data"]["data"][0]["x"]
+
+
+def test_single_shap_waterfall_takes_a_position_or_a_label(client, monkeypatch):
+    get_dataset = routers.shap.get_dataset
+
+    def reversed_labels(dataset_name, columns=None):
+        dataset = get_dataset(dataset_name, columns=columns)
+        return dataset.set_axis(dataset.index[::-1], axis=0)
+
+    monkeypatch.setattr(routers.shap, "get_dataset", reversed_labels)
+    url = "/api/shap-waterfall-plots/linnerud_RF"
+    by_position = client.post(url, json={"selected_output": "Pulse", "selected_sample": [2]}).json()
+    assert "sample 17" in by_position["plot_data"]["layout"]["title"]["text"]
+    by_label = client.post(url, json={"selected_output": "Pulse", "sample_id": "2"}).json()
+    assert "sample 2" in by_label["plot_data"]["layout"]["title"]["text"]
+
+    assert client.post(url, json={"selected_output": "Pulse", "selected_sample": [20]}).status_code == 404
+
+
+def test_shap_waterfall_batch_endpoint_rejects_unknown_samples(client):
+    response = client.post(
+        "/api/shap-waterfall-plots/linnerud_RF/batch",
+        json={"selected_output": "Pulse", "sample_ids": ["2", "no-such-sample"]},
+    )
+    assert response.status_code == 404
+    assert "no-such-sample" in response.json()["detail"]
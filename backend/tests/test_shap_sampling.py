@@ -0,0 +1,139 @@
+import time
+
+import numpy as np
+import pandas as pd
+import shap
+
+from shap_sampling import SummaryRefinement, representative_rows, schedule_refinement
+
+
+def _blobs(n_per_blob=200):
+    rng = np.random.default_rng(0)
+    centers = np.array([[0, 0], [10, 10], [-10, 10]])
+    values = np.concatenate([center + rng.normal(size=(n_per_blob, 2)) for center in centers])
+    return pd.DataFrame(values, columns=["a", "b"]), np.repeat(np.arange(3), n_per_blob)
+
+
+def test_representative_rows_cover_every_cluster():
+    X, blob = _blobs()
+    rows = representative_rows(X, 6)
+    assert len(np.unique(rows)) == 6
+    assert set(blob[rows]) == {0, 1, 2}
+
+
+def test_representative_rows_prefixes_cover_every_cluster():
+    X, blob = _blobs()
+    rows = representative_rows(X, 300)
+    assert len(np.unique(rows)) == 300
+    # More rows than clusters: every prefix takes from the blobs about in proportion to their sizes.
+    for n in [30, 150, 300]:
+        assert np.bincount(blob[rows[:n]], minlength=3).min() >= n // 6
+
+
+def test_representative_rows_small_dataset():
+    X, _ = _blobs(n_per_blob=2)
+    np.testing.assert_array_equal(representative_rows(X, 10), np.arange(6))
+
+
+def _slow_explain(seconds_per_row):
+    def explain(X):
+        time.sleep(seconds_per_row * len(X))
+        return shap.Explanation(values=X.to_numpy() * 2, base_values=np.zeros(len(X)), data=X.to_numpy())
+
+    return explain
+
+
+def test_refinement_sizes_first_sample_by_measured_cost():
+    X, _ = _blobs()
+    refinement = SummaryRefinement(X, _slow_explain(0.001))
+    refinement.start(time_budget=0.15)
+    assert refinement.seconds_per_row is not None
+    # ~0.1 s left after the pilot, at ~1 ms per row.
+    assert 50 <= refinement.n_done < len(X)
+    assert not refinement.complete
+
+    while refinement.refine_step(time_budget=0.15):
+        pass
+    assert refinement.complete
+    values, base_values, X_explained, version = refinement.snapshot()
+    assert version > 1
+    assert len(set(X_explained.index)) == len(X)
+    np.testing.assert_array_equal(values, X_explained.to_numpy() * 2)
+
+
+def test_refinement_reuses_pilot_rows():
+    X, _ = _blobs()
+    explained_rows = []
+    explain = _slow_explain(0.001)
+
+    def recording_explain(X_rows):
+        explained_rows.append(len(X_rows))
+        return explain(X_rows)
+
+    refinement = SummaryRefinement(X, recording_explain)
+    refinement.start(time_budget=0.15)
+    assert sum(explained_rows) == refinement.n_done
+    values, _, X_explained, _ = refinement.snapshot()
+    np.testing.assert_array_equal(values, X_explained.to_numpy() * 2)
+
+
+def test_refinement_with_cheap_rows_stays_within_budget():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(30_000, 8)))
+    refinement = SummaryRefinement(X, _slow_explain(0), seconds_per_row=1e-6)
+    started = time.perf_counter()
+    refinement.start(time_budget=1.0)
+    # The budget covers every row, but only a bounded number of clusters is fitted to choose them.
+    assert time.perf_counter() - started < 5.0
+    assert refinement.complete
+
+
+def test_background_refinement_uses_the_background_explainer():
+    X, _ = _blobs()
+    explained = {"foreground": 0, "background": 0}
+
+    def counting_explain(kind):
+        def explain(X_rows):
+            explained[kind] += len(X_rows)
+            return _slow_explain(0)(X_rows)
+
+        return explain
+
+    refinement = SummaryRefinement(
+        X, counting_explain("foreground"), seconds_per_row=1e-3, background_explain=counting_explain("background")
+    )
+    refinement.start(time_budget=0.1)
+    n_first = refinement.n_done
+    schedule_refinement(refinement, time_budget=0.1)
+    for _ in range(100):
+        if refinement.complete:
+            break
+        time.sleep(0.05)
+    assert refinement.complete
+    assert explained == {"foreground": n_first, "background": len(X) - n_first}
+
+
+def test_refinement_respects_row_cap():
+    X, _ = _blobs()
+    refinement = SummaryRefinement(X, _slow_explain(0), max_rows=100)
+    refinement.start(time_budget=1.0)
+    assert refinement.complete
+    assert refinement.n_done == 100
+
+
+def test_shap_summary_endpoint_refines_until_complete(client):
+    body = {"selected_output": "target", "time_budget": 0.01}
+    response = client.post("/api/shap-summary-plots/diabetes_RF", json=body)
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["n_rows"] == 442
+    assert payload["n_samples"] <= payload["n_rows"]
+
+    for _ in range(300):
+        if payload["complete"]:
+            break
+        time.sleep(0.1)
+        payload = client.post("/api/shap-summary-plots/diabetes_RF", json=body).json()
+    assert payload["complete"]
+    assert payload["n_samples"] == 442
+    assert payload["version"] >= 1
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import shap_store
+from explainers import get_tree_explainer
+from shap_store import compute_shap_store, get_precomputed_explanation, get_shap_store
+from utils import get_dataset
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(shap_store, "MODELS_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_shap_store_matches_explainer(store_dir):
+    compute_shap_store("linnerud_RF")
+    store = get_shap_store("linnerud_RF")
+    assert store is not None
+    assert store.outputs == ["Weight", "Waist", "Pulse"]
+    assert store.values("Weight").dtype == np.float32
+
+    X = get_dataset("linnerud_dataset", columns=store.inputs("Weight")).iloc[[4, 1]]
+    precomputed = get_precomputed_explanation("linnerud_RF", "Weight", X)
+    expected = get_tree_explainer("linnerud_RF", "Weight")(X)
+    np.testing.assert_allclose(precomputed.values, expected.values, rtol=1e-5, atol=1e-4)
+    np.testing.assert_allclose(precomputed.base_values, expected.base_values, rtol=1e-5)
+    np.testing.assert_array_equal(precomputed.data, X.to_numpy())
+
+
+def test_duplicate_index_labels_fall_back_to_live_explanation(store_dir):
+    compute_shap_store("linnerud_RF")
+    store = get_shap_store("linnerud_RF")
+    X = get_dataset("linnerud_dataset", columns=store.inputs("Weight")).iloc[[4, 1]]
+    store.index = pd.Index(["0"] * len(store.index))
+    assert get_precomputed_explanation("linnerud_RF", "Weight", X) is None
+
+
+def test_stale_shap_store_is_ignored(store_dir, monkeypatch):
+    compute_shap_store("linnerud_RF")
+    monkeypatch.setattr(shap_store, "_expected_hashes", lambda model_name: ("new-model-hash", "dataset-hash"))
+    assert get_shap_store("linnerud_RF") is None
+
+
+def test_missing_shap_store(store_dir):
+    assert get_shap_store("linnerud_RF") is None
+    assert get_precomputed_explanation("linnerud_RF", "Weight", None) is None
+
+
+def test_waterfall_reads_precomputed_values_without_loading_the_model(client, store_dir, monkeypatch):
+    compute_shap_store("linnerud_RF")
+
+    def _raise(model_name):
+        raise AssertionError("the model should not be loaded")
+
+    monkeypatch.setattr("explainers.get_model_and_metadata", _raise)
+    response = client.post(
+        "/api/shap-waterfall-plots/linnerud_RF",
+        json={"selected_output": "Pulse", "selected_sample": ["3"]},
+    )
+    assert response.status_code == 200
@@ -1,6 +1,7 @@
 import numpy as np
+import pandas as pd
 
-from utils import get_dataset_name_from_model, sigmoid
+from utils import compact_to_wide_format, get_dataset_name_from_model, sigmoid, wide_to_compact_format
 
 
 def test_get_dataset_name_from_model():
@@ -11,3 +12,59 @@ def test_sigmoid_scalar_behavior():
     row = np.array([0.0, 1.0])
     coefs = np.array([0.0, 0.0])
     assert sigmoid(row, coefs) == 0.5
+
+
+def test_sigmoid_matrix_matches_rows_and_does_not_overflow():
+    X = np.array([[0.0, 1.0], [2.0, -1.0], [1000.0, 1000.0]])
+    coefs = np.array([[0.5, -1.0], [1.0, 2.0]])  # (outputs, inputs)
+    y = sigmoid(X, coefs.T)
+    assert y.shape == (3, 2)
+    for j, row in enumerate(X[:2]):
+        for k in range(2):
+            assert np.isclose(y[j, k], 1 / (1 + np.exp(-row @ coefs[k])))
+
+    with np.errstate(over="raise"):
+        extreme = sigmoid(np.array([[-1000.0], [1000.0]]), np.array([[1.0]]))
+    assert extreme.ravel().tolist() == [0.0, 1.0]
+
+
+def test_wide_to_compact_format_lists_non_zero_ingredients_in_column_order():
+    wide = pd.DataFrame(
+        {"A": [10.0, 0.0, np.nan], "B": [0.0, 0.0, 5.0], "C": [90.0, 0.0, 95.0]}, index=[7, 8, 9]
+    )
+    compact = wide_to_compact_format(wide)
+
+    assert list(compact.columns) == [
+        "component-1_identifier", "component-1_amount", "component-2_identifier", "component-2_amount",
+    ]
+    assert list(compact.index) == [0, 1, 2]
+    assert compact.loc[0].tolist() == ["A", 10.0, "C", 90.0]
+    assert compact.loc[1].isna().all()
+    assert compact.loc[2].tolist() == ["B", 5.0, "C", 95.0]
+
+
+def test_wide_to_compact_format_keeps_duplicate_ingredient_columns():
+    wide = pd.DataFrame([[10.0, 20.0, 70.0]], columns=["A", "B", "A"])
+    assert wide_to_compact_format(wide).loc[0].tolist() == ["A", 10.0, "B", 20.0, "A", 70.0]
+
+
+def test_compact_to_wide_format_round_trip():
+    rng = np.random.default_rng(0)
+    values = np.where(rng.random((50, 6)) < 0.5, rng.uniform(1, 10, (50, 6)), 0.0)
+    wide = pd.DataFrame(values, columns=["f", "e", "d", "c", "b", "a"])
+
+    round_trip = compact_to_wide_format(wide_to_compact_format(wide))
+    present = wide.columns[(wide > 0).any()]
+    assert list(round_trip.columns) == sorted(present)
+    np.testing.assert_array_equal(round_trip[present].to_numpy(), wide[present].to_numpy())
+
+
+def test_compact_to_wide_format_last_duplicate_wins():
+    compact = pd.DataFrame({
+        "component-1_identifier": ["A", "B"],
+        "component-1_amount": [10.0, 100.0],
+        "component-2_identifier": ["A", np.nan],
+        "component-2_amount": [90.0, np.nan],
+    })
+    wide = compact_to_wide_format(compact)
+    assert wide.to_dict("list") == {"A": [90.0, 0.0], "B": [0.0, 100.0]}
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+import pytest
+
+from workloads import WorkloadPool, WorkloadQueueFull
+
+
+def test_workload_pool_does_not_block_event_loop():
+    pool = WorkloadPool("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = pool.submit(release.wait, 5)
+        # The event loop keeps serving other coroutines while the worker is busy.
+        await asyncio.sleep(0.01)
+        assert pool.stats()["running"] == 1
+        release.set()
+        return await blocked
+
+    assert asyncio.run(scenario()) is True
+    stats = pool.stats()
+    assert stats["completed"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_workload_pool_rejects_when_queue_is_full():
+    pool = WorkloadPool("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = pool.submit(release.wait, 5)
+        await asyncio.sleep(0.01)
+        queued = pool.submit(lambda: "queued")
+        with pytest.raises(WorkloadQueueFull):
+            pool.submit(lambda: "rejected")
+        assert pool.stats()["queue_depth"] == 1
+        release.set()
+        return await running, await queued
+
+    assert asyncio.run(scenario()) == (True, "queued")
+    stats = pool.stats()
+    assert stats["rejected"] == 1
+    assert stats["max_wait_seconds"] > 0
+
+
+def test_cancelled_queued_calls_leave_the_queue():
+    pool = WorkloadPool("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = pool.submit(release.wait, 5)
+        await asyncio.sleep(0.01)
+        # E.g. the client disconnected while its request was queued.
+        pool.submit(lambda: "cancelled").cancel()
+        await asyncio.sleep(0.01)
+        assert pool.stats()["queue_depth"] == 0
+        queued = pool.submit(lambda: "queued")
+        release.set()
+        return await running, await queued
+
+    assert asyncio.run(scenario()) == (True, "queued")
+    stats = pool.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["running"] == 0
+    assert stats["completed"] == 2
+
+
+def test_workload_stats_endpoint_reports_each_class(client):
+    response = client.get("/api/workload-stats")
+    assert response.status_code == 200
+    workloads = response.json()["workloads"]
+    assert set(workloads) == {"plotting", "explainability", "molecular", "generation"}
+    assert "queue_depth" in workloads["plotting"]
@@ -6,7 +6,12 @@ import os
 import pandas as pd
 import pickle
 from PIL import Image
-from typing import Any, List, Tuple, Optional
+from scipy.special import expit
+from typing import Any, Callable, List, Tuple, Optional
+
+from artifact_cache import artifact_cache
+from dataset_store import ARROW_SUFFIX, read_arrow_dataset
+from formulation_presolve import FormulationPresolve, presolve_formulation
 
 
 PROJECT_ROOT_DIR = os.path.abspath(__file__)
@@ -18,14 +23,43 @@ def get_dataset_name_from_model(model_name: str) -> str:
     return dataset_name
 
 
-def get_dataset(dataset_name: str) -> pd.DataFrame:
+def _load_pickle(path: str) -> Any:
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+# NOTE: both loaders below go through the process-wide `artifact_cache`, so the returned
+# objects are shared between requests and must not be mutated in place (copy first).
+def get_dataset_path(dataset_name: str) -> str:
+    """Path of the file `get_dataset` reads for ``dataset_name``: the `.arrow` file if present, else the `.pkl`."""
     datasets_path = os.path.join(
         os.path.dirname(PROJECT_ROOT_DIR), "datasets"
     )
-    dataset_path = os.path.join(datasets_path, f"{dataset_name}.pkl")
+    arrow_path = os.path.join(datasets_path, f"{dataset_name}{ARROW_SUFFIX}")
+    if os.path.exists(arrow_path):
+        return arrow_path
+    return os.path.join(datasets_path, f"{dataset_name}.pkl")
+
 
-    with open(dataset_path, "rb") as f:
-        dataset = pickle.load(f)
+def get_dataset(dataset_name: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Load a dataset, optionally reading only ``columns`` (the index is always included).
+
+    Prefers the memory-mapped `{dataset_name}.arrow` file (see `dataset_store.py`) and falls
+    back to `{dataset_name}.pkl`, which has to be unpickled in full.
+    """
+    columns = None if columns is None else list(dict.fromkeys(columns))
+
+    dataset_path = get_dataset_path(dataset_name)
+    if dataset_path.endswith(ARROW_SUFFIX):
+        return artifact_cache.get(
+            dataset_path,
+            lambda path: read_arrow_dataset(path, columns=columns),
+            variant=None if columns is None else tuple(columns),
+        )
+
+    dataset = artifact_cache.get(dataset_path, _load_pickle)
+    if columns is not None:
+        dataset = dataset[columns]
 
     return dataset
 
@@ -34,8 +68,7 @@ def get_model_and_metadata(model_name: str) -> dict[str, Any]:
     models_path = os.path.join(os.path.dirname(PROJECT_ROOT_DIR), "models")
     model_path = os.path.join(models_path, f"{model_name}.pkl")
 
-    with open(model_path, "rb") as f:
-        model_and_metadata = pickle.load(f)
+    model_and_metadata = artifact_cache.get(model_path, _load_pickle)
 
     return model_and_metadata
 
@@ -51,10 +84,14 @@ def fig2img(
     return img
 
 
-### D-dimensional sigmoid function with the given set of D coefficients:
+### D-dimensional sigmoid function with the given set of D coefficients.
+### Also takes a (rows, D) matrix of inputs and a (D, outputs) matrix of coefficients, for all rows & outputs at once.
 def sigmoid(input_row, coefs):
-    value = 1 / (1 + np.exp(-1 * np.matmul(input_row, coefs)))
-    return value
+    # `expit` doesn't overflow for large negative logits (unlike 1 / (1 + exp(-x))).
+    logits = np.matmul(input_row, coefs)
+    if isinstance(logits, np.ndarray) and logits.dtype == np.float64:
+        return expit(logits, out=logits)
+    return expit(logits)
 
 
 def wide_to_compact_format(df: DataFrame):
@@ -72,25 +109,31 @@ def wide_to_compact_format(df: DataFrame):
     """
 
     ### TODO: this function should ideally catch duplicate ingredient name columns if they exist and consolidate them before converting to compact format (so you don't get "Ingredient A" and "Ingredient A.1" showing up in the compact format)
-    # Create an empty list to store the transformed rows
-    compact_rows = []
-    
-    # Iterate through each formulation (row)
-    for idx, row in df.iterrows():
-        # Get non-zero ingredients and their percentages
-        ingredients = row[row > 0]
-        
-        # Create a new row with alternating ingredient names and percentages
-        new_row = {}
-        for i, (ingredient_name, percentage) in enumerate(ingredients.items(), 1):
-            new_row[f'component-{0+i}_identifier'] = ingredient_name
-            new_row[f'component-{0+i}_amount'] = percentage
-            
-        compact_rows.append(new_row)
-    
-    # Convert to DataFrame
-    result_df = pd.DataFrame(compact_rows)
-    
+    # Positions of every formulation's non-zero ingredients (NaN counts as absent), in row-major order:
+    # grouped by row, and in column order within each row. Everything below is linear in their number.
+    values = df.to_numpy()
+    rows, cols = np.nonzero(df.gt(0).to_numpy())
+    n_rows = len(df)
+    n_present = np.bincount(rows, minlength=n_rows)
+    slots = np.arange(len(rows)) - (np.cumsum(n_present) - n_present)[rows]
+    width = int(n_present.max()) if n_rows else 0
+
+    identifiers = np.full((n_rows, width), np.nan, dtype=object)
+    identifiers[rows, slots] = np.asarray(df.columns, dtype=object)[cols]
+    amounts = np.full((n_rows, width), np.nan)
+    amounts[rows, slots] = values[rows, cols]
+
+    # Alternating ingredient names and percentages; formulations with fewer ingredients are padded with NaN.
+    compact_columns = {}
+    for slot in range(width):
+        amount = amounts[:, slot]
+        if (n_present > slot).all():
+            amount = amount.astype(values.dtype)
+        compact_columns[f'component-{slot + 1}_identifier'] = identifiers[:, slot]
+        compact_columns[f'component-{slot + 1}_amount'] = amount
+
+    result_df = pd.DataFrame(compact_columns, index=pd.RangeIndex(n_rows))
+
     return result_df
 
 
@@ -106,36 +149,28 @@ def compact_to_wide_format(df):
     Returns:
     pandas.DataFrame: Transformed DataFrame in wide format where:
         - Each row is a formulation
-        - Each column is an ingredient with its weight percentage
+        - Each column is an ingredient with its weight percentage (0 where absent)
     """
-    # Create a list to store the transformed rows
-    wide_rows = []
-    
-    # Get all unique ingredients across all formulations
-    ingredient_columns = [col for col in df.columns if 'Name' in col]
-    all_ingredients = set()
-    for col in ingredient_columns:
-        all_ingredients.update(df[col].dropna().unique())
-    
-    # Process each formulation
-    for idx, row in df.iterrows():
-        # Create a dictionary with all ingredients initialized to 0
-        formulation = {ingredient: 0 for ingredient in all_ingredients}
-        
-        # Fill in the actual values
-        for i in range(1, len(df.columns) // 2 + 1):
-            name_col = f'component-{0+i}_identifier'
-            weight_col = f'component-{0+i}_amount'
-            
-            if name_col in df.columns and pd.notna(row[name_col]):
-                ingredient_name = row[name_col]
-                formulation[ingredient_name] = row[weight_col]
-        
-        wide_rows.append(formulation)
-    
-    # Convert to DataFrame
-    result_df = pd.DataFrame(wide_rows)
-    
+    # Stack the (identifier, amount) pairs into one long (row, ingredient, amount) table.
+    pairs = [
+        (f'component-{i}_identifier', f'component-{i}_amount')
+        for i in range(1, len(df.columns) // 2 + 1)
+        if f'component-{i}_identifier' in df.columns
+    ]
+    n_rows = len(df)
+    long_df = pd.DataFrame({
+        "row": np.tile(np.arange(n_rows), len(pairs)),
+        "ingredient": np.concatenate([df[name_col].to_numpy(dtype=object) for name_col, _ in pairs] or [np.empty(0, dtype=object)]),
+        "amount": np.concatenate([df[weight_col].to_numpy() for _, weight_col in pairs] or [np.empty(0)]),
+    })
+    long_df = long_df[long_df["ingredient"].notna()]
+    # An ingredient listed twice in one formulation takes its last amount.
+    long_df = long_df.drop_duplicates(["row", "ingredient"], keep="last")
+
+    result_df = long_df.pivot(index="row", columns="ingredient", values="amount")
+    result_df = result_df.reindex(pd.RangeIndex(n_rows)).fillna(0)
+    result_df.columns.name = None
+
     # Sort columns alphabetically for consistency
     result_df = result_df.reindex(sorted(result_df.columns), axis=1)
     
@@ -243,7 +278,7 @@ def compact_to_wide_format(df):
 _PRESENT_EPS = 1e-9
 
 
-def _fill_remaining_room(room: np.ndarray, remaining: float) -> np.ndarray:
+def _fill_remaining_room(room: np.ndarray, remaining: float, rng: np.random.Generator) -> np.ndarray:
     """Randomly distribute ``remaining`` mass across items, each capped by ``room``.
 
     The allocation always sums to ``remaining`` provided ``0 <= remaining <= sum(room)``
@@ -255,7 +290,7 @@ def _fill_remaining_room(room: np.ndarray, remaining: float) -> np.ndarray:
     if k == 0:
         return alloc
 
-    order = np.random.permutation(k)
+    order = rng.permutation(k)
     room_ordered = room[order]
 
     # Suffix sums of the remaining room after each position in ``order``.
@@ -268,7 +303,7 @@ def _fill_remaining_room(room: np.ndarray, remaining: float) -> np.ndarray:
         remaining_room_after = suffix_sums[pos + 1]
         lo = max(0.0, rem - remaining_room_after)
         hi = min(room_ordered[pos], rem)
-        amount = lo if hi <= lo else float(np.random.uniform(lo, hi))
+        amount = lo if hi <= lo else float(rng.uniform(lo, hi))
         alloc[order[pos]] = amount
         rem -= amount
 
@@ -281,6 +316,7 @@ def _allocate_present(
     mins: np.ndarray,
     maxs: np.ndarray,
     n: int,
+    rng: np.random.Generator,
 ) -> Optional[np.ndarray]:
     """Allocate ``target`` mass across a fixed set of present ingredients.
 
@@ -303,7 +339,7 @@ def _allocate_present(
     if room.sum() < remaining - 1e-9:
         return None
 
-    add = _fill_remaining_room(room, max(0.0, remaining))
+    add = _fill_remaining_room(room, max(0.0, remaining), rng)
     vec[present_indices] = base + add
     return vec
 
@@ -315,6 +351,7 @@ def _sample_constrained_simplex(
     required: np.ndarray,
     min_count: int,
     max_count: int,
+    rng: np.random.Generator,
     attempts: int = 300,
 ) -> Optional[np.ndarray]:
     """Sample ``n`` non-negative amounts summing to ``target``.
@@ -338,24 +375,228 @@ def _sample_constrained_simplex(
         return None
 
     for _ in range(attempts):
-        n_present = np.random.randint(lo_count, hi_count + 1)
+        n_present = rng.integers(lo_count, hi_count + 1)
         n_optional = n_present - n_required
         if n_optional < 0 or n_optional > len(optional_indices):
             continue
         if n_optional > 0:
             chosen = list(
-                np.random.choice(optional_indices, size=n_optional, replace=False)
+                rng.choice(optional_indices, size=n_optional, replace=False)
             )
         else:
             chosen = []
         present_indices = np.array(required_indices + chosen, dtype=int)
-        vec = _allocate_present(present_indices, target, mins, maxs, n)
+        vec = _allocate_present(present_indices, target, mins, maxs, n, rng)
         if vec is not None:
             return vec
 
     return None
 
 
+### Batched (vectorized) versions of the samplers above, drawing many formulations at once.
+# Each function takes arrays with one row per formulation being drawn, plus masks of which rows
+# succeeded; rows are independent, so a row's distribution is the same as with the one-at-a-time helpers.
+
+# Most formulation attempts drawn at once by `group_aware_sample_formulation_space`.
+_SAMPLER_BATCH_ROWS = 65_536
+# Attempts per formulation before giving up (as with the original one-at-a-time sampler).
+_MAX_SAMPLE_ATTEMPTS = 5000
+
+
+def _exclusive_cumsum(values: np.ndarray) -> np.ndarray:
+    """Row-wise sums of the values before each position."""
+    cumsum = np.cumsum(values, axis=1)
+    return np.concatenate([np.zeros((len(values), 1)), cumsum[:, :-1]], axis=1)
+
+
+def _batch_fill_remaining_room(room: np.ndarray, remaining: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Row-wise `_fill_remaining_room`: distribute ``remaining`` (rows,) across items capped by ``room`` (rows, k).
+
+    Items are visited in an independent random order per row. Items with no room (e.g. absent
+    ingredients, padded in with zero room) get nothing, and don't change the other items' distribution.
+    """
+    n_rows, k = room.shape
+    alloc = np.zeros((n_rows, k))
+    if k == 0 or n_rows == 0:
+        return alloc
+
+    order = np.argsort(rng.random((n_rows, k)), axis=1)
+    room_ordered = np.take_along_axis(room, order, axis=1)
+    # Room still available after each position, summed from the end (like the one-row version).
+    room_after = np.zeros((n_rows, k))
+    room_after[:, :-1] = np.cumsum(room_ordered[:, :0:-1], axis=1)[:, ::-1]
+    uniforms = rng.random((n_rows, k))
+
+    rows = np.arange(n_rows)
+    rem = np.asarray(remaining, dtype=float).copy()
+    for pos in range(k):
+        lo = np.maximum(0.0, rem - room_after[:, pos])
+        hi = np.minimum(room_ordered[:, pos], rem)
+        amount = np.where(hi <= lo, lo, lo + (hi - lo) * uniforms[:, pos])
+        amount[room_ordered[:, pos] <= 0] = 0.0
+        alloc[rows, order[:, pos]] = amount
+        rem -= amount
+
+    return alloc
+
+
+def _batch_allocate_present(
+    present: np.ndarray,
+    target: np.ndarray,
+    mins: np.ndarray,
+    maxs: np.ndarray,
+    rng: np.random.Generator,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise `_allocate_present`: allocate ``target`` (rows,) across the ``present`` (rows, n) items.
+
+    Returns the (rows, n) allocations and a (rows,) mask of the rows whose present set can accommodate ``target``
+    (the allocations of the other rows are meaningless).
+    """
+    # Floor zero lower bounds so present ingredients are strictly positive.
+    base = np.where(present, np.maximum(mins, _PRESENT_EPS), 0.0)
+    remaining = target - base.sum(axis=1)
+    room = np.where(present, maxs - base, 0.0)
+    ok = np.where(
+        present.any(axis=1),
+        (remaining >= -1e-9) & (room.sum(axis=1) >= remaining - 1e-9),
+        np.abs(target) < 1e-12,
+    )
+
+    alloc = np.zeros(present.shape)
+    alloc[ok] = base[ok] + _batch_fill_remaining_room(room[ok], np.maximum(0.0, remaining[ok]), rng)
+    return alloc, ok
+
+
+def _batch_sample_constrained_simplex(
+    target: np.ndarray,
+    counts: np.ndarray,
+    mins: np.ndarray,
+    maxs: np.ndarray,
+    required: np.ndarray,
+    rng: np.random.Generator,
+    attempts: int = 300,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise `_sample_constrained_simplex` with exactly ``counts`` (rows,) present ingredients.
+
+    Each row picks its optional ingredients uniformly at random (required ones are always present),
+    retrying with a new pick until the present set can accommodate ``target``, up to ``attempts`` times.
+    Returns the (rows, n) amounts and a (rows,) mask of the rows that succeeded.
+    """
+    n_rows, n = len(target), len(mins)
+    vecs = np.zeros((n_rows, n))
+    ok = np.zeros(n_rows, dtype=bool)
+
+    # Rows that no pick can satisfy would fail every attempt: skip them. With ``count`` present
+    # ingredients, the smallest possible sum of lower bounds and the largest possible sum of upper
+    # bounds come from the optional ingredients with the smallest lower/largest upper bounds.
+    base = np.maximum(mins, _PRESENT_EPS)
+    n_optional = np.clip(counts - required.sum(), 0, (~required).sum())
+    min_base = base[required].sum() + np.r_[0.0, np.cumsum(np.sort(base[~required]))][n_optional]
+    max_capacity = maxs[required].sum() + np.r_[0.0, np.cumsum(np.sort(maxs[~required])[::-1])][n_optional]
+    pending = (counts <= n) & (min_base <= target + 1e-9) & (max_capacity >= target - 1e-9)
+
+    for _ in range(attempts):
+        rows = np.flatnonzero(pending)
+        if len(rows) == 0:
+            break
+        # The ``count`` lowest random keys are present; required ingredients always come first.
+        keys = rng.random((len(rows), n))
+        keys[:, required] = -1.0
+        present = np.zeros((len(rows), n), dtype=bool)
+        np.put_along_axis(present, np.argsort(keys, axis=1), np.arange(n) < counts[rows, np.newaxis], axis=1)
+        alloc, alloc_ok = _batch_allocate_present(present, target[rows], mins, maxs, rng)
+        vecs[rows[alloc_ok]] = alloc[alloc_ok]
+        ok[rows[alloc_ok]] = True
+        pending[rows[alloc_ok]] = False
+    return vecs, ok
+
+
+def _batch_choose_present_groups(
+    n_rows: int,
+    forced: np.ndarray,
+    group_lowers: np.ndarray,
+    group_uppers: np.ndarray,
+    rng: np.random.Generator,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Pick which groups are present in each of ``n_rows`` formulations (forced + random optional).
+
+    Each optional group is present with probability 1/2. Rows short of capacity to reach a total
+    of 1.0 add absent optional groups (in random order) until they aren't; rows whose present lower
+    bounds overshoot 1.0 drop optional groups (largest lower bound first) until they don't.
+    Returns the (rows, groups) presence mask, and a (rows,) mask of the rows that ended up feasible.
+    """
+    n_groups = len(forced)
+    optional = ~forced
+    # Random shuffle of the optional groups: ascending keys.
+    keys = rng.random((n_rows, n_groups))
+    chosen = optional & (rng.random((n_rows, n_groups)) < 0.5)
+    present = forced | chosen
+
+    # Add unchosen optional groups (last shuffled first) while the present upper bounds sum to < 1.0.
+    leftover = optional & ~chosen
+    order = np.argsort(np.where(leftover, -keys, np.inf), axis=1)
+    leftover_ordered = np.take_along_axis(leftover, order, axis=1)
+    uppers_ordered = np.where(leftover_ordered, group_uppers[order], 0.0)
+    uppers_before = np.where(present, group_uppers, 0.0).sum(axis=1, keepdims=True) + _exclusive_cumsum(uppers_ordered)
+    added = np.zeros_like(present)
+    np.put_along_axis(added, order, leftover_ordered & (uppers_before < 1.0 - 1e-9), axis=1)
+    present |= added
+
+    # Drop optional groups while the present lower bounds sum to > 1.0: largest lower bound first,
+    # ties in the order they were added (chosen groups in shuffled order, then added groups).
+    droppable = present & optional
+    ties = np.where(chosen, keys, 2.0 - keys)
+    lowers = np.broadcast_to(group_lowers, present.shape)
+    order = np.lexsort((ties, -lowers, ~droppable), axis=1)
+    droppable_ordered = np.take_along_axis(droppable, order, axis=1)
+    lowers_ordered = np.where(droppable_ordered, group_lowers[order], 0.0)
+    lowers_before = np.where(present, group_lowers, 0.0).sum(axis=1, keepdims=True) - _exclusive_cumsum(lowers_ordered)
+    dropped = np.zeros_like(present)
+    np.put_along_axis(dropped, order, droppable_ordered & (lowers_before > 1.0 + 1e-9), axis=1)
+    present &= ~dropped
+
+    ok = (
+        present.any(axis=1)
+        & (np.where(present, group_lowers, 0.0).sum(axis=1) <= 1.0 + 1e-9)
+        & (np.where(present, group_uppers, 0.0).sum(axis=1) >= 1.0 - 1e-9)
+    )
+    return present, ok
+
+
+def _batch_choose_counts(
+    present: np.ndarray,
+    count_lows: np.ndarray,
+    count_highs: np.ndarray,
+    global_min: int,
+    global_max: int,
+    rng: np.random.Generator,
+    attempts: int = 200,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Pick a number of present ingredients per present group, uniformly in [low, high], whose sum lands in
+    the global window; retried up to ``attempts`` times per row.
+
+    Returns the (rows, groups) counts (0 for absent groups) and a (rows,) mask of the rows that succeeded.
+    """
+    n_rows, n_groups = present.shape
+    counts = np.zeros((n_rows, n_groups), dtype=int)
+    # A present group that can't hold its minimum count fails the row outright.
+    pending = ~(present & (count_lows > count_highs)).any(axis=1)
+    ok = np.zeros(n_rows, dtype=bool)
+    spans = np.maximum(count_highs - count_lows + 1, 1)
+    for _ in range(attempts):
+        rows = np.flatnonzero(pending)
+        if len(rows) == 0:
+            break
+        draws = count_lows + np.floor(rng.random((len(rows), n_groups)) * spans).astype(int)
+        draws = np.where(present[rows], draws, 0)
+        totals = draws.sum(axis=1)
+        good = (totals >= global_min) & (totals <= global_max)
+        counts[rows[good]] = draws[good]
+        ok[rows[good]] = True
+        pending[rows[good]] = False
+    return counts, ok
+
+
 def gibbs_sample_formulation_space(
     n_ingredients: int,
     constraints: Optional[List[Tuple[float, float]]] = None,
@@ -364,6 +605,7 @@ def gibbs_sample_formulation_space(
     min_ingredients_per_formulation: Optional[int] = None,
     max_ingredients_per_formulation: Optional[int] = None,
     required: Optional[List[bool]] = None,
+    rng: Optional[np.random.Generator] = None,
 ):
     """
     Generate samples of ingredient formulations using Gibbs sampling.
@@ -384,11 +626,15 @@ def gibbs_sample_formulation_space(
     - required: per-ingredient flags; when True, the ingredient must be present in every formulation
       and its amount must stay within [min, max] (cannot be zero). When False (default), an
       ingredient may be omitted (zero) even if it has a positive lower bound.
+    - rng: random number generator to draw from (a fresh, unseeded one when None)
 
     Returns:
     - samples: array of shape (n_samples, n_ingredients)
     """
 
+    if rng is None:
+        rng = np.random.default_rng()
+
     if constraints is None:
         constraints = [None] * n_ingredients
     elif len(constraints) != n_ingredients:
@@ -472,7 +718,7 @@ def gibbs_sample_formulation_space(
                 raise ValueError(
                     "Cannot satisfy ingredient-count constraints with the given required ingredients."
                 )
-            extra_indices = np.random.choice(
+            extra_indices = rng.choice(
                 optional_indices, size=n_optional_to_activate, replace=False
             )
             return np.concatenate([required_indices, extra_indices])
@@ -482,7 +728,7 @@ def gibbs_sample_formulation_space(
         current = np.zeros(n_ingredients)
         
         # Randomly select how many ingredients to use
-        n_present = np.random.randint(min_ingredients_per_formulation, max_ingredients_per_formulation + 1)
+        n_present = rng.integers(min_ingredients_per_formulation, max_ingredients_per_formulation + 1)
         present_indices = select_present_indices(n_present)
         
         # Set present ingredients to their minimum values
@@ -548,14 +794,14 @@ def gibbs_sample_formulation_space(
         for _ in range(n_ingredients * 2):  # More steps for better mixing with activation/deactivation
             
             # Randomly choose between different types of moves
-            move_type = np.random.choice(['transfer', 'activate', 'deactivate'], p=[0.6, 0.2, 0.2])
+            move_type = rng.choice(['transfer', 'activate', 'deactivate'], p=[0.6, 0.2, 0.2])
             
             present_ingredients = [i for i in range(n_ingredients) if current[i] > 1e-12]
             absent_ingredients = [i for i in range(n_ingredients) if current[i] <= 1e-12]
             
             if move_type == 'transfer' and len(present_ingredients) >= 2:
                 # Transfer between two present ingredients
-                i, j = np.random.choice(present_ingredients, 2, replace=False)
+                i, j = rng.choice(present_ingredients, 2, replace=False)
                 
                 # For present ingredients, they must stay within [min, max] or go to 0
                 # Calculate valid range for transfer
@@ -563,7 +809,7 @@ def gibbs_sample_formulation_space(
                 delta_max = min(maxs[i] - current[i], current[j] - mins[j])
                 
                 if delta_max > delta_min:
-                    delta = np.random.uniform(delta_min, delta_max)
+                    delta = rng.uniform(delta_min, delta_max)
                     
                     # Update formulation
                     current[i] += delta
@@ -578,12 +824,12 @@ def gibbs_sample_formulation_space(
             
             elif move_type == 'activate' and len(absent_ingredients) > 0 and len(present_ingredients) < max_ingredients_per_formulation:
                 # Activate an absent ingredient
-                i = np.random.choice(absent_ingredients)
+                i = rng.choice(absent_ingredients)
                 
                 # Find present ingredients to take from
                 candidates = [j for j in present_ingredients if current[j] > mins[j] + 1e-12]
                 if candidates:
-                    j = np.random.choice(candidates)
+                    j = rng.choice(candidates)
                     
                     # Calculate how much we need to activate ingredient i
                     min_to_activate = mins[i]
@@ -593,7 +839,7 @@ def gibbs_sample_formulation_space(
                         # We can activate ingredient i
                         # Take the minimum required plus some random additional amount
                         max_additional = min(maxs[i] - mins[i], max_available_from_j - min_to_activate)
-                        additional = np.random.uniform(0, max_additional) if max_additional > 0 else 0
+                        additional = rng.uniform(0, max_additional) if max_additional > 0 else 0
                         transfer_amount = min_to_activate + additional
                         
                         current[i] = transfer_amount
@@ -610,7 +856,7 @@ def gibbs_sample_formulation_space(
                 deactivatable = [j for j in present_ingredients if not required[j]]
                 if not deactivatable:
                     continue
-                i = np.random.choice(deactivatable)
+                i = rng.choice(deactivatable)
                 
                 # Transfer all of this ingredient's amount to other present ingredients
                 amount_to_redistribute = current[i]
@@ -633,7 +879,7 @@ def gibbs_sample_formulation_space(
                         # Not enough room in current present ingredients
                         # Try to activate a new ingredient to take the excess
                         if len(absent_ingredients) > 0:
-                            k = np.random.choice(absent_ingredients)
+                            k = rng.choice(absent_ingredients)
                             if maxs[k] >= mins[k] + amount_to_redistribute - total_room:
                                 # Fill up existing present ingredients
                                 for idx, j in enumerate(other_present):
@@ -697,11 +943,9 @@ def gibbs_sample_formulation_space(
     return np.array(samples)
 
 
-def group_aware_sample_formulation_space(
+def _group_aware_sampler(
     n_ingredients: int,
     constraints: Optional[List[Tuple[float, float]]] = None,
-    n_samples: int = 100,
-    burn_in: int = 100,
     min_ingredients_per_formulation: Optional[int] = None,
     max_ingredients_per_formulation: Optional[int] = None,
     required: Optional[List[bool]] = None,
@@ -709,30 +953,12 @@ def group_aware_sample_formulation_space(
     group_constraints: Optional[List[Tuple[float, float]]] = None,
     group_min_counts: Optional[List[int]] = None,
     group_max_counts: Optional[List[int]] = None,
-):
-    """
-    Generate samples of ingredient formulations using a hierarchical (group-aware) sampler.
-
-    Parameters:
-    - n_ingredients: number of ingredients
-    - constraints: list of (min, max) tuples for each ingredient, or None for unconstrained
-    - n_samples: number of samples to generate
-    - burn_in: retained for backwards compatibility (unused; samples are drawn independently)
-    - min_ingredients_per_formulation: minimum number of ingredients used (non-zero) per formulation (global)
-    - max_ingredients_per_formulation: maximum number of ingredients used (non-zero) per formulation (global)
-    - required: per-ingredient flags; when True, the ingredient must be present in every formulation
-      and its amount must stay within [min, max] (cannot be zero). When False (default), an
-      ingredient may be omitted (zero) even if it has a positive lower bound.
-    - group_index: per-ingredient group id (0..n_groups-1). When None, all ingredients form a
-      single implicit group spanning the whole formulation.
-    - group_constraints: list of (min, max) bounds on the SUM of each group's ingredient amounts.
-      Group bounds are CONDITIONAL: they apply only when the group is present (at least one of its
-      ingredients is present). A group whose total is 0 (entirely absent) is always allowed unless
-      the group is forced present (has a required ingredient or a positive group_min_count).
-    - group_min_counts / group_max_counts: min/max number of present ingredients per group.
+) -> Tuple[Optional[FormulationPresolve], Callable, Callable]:
+    """Validate and presolve a `group_aware_sample_formulation_space` configuration.
 
-    Returns:
-    - samples: array of shape (n_samples, n_ingredients)
+    Returns the presolve (None without ingredients), ``draw_batch(n_rows, rng) -> (samples, ok)``, which
+    makes one sampling attempt per row, and ``check_samples(samples)``, which raises if accepted samples
+    break a bound.
     """
 
     if constraints is None:
@@ -861,142 +1087,248 @@ def group_aware_sample_formulation_space(
             f"max_ingredients_per_formulation (provided: {global_max}) cannot exceed n_ingredients (provided: {n_ingredients})."
         )
 
-    optional_groups = [g for g in range(n_groups) if not forced_present[g]]
-    forced_groups = [g for g in range(n_groups) if forced_present[g]]
-
-    def choose_present_groups() -> Optional[List[int]]:
-        """Pick which groups are present this formulation (forced + random optional)."""
-        present = list(forced_groups)
-        shuffled = list(optional_groups)
-        np.random.shuffle(shuffled)
-        for g in shuffled:
-            if np.random.rand() < 0.5:
-                present.append(g)
-
-        # Ensure enough capacity to reach a total of 1.0; add optional groups if short.
-        leftover = [g for g in shuffled if g not in present]
-        while float(np.sum(group_uppers[present])) < 1.0 - 1e-9 and leftover:
-            present.append(leftover.pop())
-
-        # If the present lower bounds overshoot 1.0, drop optional groups (largest lower first).
-        droppable = sorted(
-            [g for g in present if not forced_present[g]],
-            key=lambda g: group_lowers[g],
-            reverse=True,
+    forced = np.array(forced_present, dtype=bool)
+    count_lows = np.array(
+        [max(1, group_min_counts[g], n_required_in_group[g]) for g in range(n_groups)], dtype=int
+    )
+    count_highs = np.array(group_max_counts, dtype=int)
+    presolve = None
+    if n_ingredients > 0:
+        # Raises if the bounds can't be met together. Its tightened bounds are only reported: drawing from
+        # them would change how often each group and count is accepted, and so the samples' distribution.
+        presolve = presolve_formulation(
+            mins, maxs, required, group_index, group_lowers, group_uppers,
+            group_min_counts, group_max_counts, global_min, global_max,
         )
-        di = 0
-        while float(np.sum(group_lowers[present])) > 1.0 + 1e-9 and di < len(droppable):
-            present.remove(droppable[di])
-            di += 1
-
-        if not present:
-            return None
-        if float(np.sum(group_lowers[present])) > 1.0 + 1e-9:
-            return None
-        if float(np.sum(group_uppers[present])) < 1.0 - 1e-9:
-            return None
-        return sorted(present)
-
-    def choose_counts(present: List[int], attempts: int = 200) -> Optional[dict]:
-        """Pick a per-group present count whose sum lands in the global window."""
-        for _ in range(attempts):
-            counts = {}
-            ok = True
-            for g in present:
-                lo = max(1, group_min_counts[g], n_required_in_group[g])
-                hi = group_max_counts[g]
-                if lo > hi:
-                    ok = False
-                    break
-                counts[g] = int(np.random.randint(lo, hi + 1))
-            if not ok:
-                return None
-            total = sum(counts.values())
-            if global_min <= total <= global_max:
-                return counts
-        return None
-
-    def generate_one_sample() -> np.ndarray:
-        max_attempts = 5000
-        for _ in range(max_attempts):
-            present = choose_present_groups()
-            if present is None:
-                continue
-            counts = choose_counts(present)
-            if counts is None:
-                continue
-
-            # Sample group totals summing to 1 with each present total in [L_g, U_g].
-            totals = _allocate_present(
-                np.arange(len(present)),
-                1.0,
-                group_lowers[present],
-                group_uppers[present],
-                len(present),
-            )
-            if totals is None:
-                continue
-
-            vec = np.zeros(n_ingredients)
-            ok = True
-            for idx, g in enumerate(present):
-                member_idx = members[g]
-                local = _sample_constrained_simplex(
-                    target=float(totals[idx]),
-                    mins=mins[member_idx],
-                    maxs=maxs[member_idx],
-                    required=required[member_idx],
-                    min_count=counts[g],
-                    max_count=counts[g],
-                )
-                if local is None:
-                    ok = False
-                    break
-                vec[member_idx] = local
-            if not ok:
-                continue
 
-            if abs(float(vec.sum()) - 1.0) > 1e-7:
-                continue
-            return vec
+    def draw_batch(n_rows: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        """One sampling attempt for each of ``n_rows`` rows: (samples, whether each attempt succeeded)."""
+        present, ok = _batch_choose_present_groups(n_rows, forced, group_lowers, group_uppers, rng)
+        counts, counts_ok = _batch_choose_counts(present, count_lows, count_highs, global_min, global_max, rng)
+        ok &= counts_ok
 
-        raise ValueError(
-            "Could not find a valid formulation. Please re-try; this sometimes occurs due to the "
-            "randomness involved in searching for a 'valid' formulation in a complex, "
-            "high-dimensional space. This often gets more difficult when ingredients or groups have "
-            "very narrow bound ranges. If re-trying many times does not resolve the issue, you may "
-            "need to widen some ingredient or group bounds and/or relax min/max ingredient counts, "
-            "then try again."
-        )
+        # Sample group totals summing to 1 with each present total in [L_g, U_g].
+        totals, totals_ok = _batch_allocate_present(present, np.ones(n_rows), group_lowers, group_uppers, rng)
+        ok &= totals_ok
 
-    if n_ingredients == 0:
-        return np.zeros((n_samples, 0))
+        vecs = np.zeros((n_rows, n_ingredients))
+        for g in range(n_groups):
+            # An absent group (or a present one with a zero total) contributes nothing.
+            rows = np.flatnonzero(ok & present[:, g] & (totals[:, g] > 1e-12))
+            m = members[g]
+            local, local_ok = _batch_sample_constrained_simplex(
+                totals[rows, g], counts[rows, g], mins[m], maxs[m], required[m], rng
+            )
+            vecs[np.ix_(rows, m)] = local
+            ok[rows[~local_ok]] = False
 
-    samples = []
-    for _ in range(n_samples):
-        current = generate_one_sample()
-        current[np.abs(current) < 1e-14] = 0.0
+        ok &= np.abs(vecs.sum(axis=1) - 1.0) <= 1e-7
+        return vecs, ok
 
+    def check_samples(samples: np.ndarray) -> None:
         # Defensive post-checks (construction should already guarantee these).
-        if np.any(current < -1e-12):
+        if np.any(samples < -1e-12):
             raise ValueError("Sampling produced a negative ingredient quantity.")
-        if np.any(current > maxs + 1e-12):
+        if np.any(samples > maxs + 1e-12):
             raise ValueError("Sampling produced an ingredient above its max bound.")
-        if np.any(required & (current <= 1e-12)):
+        if np.any(required & (samples <= 1e-12)):
             raise ValueError(
                 "Sampling omitted a required ingredient. Please retry or adjust formulation bounds."
             )
         for g in range(n_groups):
-            group_sum = float(current[members[g]].sum())
-            if group_sum > 1e-12:
-                if group_sum < group_lowers[g] - 1e-9 or group_sum > group_uppers[g] + 1e-9:
-                    raise ValueError(
-                        "Sampling violated a group sum bound. Please retry or adjust group bounds."
-                    )
+            group_sums = samples[:, members[g]].sum(axis=1)
+            present_sums = group_sums[group_sums > 1e-12]
+            if np.any((present_sums < group_lowers[g] - 1e-9) | (present_sums > group_uppers[g] + 1e-9)):
+                raise ValueError(
+                    "Sampling violated a group sum bound. Please retry or adjust group bounds."
+                )
 
-        samples.append(current.copy())
+    return presolve, draw_batch, check_samples
 
-    return np.array(samples)
+
+def group_aware_sample_formulation_space(
+    n_ingredients: int,
+    constraints: Optional[List[Tuple[float, float]]] = None,
+    n_samples: int = 100,
+    burn_in: int = 100,
+    min_ingredients_per_formulation: Optional[int] = None,
+    max_ingredients_per_formulation: Optional[int] = None,
+    required: Optional[List[bool]] = None,
+    group_index: Optional[List[int]] = None,
+    group_constraints: Optional[List[Tuple[float, float]]] = None,
+    group_min_counts: Optional[List[int]] = None,
+    group_max_counts: Optional[List[int]] = None,
+    rng: Optional[np.random.Generator] = None,
+):
+    """
+    Generate samples of ingredient formulations using a hierarchical (group-aware) sampler.
+
+    Parameters:
+    - n_ingredients: number of ingredients
+    - constraints: list of (min, max) tuples for each ingredient, or None for unconstrained
+    - n_samples: number of samples to generate
+    - burn_in: retained for backwards compatibility (unused; samples are drawn independently)
+    - min_ingredients_per_formulation: minimum number of ingredients used (non-zero) per formulation (global)
+    - max_ingredients_per_formulation: maximum number of ingredients used (non-zero) per formulation (global)
+    - required: per-ingredient flags; when True, the ingredient must be present in every formulation
+      and its amount must stay within [min, max] (cannot be zero). When False (default), an
+      ingredient may be omitted (zero) even if it has a positive lower bound.
+    - group_index: per-ingredient group id (0..n_groups-1). When None, all ingredients form a
+      single implicit group spanning the whole formulation.
+    - group_constraints: list of (min, max) bounds on the SUM of each group's ingredient amounts.
+      Group bounds are CONDITIONAL: they apply only when the group is present (at least one of its
+      ingredients is present). A group whose total is 0 (entirely absent) is always allowed unless
+      the group is forced present (has a required ingredient or a positive group_min_count).
+    - group_min_counts / group_max_counts: min/max number of present ingredients per group.
+    - rng: random number generator to draw from (a fresh, unseeded one when None)
+
+    Returns:
+    - samples: array of shape (n_samples, n_ingredients)
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    _, draw_batch, check_samples = _group_aware_sampler(
+        n_ingredients,
+        constraints,
+        min_ingredients_per_formulation,
+        max_ingredients_per_formulation,
+        required,
+        group_index,
+        group_constraints,
+        group_min_counts,
+        group_max_counts,
+    )
+
+    if n_ingredients == 0:
+        return np.zeros((n_samples, 0))
+
+    # Draw attempts for many rows at once and keep the successful ones; each accepted row has the same
+    # distribution as a row drawn (and retried) on its own. Give up after as many attempts in total as
+    # `_MAX_SAMPLE_ATTEMPTS` per row allows, or as soon as the first `_MAX_SAMPLE_ATTEMPTS` all fail.
+    batches = []
+    n_accepted = 0
+    n_attempts = 0
+    while n_accepted < n_samples:
+        n_needed = n_samples - n_accepted
+        acceptance = n_accepted / n_attempts if n_attempts else 1.0
+        n_rows = int(min(_SAMPLER_BATCH_ROWS, max(64, np.ceil(1.2 * n_needed / max(acceptance, 1e-4)))))
+        vecs, ok = draw_batch(n_rows, rng)
+        n_attempts += n_rows
+        accepted = vecs[ok][:n_needed]
+        batches.append(accepted)
+        n_accepted += len(accepted)
+        if n_accepted < n_samples and (
+            n_attempts >= _MAX_SAMPLE_ATTEMPTS * n_samples or (n_accepted == 0 and n_attempts >= _MAX_SAMPLE_ATTEMPTS)
+        ):
+            raise ValueError(
+                "Could not find a valid formulation. Please re-try; this sometimes occurs due to the "
+                "randomness involved in searching for a 'valid' formulation in a complex, "
+                "high-dimensional space. This often gets more difficult when ingredients or groups have "
+                "very narrow bound ranges. If re-trying many times does not resolve the issue, you may "
+                "need to widen some ingredient or group bounds and/or relax min/max ingredient counts, "
+                "then try again."
+            )
+
+    samples = np.concatenate(batches)
+    samples[np.abs(samples) < 1e-14] = 0.0
+
+    check_samples(samples)
+    return samples
+
+
+# Sampling attempts made by `estimate_formulation_acceptance_rate`.
+_ACCEPTANCE_PILOT_ROWS = 2048
+
+
+def estimate_formulation_acceptance_rate(
+    n_ingredients: int,
+    constraints: Optional[List[Tuple[float, float]]] = None,
+    min_ingredients_per_formulation: Optional[int] = None,
+    max_ingredients_per_formulation: Optional[int] = None,
+    required: Optional[List[bool]] = None,
+    group_index: Optional[List[int]] = None,
+    group_constraints: Optional[List[Tuple[float, float]]] = None,
+    group_min_counts: Optional[List[int]] = None,
+    group_max_counts: Optional[List[int]] = None,
+    n_attempts: int = _ACCEPTANCE_PILOT_ROWS,
+    rng: Optional[np.random.Generator] = None,
+) -> Tuple[Optional[FormulationPresolve], float]:
+    """Presolve a `group_aware_sample_formulation_space` configuration (same parameters), and estimate the
+    fraction of its sampling attempts that succeed from ``n_attempts`` pilot attempts.
+
+    Drawing ``n`` formulations takes about ``n / rate`` attempts. Raises ValueError for infeasible configurations.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    presolve, draw_batch, _ = _group_aware_sampler(
+        n_ingredients,
+        constraints,
+        min_ingredients_per_formulation,
+        max_ingredients_per_formulation,
+        required,
+        group_index,
+        group_constraints,
+        group_min_counts,
+        group_max_counts,
+    )
+    if n_ingredients == 0:
+        return presolve, 1.0
+    _, ok = draw_batch(n_attempts, rng)
+    return presolve, float(ok.mean())
+
+
+def formulation_sampler_kwargs(formulation_inputs: dict, formulation_groups: Optional[List[dict]] = None) -> dict:
+    """`group_aware_sample_formulation_space` keyword arguments describing the formulation inputs
+    (and groups) of a `build_synthetic_demo_dataset` configuration, other than the global counts."""
+    ingredient_names = list(formulation_inputs)
+    formulation_constraints = [
+        (formulation_inputs[input_]["min"], formulation_inputs[input_]["max"])
+        for input_ in ingredient_names
+    ]
+    formulation_required = [
+        formulation_inputs[input_].get("required", False)
+        for input_ in ingredient_names
+    ]
+
+    # Build the group structure for the sampler. When no groups are
+    # supplied, the sampler treats all ingredients as one implicit group.
+    formulation_group_index = None
+    formulation_group_constraints = None
+    formulation_group_min_counts = None
+    formulation_group_max_counts = None
+    if formulation_groups is not None:
+        name_to_idx = {name: i for i, name in enumerate(ingredient_names)}
+        formulation_group_index = [0] * len(ingredient_names)
+        formulation_group_constraints = []
+        formulation_group_min_counts = []
+        formulation_group_max_counts = []
+        for g, group in enumerate(formulation_groups):
+            formulation_group_constraints.append(
+                (float(group["min"]), float(group["max"]))
+            )
+            group_size = len(group["ingredients"])
+            min_count = group.get("min_count")
+            max_count = group.get("max_count")
+            formulation_group_min_counts.append(
+                1 if min_count is None else int(min_count)
+            )
+            formulation_group_max_counts.append(
+                group_size if max_count is None else int(max_count)
+            )
+            for name in group["ingredients"]:
+                formulation_group_index[name_to_idx[name]] = g
+
+    return dict(
+        n_ingredients=len(ingredient_names),
+        constraints=formulation_constraints,
+        required=formulation_required,
+        group_index=formulation_group_index,
+        group_constraints=formulation_group_constraints,
+        group_min_counts=formulation_group_min_counts,
+        group_max_counts=formulation_group_max_counts,
+    )
 
 
 def build_synthetic_demo_dataset(
@@ -1009,7 +1341,15 @@ def build_synthetic_demo_dataset(
     min_ingredients_per_formulation: Optional[int] = None,
     max_ingredients_per_formulation: Optional[int] = None,
     formulation_groups: Optional[List[dict]] = None,
+    rng: Optional[np.random.Generator] = None,
 ):
+    """Draw ``num_rows`` rows of synthetic inputs and (noisy, sigmoid-of-linear) responses.
+
+    All randomness is drawn from ``rng`` (a fresh, unseeded generator when None), so a seeded
+    generator reproduces the same dataset. Returns the data and the response coefficients as DataFrames.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
 
     if isinstance(inputs, int):
         num_inputs = inputs
@@ -1017,47 +1357,8 @@ def build_synthetic_demo_dataset(
         general_inputs = inputs["general"]
         formulation_inputs = inputs["formulation"]
         num_general_inputs = len(general_inputs)
-        num_formulation_inputs = len(formulation_inputs)
         all_inputs = list(general_inputs) + list(formulation_inputs)
         num_inputs = len(all_inputs)
-        if inputs["formulation"]:
-            ingredient_names = list(formulation_inputs)
-            formulation_constraints = [
-                (formulation_inputs[input_]["min"], formulation_inputs[input_]["max"])
-                for input_ in ingredient_names
-            ]
-            formulation_required = [
-                formulation_inputs[input_].get("required", False)
-                for input_ in ingredient_names
-            ]
-
-            # Build the group structure for the sampler. When no groups are
-            # supplied, the sampler treats all ingredients as one implicit group.
-            formulation_group_index = None
-            formulation_group_constraints = None
-            formulation_group_min_counts = None
-            formulation_group_max_counts = None
-            if formulation_groups is not None:
-                name_to_idx = {name: i for i, name in enumerate(ingredient_names)}
-                formulation_group_index = [0] * len(ingredient_names)
-                formulation_group_constraints = []
-                formulation_group_min_counts = []
-                formulation_group_max_counts = []
-                for g, group in enumerate(formulation_groups):
-                    formulation_group_constraints.append(
-                        (float(group["min"]), float(group["max"]))
-                    )
-                    group_size = len(group["ingredients"])
-                    min_count = group.get("min_count")
-                    max_count = group.get("max_count")
-                    formulation_group_min_counts.append(
-                        1 if min_count is None else int(min_count)
-                    )
-                    formulation_group_max_counts.append(
-                        group_size if max_count is None else int(max_count)
-                    )
-                    for name in group["ingredients"]:
-                        formulation_group_index[name_to_idx[name]] = g
 
 
     if isinstance(outputs, int):
@@ -1068,7 +1369,8 @@ def build_synthetic_demo_dataset(
 
     # Randomly set coefficients for the response function, if not set by the user   
     if coefs is None:
-        coefs = np.array([[np.random.uniform(-1, 1) for i in range(num_inputs)] for k in range(num_outputs)])
+        coefs = rng.uniform(-1, 1, size=(num_outputs, num_inputs))
+    coefs = np.asarray(coefs, dtype=float)
 
 
     # Create pandas DataFrame for the response function coefficients & name the columns
@@ -1084,88 +1386,69 @@ def build_synthetic_demo_dataset(
     # Generate input values
     if isinstance(inputs, int):
         num_inputs = inputs
-        X = np.array([[np.random.uniform(-2, 2) for i in range(num_inputs)] for j in range(num_rows)])
+        X = rng.uniform(-2, 2, size=(num_rows, num_inputs))
     else:
-        X_general = np.array([[np.random.uniform(-2, 2) for i in range(num_general_inputs)] for j in range(num_rows)])
+        X_general = rng.uniform(-2, 2, size=(num_rows, num_general_inputs))
         if inputs["formulation"]:
             # X_formulation = gibbs_sample_formulation_space(  # old way of doing this before Groups support was added
             X_formulation = group_aware_sample_formulation_space(
-                n_ingredients=num_formulation_inputs,
-                constraints=formulation_constraints,
                 n_samples=num_rows,
                 min_ingredients_per_formulation=min_ingredients_per_formulation,
                 max_ingredients_per_formulation=max_ingredients_per_formulation,
-                required=formulation_required,
-                group_index=formulation_group_index,
-                group_constraints=formulation_group_constraints,
-                group_min_counts=formulation_group_min_counts,
-                group_max_counts=formulation_group_max_counts,
+                rng=rng,
+                **formulation_sampler_kwargs(formulation_inputs, formulation_groups),
             )
             X = np.concatenate((X_general, X_formulation), axis=1)
         else:
             X = X_general
 
 
-    # Generate output values
-    y = list()
-    for k in range(num_outputs):
-        y.append(list())
-        for row in X:
-            y[k].append(sigmoid(row, coefs[k]))
-
-    y = np.array(y)
+    # Generate output values: the logits of all rows & outputs are one matrix product, (rows, inputs) @ (inputs, outputs)
+    y = sigmoid(X, coefs.T)
 
     if noise > 0:
-        y = y + np.random.normal(0, noise, y.shape)
+        y = y + rng.normal(0, noise, y.shape)
 
-    # Create pandas DataFrame for the generated data & name the columns
-    data_df = pd.DataFrame()
-
-    for k in range(num_outputs):
-        if isinstance(outputs, int):
-            data_df[f"y_{k+1}"] = y[k]
-        else:
-            data_df[list(outputs)[k]] = y[k]
-
-    for i in range(num_inputs):
-        if isinstance(inputs, int):
-            data_df[f"x_{i+1}"] = X[:, i]
-        else:
-            data_df[all_inputs[i]] = X[:, i]
+    if isinstance(outputs, int):
+        output_columns = [f"y_{k+1}" for k in range(num_outputs)]
+    else:
+        output_columns = list(outputs)
+    if isinstance(inputs, int):
+        input_columns = [f"x_{i+1}" for i in range(num_inputs)]
+    else:
+        input_columns = all_inputs
 
 
     ### TODO: clean this section up
     #################################
     if isinstance(inputs, int):
-        pass
+        column_renaming = {}
     else:
-        df_scaled = data_df.copy()
-
-        for col in df_scaled.columns:
-            if col in general_inputs:
-                scaled_col = (df_scaled[col].to_numpy() + 2) / 4
-            else:
-                scaled_col = df_scaled[col]
-            df_scaled[col] = scaled_col
+        # Rescale the general inputs from [-2, 2] and the outputs from [0, 1] to their [min, max] ranges, a block at a time.
+        general_mins = np.array([general_inputs[col]["min"] for col in general_inputs], dtype=float)
+        general_maxs = np.array([general_inputs[col]["max"] for col in general_inputs], dtype=float)
+        X = X.copy()
+        X[:, :num_general_inputs] = (X[:, :num_general_inputs] + 2) / 4 * (general_maxs - general_mins) + general_mins
+        output_mins = np.array([outputs[col]["min"] for col in outputs], dtype=float)
+        output_maxs = np.array([outputs[col]["max"] for col in outputs], dtype=float)
+        y = y * (output_maxs - output_mins) + output_mins
 
         all_columns = dict()
         all_columns.update(general_inputs)
         all_columns.update(formulation_inputs)
         all_columns.update(outputs)
 
-        for col in all_columns:
-            if col in general_inputs or col in outputs:
-                df_scaled[col] = df_scaled[col] * (all_columns[col]["max"] - all_columns[col]["min"]) + all_columns[col]["min"]
-
         # concatenate column names with user's specified units, with a hyphen in between (but don't add hyphen if no units were specified)
         column_renaming = {col: f'{col}-{all_columns[col]["units"]}' for col in general_inputs if all_columns[col]["units"] != ""}
         column_renaming.update({col: f'{col}-{all_columns[col]["units"]}' for col in outputs if all_columns[col]["units"] != ""})
-        df_scaled = df_scaled.rename(column_renaming, axis=1)
         coefs_df = coefs_df.rename(column_renaming, axis=0)
         coefs_df = coefs_df.rename(column_renaming, axis=1)
 
-        data_df = df_scaled
+    # Create pandas DataFrame for the generated data & name the columns
+    data_df = pd.DataFrame(np.hstack([y, X]), columns=output_columns + input_columns)
+    data_df = data_df.rename(column_renaming, axis=1)
 
+    if not isinstance(inputs, int):
         if output_format == "compact":
             formulation_column_headers = list(formulation_inputs.keys())
             formulation_df = data_df[formulation_column_headers] * 100
@@ -0,0 +1,160 @@
+"""
+Bounded worker pools for the CPU-bound endpoints.
+
+Unpickling, plotting, SHAP, UMAP and dataset sampling must not run on uvicorn's event loop,
+otherwise a single heavy request stalls every other user (including `/health`). Each workload
+class gets its own thread pool, concurrency limit and bounded queue, so e.g. a burst of SHAP
+requests can't starve the plotting pages. Threads (rather than processes) are used so the
+in-process artifact cache is shared; the heavy numeric libraries release the GIL.
+
+Usage in a router:
+```python
+@router.get("/api/some-endpoint/{model_name}")
+@run_in_workload("plotting")
+def get_something(model_name: str) -> dict[str, Any]:
+    ...
+```
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator
+
+
+# workload class -> (max concurrent workers, max queued requests). Override with e.g.
+# WORKLOAD_EXPLAINABILITY_WORKERS=4 / WORKLOAD_EXPLAINABILITY_QUEUE=16.
+DEFAULT_WORKLOAD_LIMITS = {
+    "plotting": (4, 32),
+    "explainability": (2, 8),
+    "molecular": (2, 8),
+    "generation": (2, 8),
+}
+
+
+class WorkloadQueueFull(Exception):
+    """Raised when a workload class already has its maximum number of running + queued requests."""
+
+
+class WorkloadPool:
+    """A thread pool with a concurrency limit, a bounded queue and wait-time statistics."""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"workload-{name}")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> "asyncio.Future[Any]":
+        """Schedule ``fn(*args, **kwargs)`` on this pool; raises WorkloadQueueFull if the queue is full."""
+        with self._lock:
+            idle_workers = max(0, self.max_workers - self.running)
+            if self.queued >= self.max_queue + idle_workers:
+                self.rejected += 1
+                raise WorkloadQueueFull(
+                    f"The server is busy with other '{self.name}' requests; please try again shortly."
+                )
+            self.queued += 1
+        enqueued_at = time.monotonic()
+
+        def _call() -> Any:
+            wait_seconds = time.monotonic() - enqueued_at
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self._total_wait_seconds += wait_seconds
+                self._max_wait_seconds = max(self._max_wait_seconds, wait_seconds)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        def _on_done(future: Future) -> None:
+            # A call cancelled while queued (e.g. the client disconnected) never runs `_call`.
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+
+        future = self._executor.submit(_call)
+        future.add_done_callback(_on_done)
+        # Cancelling the returned asyncio future cancels `future` too, unless it has started.
+        return asyncio.wrap_future(future, loop=asyncio.get_running_loop())
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            started = self.completed + self.running
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "mean_wait_seconds": self._total_wait_seconds / started if started else 0.0,
+                "max_wait_seconds": self._max_wait_seconds,
+            }
+
+
+def _pool_limits(name: str, default: tuple[int, int]) -> tuple[int, int]:
+    prefix = f"WORKLOAD_{name.upper()}"
+    return (
+        int(os.environ.get(f"{prefix}_WORKERS", default[0])),
+        int(os.environ.get(f"{prefix}_QUEUE", default[1])),
+    )
+
+
+workload_pools = {
+    name: WorkloadPool(name, *_pool_limits(name, limits))
+    for name, limits in DEFAULT_WORKLOAD_LIMITS.items()
+}
+
+
+def run_in_workload(workload: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorate a synchronous endpoint so that it runs on the given workload class's pool.
+
+    The wrapper keeps the endpoint's signature, so FastAPI still sees the original parameters.
+    """
+    pool = workload_pools[workload]
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return await pool.submit(fn, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+async def iterate_in_workload(workload: str, iterator: Iterator[Any]) -> AsyncIterator[Any]:
+    """Advance a synchronous iterator (e.g. a streaming response body) on a workload class's pool, an item at a time.
+
+    The stream's request was already admitted, so a full queue delays the next item instead of failing it.
+    """
+    pool = workload_pools[workload]
+    exhausted = object()
+    while True:
+        try:
+            item = await pool.submit(next, iterator, exhausted)
+        except WorkloadQueueFull:
+            await asyncio.sleep(0.05)
+            continue
+        if item is exhausted:
+            return
+        yield item
+
+
+def workload_stats() -> dict[str, dict[str, Any]]:
+    return {name: pool.stats() for name, pool in workload_pools.items()}
@@ -68,6 +68,8 @@ const DEFAULT_GROUP_NAME = 'Default Group';
 const DEFAULT_MIN_BOUND = '0';
 const DEFAULT_MAX_BOUND = '1';
 const COEFFICIENT_DECIMALS = 3;
+// Larger datasets are streamed by the backend as a zip (dataset.csv + components.csv) instead of JSON.
+const STREAMING_ROW_THRESHOLD = 100000;
 
 const randomCoefficient = () => (Math.random() * 2 - 1).toFixed(COEFFICIENT_DECIMALS);
 
@@ -784,10 +786,12 @@ const DatasetGeneratorPage = () => {
     );
     const coefs = buildCoefsPayload(coefInputs, coefOutputs, coefficientValues);
 
+    const streamed = typeof numRows === 'number' && numRows > STREAMING_ROW_THRESHOLD;
+
     try {
       const response = await fetch(
         // `http://localhost:8000/api/dataset-generator`, {
-        `./api/dataset-generator`, {
+        streamed ? `./api/dataset-generator?stream=true` : `./api/dataset-generator`, {
           method: 'POST',
           headers: {
             'Content-Type': 'application/json',
@@ -829,11 +833,8 @@ const DatasetGeneratorPage = () => {
         return;
       }
 
-      const data = await response.json();
-
-      const triggerCsvDownload = (csvContent: string, downloadFilename: string) => {
-        // stuff to make the CSV download compatible with iframes
-        const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
+      const triggerDownload = (blob: Blob, downloadFilename: string) => {
+        // stuff to make the download compatible with iframes
         const url = window.URL.createObjectURL(blob);
         
         // Create hidden iframe for download
@@ -860,9 +861,19 @@ const DatasetGeneratorPage = () => {
         }
       };
 
+      const triggerCsvDownload = (csvContent: string, downloadFilename: string) =>
+        triggerDownload(new Blob([csvContent], { type: 'text/csv;charset=utf-8;' }), downloadFilename);
+
       const getDatasetBaseName = (rawName: string) => rawName.trim() || "generated_dataset_name";
 
       const datasetBaseName = getDatasetBaseName(filename);
+
+      if (streamed) {
+        triggerDownload(await response.blob(), `${datasetBaseName}.zip`);
+        return;
+      }
+
+      const data = await response.json();
       const hasFormulationInputs = totalIngredients > 0;
       const formulationsFilename = hasFormulationInputs
         ? `${datasetBaseName}_formulations.csv`
@@ -34,7 +34,7 @@ export default function Overview() {
       if (selectedModel) {
         try {
           setIsLoading(true);
-          const response = await fetch(`./api/overview/${selectedModel}`);
+          const response = await fetch(`./api/overview/${selectedModel}?typed_arrays=true`);
           const data = await response.json();
           setModelOverviewData(data);
         } catch (error) {
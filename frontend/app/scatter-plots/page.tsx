@@ -39,7 +39,7 @@ const ScatterPlotsPage = () => {
 
           // Only fetch plot data after we have valid variables
           const plotResponse = await fetch(
-            `./api/scatter-plots/${selectedModel}`, {
+            `./api/scatter-plots/${selectedModel}?typed_arrays=true`, {
               method: 'POST',
               headers: {
                 'Content-Type': 'application/json',
@@ -77,7 +77,7 @@ const ScatterPlotsPage = () => {
 
       try {
         const response = await fetch(
-          `./api/scatter-plots/${selectedModel}`, {
+          `./api/scatter-plots/${selectedModel}?typed_arrays=true`, {
             method: 'POST',
             headers: {
               'Content-Type': 'application/json',
@@ -7,11 +7,13 @@ import { PlotDataType } from '@/types/types';
 import Select from 'react-select';
 import Sidebar from '../components/Sidebar';
 import Spinner from '../components/Spinner';
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useModel } from '../contexts/ModelContext';
 
 const Plot = dynamic(() => import('react-plotly.js'), { ssr: false });
 
+const SUMMARY_POLL_INTERVAL_MS = 3000;
+
 
 const ShapSummaryPlotsPage = () => {
   const { selectedModel } = useModel();
@@ -20,6 +22,8 @@ const ShapSummaryPlotsPage = () => {
   const [selectedOutputVariable, setSelectedOutputVariable] = useState<string>();
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string>("");
+  const [sampleStatus, setSampleStatus] = useState<string>("");
+  const versionRef = useRef<number | null>(null);
 
 
   useEffect(() => {
@@ -48,7 +52,12 @@ const ShapSummaryPlotsPage = () => {
 
   
   useEffect(() => {
-    async function fetchShapSummaryPlotData() {
+    // The first response summarizes a representative sample of rows; the backend keeps explaining
+    // more rows in the background, so poll until the summary is complete.
+    let cancelled = false;
+    let pollTimer: ReturnType<typeof setTimeout> | undefined;
+
+    async function fetchShapSummaryPlotData(isPoll: boolean = false) {
       if (!selectedModel || !selectedOutputVariable) {
         return;
       }
@@ -57,9 +66,12 @@ const ShapSummaryPlotsPage = () => {
       setError("");
 
       try {
-        setIsLoading(true);
+        if (!isPoll) {
+          setIsLoading(true);
+          setSampleStatus("");
+        }
         const response = await fetch(
-          `./api/shap-summary-plots/${selectedModel}`, {
+          `./api/shap-summary-plots/${selectedModel}?typed_arrays=true`, {
             method: 'POST',
             headers: {
               'Content-Type': 'application/json',
@@ -67,6 +79,9 @@ const ShapSummaryPlotsPage = () => {
             body: JSON.stringify({ selected_output: selectedOutputVariable }),
           }
         );
+        if (cancelled) {
+          return;
+        }
 
         if (!response.ok) {
           const errorData = await response.json();
@@ -82,8 +97,16 @@ const ShapSummaryPlotsPage = () => {
 
         const data = await response.json();
 
-
-        setPlotData(data.plot_data);
+        if (data.version !== versionRef.current) {
+          versionRef.current = data.version;
+          setPlotData(data.plot_data);
+        }
+        if (data.complete) {
+          setSampleStatus(`Explaining all ${data.n_samples.toLocaleString()} of ${data.n_rows.toLocaleString()} rows.`);
+        } else {
+          setSampleStatus(`Showing a representative ${data.n_samples.toLocaleString()} of ${data.n_rows.toLocaleString()} rows; refining...`);
+          pollTimer = setTimeout(() => fetchShapSummaryPlotData(true), SUMMARY_POLL_INTERVAL_MS);
+        }
         setIsLoading(false);
       } catch (error) {
         console.error('Error fetching shap summary plot data:', error);
@@ -91,7 +114,12 @@ const ShapSummaryPlotsPage = () => {
       }
     };
 
+    versionRef.current = null;
     fetchShapSummaryPlotData();
+    return () => {
+      cancelled = true;
+      clearTimeout(pollTimer);
+    };
   }, [selectedModel, selectedOutputVariable]);
 
 
@@ -163,6 +191,9 @@ const ShapSummaryPlotsPage = () => {
               {error}
             </div>
           )}
+          {sampleStatus && !isLoading && (
+            <p className="mb-2 text-sm text-gray-500">{sampleStatus}</p>
+          )}
           {isLoading ? <Spinner /> : 
             plotData && (
               <Plot
@@ -12,16 +12,19 @@ import { useModel } from '../contexts/ModelContext';
 
 const Plot = dynamic(() => import('react-plotly.js'), { ssr: false });
 
+const JOB_POLL_INTERVAL_MS = 1000;
+
 
 const ShapWaterfallPlotsPage = () => {
   const { selectedModel } = useModel();
-  const [plotData, setPlotData] = useState<PlotDataType | null>(null);
+  const [plots, setPlots] = useState<{ sample_id: string; plot_data: PlotDataType }[]>([]);
   const [outputVariableOptions, setOutputVariableOptions] = useState<{ value: string; label: string }[]>([]);
   const [selectedOutputVariable, setSelectedOutputVariable] = useState<string>();
   const [sampleOptions, setSampleOptions] = useState<{ value: string; label: string }[]>([]);
   const [selectedSample, setSelectedSample] = useState<string[]>();
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string>("");
+  const [jobStatus, setJobStatus] = useState<string>("");
 
 
   useEffect(() => {
@@ -83,23 +86,59 @@ const ShapWaterfallPlotsPage = () => {
   
 
   useEffect(() => {
+    // Waterfalls are computed as a background job on the backend (so many samples can't hit the
+    // proxy timeout); poll the job until it's done.
+    let cancelled = false;
+    let pollTimer: ReturnType<typeof setTimeout> | undefined;
+
+    async function pollJob(jobId: string) {
+      try {
+        const response = await fetch(`./api/jobs/${jobId}?typed_arrays=true`);
+        const job = await response.json();
+        if (cancelled) {
+          return;
+        }
+        if (!response.ok || job.status === 'failed') {
+          setError(job.error || job.detail || "An unexpected error occurred");
+          setJobStatus("");
+          setIsLoading(false);
+        } else if (job.status === 'done') {
+          setJobStatus("");
+          setPlots(job.result.plots);
+          setIsLoading(false);
+        } else {
+          if (job.total) {
+            const eta = job.eta_seconds != null ? ` (about ${Math.ceil(job.eta_seconds)} s left)` : "";
+            setJobStatus(`Explained ${job.done} of ${job.total} samples${eta}...`);
+          }
+          pollTimer = setTimeout(() => pollJob(jobId), JOB_POLL_INTERVAL_MS);
+        }
+      } catch (error) {
+        console.error('Error polling waterfall plot job:', error);
+        setIsLoading(false);
+      }
+    }
+
     async function fetchShapWaterfallPlotData() {
       if (!selectedModel || !selectedOutputVariable || !selectedSample) {
         setIsLoading(false);
         return;
       }
 
+      // Clear any existing error
+      setError("");
+
       try {
         setIsLoading(true);
         const response = await fetch(
-          `./api/shap-waterfall-plots/${selectedModel}`, {
+          `./api/shap-waterfall-plots/${selectedModel}/batch?as_job=true`, {
             method: 'POST',
             headers: {
               'Content-Type': 'application/json',
             },
             body: JSON.stringify({ 
               selected_output: selectedOutputVariable, 
-              selected_sample: selectedSample 
+              sample_ids: selectedSample
             }),
           }
         );
@@ -113,12 +152,14 @@ const ShapWaterfallPlotsPage = () => {
           } else {
             setError(errorData.detail || "An unexpected error occurred");
           }
+          setIsLoading(false);
           return;
         }
 
-        const data = await response.json();
-        setPlotData(data.plot_data);
-        setIsLoading(false);
+        const job = await response.json();
+        if (!cancelled) {
+          pollJob(job.job_id);
+        }
       } catch (error) {
         console.error('Error fetching waterfall plot data:', error);
         setIsLoading(false);
@@ -126,13 +167,17 @@ const ShapWaterfallPlotsPage = () => {
     };
 
     fetchShapWaterfallPlotData();
+    return () => {
+      cancelled = true;
+      clearTimeout(pollTimer);
+    };
   }, [selectedModel, selectedOutputVariable, selectedSample]);
 
 
   // TODO: someday, figure out how to pull this out as a function that can be imported to any page
   // handle plot rendering detection
   useEffect(() => {
-    if (plotData) {
+    if (plots.length) {
       // Add a small delay to ensure the plot is fully rendered
       const timer = setTimeout(() => {
         setIsLoading(false);
@@ -140,7 +185,7 @@ const ShapWaterfallPlotsPage = () => {
       
       return () => clearTimeout(timer);
     }
-  }, [plotData]);
+  }, [plots]);
 
 
   return (
@@ -183,13 +228,12 @@ const ShapWaterfallPlotsPage = () => {
             name="selected-variables"
             classNamePrefix="select"
           />
-        <label>{"Select a sample from the dataset:"}</label>
+        <label>{"Select one or more samples from the dataset:"}</label>
         <Select
             options={sampleOptions}
-            onChange={(selected: { value: string; label: string } | null) => {
-              if (selected) {
-                setSelectedSample([selected.value]);
-              }
+            isMulti
+            onChange={(selected: readonly { value: string; label: string }[]) => {
+              setSelectedSample(selected.length ? selected.map(option => option.value) : undefined);
             }}
             // value={selectedSample} // Set selected values
             value={sampleOptions.filter(option => selectedSample?.includes(option.value))} // Set selected values
@@ -209,15 +253,19 @@ const ShapWaterfallPlotsPage = () => {
               {error}
             </div>
           )}
+          {isLoading && jobStatus && (
+            <p className="mb-2 text-sm text-gray-500">{jobStatus}</p>
+          )}
           {isLoading ? <Spinner /> : 
-            plotData && (
+            plots.map(({ sample_id, plot_data }) => (
               <Plot
-                data={plotData.data}
-                layout={plotData.layout}
+                key={sample_id}
+                data={plot_data.data}
+                layout={plot_data.layout}
                 config={{ responsive: true }}
-                style={{ width: '100%', height: '750px' }}
+                style={{ width: '100%', height: plots.length > 1 ? '500px' : '750px' }}
               />
-          )}
+          ))}
         </div>
       </div>
     </div>
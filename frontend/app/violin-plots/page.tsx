@@ -46,7 +46,7 @@ const ViolinPlotsPage = () => {
       try {
         setIsLoading(true);
         const response = await fetch(
-          `./api/violin-plots/${selectedModel}`, {
+          `./api/violin-plots/${selectedModel}?typed_arrays=true`, {
             method: 'POST',
             headers: {
               'Content-Type': 'application/json',